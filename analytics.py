@@ -0,0 +1,401 @@
+# analytics.py - 업종/규모별 벤치마킹 분석 (완료 평가 점수 캐시) 및 회사별 추이
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+import question_bank
+
+# 분포 히스토그램 구간 크기 (%)
+DISTRIBUTION_BUCKET = 10
+
+# 요약에 포함할 백분위수
+SUMMARY_PERCENTILES = (25, 50, 75, 90)
+
+# 비교 그룹 차원
+DIMENSIONS = ('all', 'industry', 'size')
+
+# 업종/규모가 비어 있는 회사의 그룹 이름
+UNSPECIFIED = '미지정'
+
+# 개선 순위 기본/최대 건수
+LEADERBOARD_LIMIT = 20
+LEADERBOARD_MAX_LIMIT = 500
+
+
+def materialize_category_scores(c, assessment_id):
+    """평가의 카테고리별 점수를 assessment_category_scores에 저장 (제출 시 호출)"""
+    c.execute("DELETE FROM assessment_category_scores WHERE assessment_id = ?", (assessment_id,))
+    c.execute('''INSERT INTO assessment_category_scores (assessment_id, category_id, score, max_score)
+                 SELECT ar.assessment_id, q.category_id, SUM(ar.score), COUNT(ar.score) * 5
+                 FROM assessment_results ar
+                 JOIN questions q ON ar.question_id = q.id
+                 WHERE ar.assessment_id = ?
+                 GROUP BY ar.assessment_id, q.category_id''', (assessment_id,))
+
+
+def backfill_category_scores(c):
+    """카테고리 점수가 없는 완료 평가를 일괄 저장 (init_db에서 호출)"""
+    c.execute('''INSERT INTO assessment_category_scores (assessment_id, category_id, score, max_score)
+                 SELECT ar.assessment_id, q.category_id, SUM(ar.score), COUNT(ar.score) * 5
+                 FROM assessment_results ar
+                 JOIN questions q ON ar.question_id = q.id
+                 JOIN assessments a ON ar.assessment_id = a.id
+                 WHERE a.status = 'completed'
+                   AND ar.assessment_id NOT IN (SELECT assessment_id FROM assessment_category_scores)
+                 GROUP BY ar.assessment_id, q.category_id''')
+    return c.rowcount
+
+
+def percentile_rank(sorted_values, value):
+    """정렬된 목록에서 value의 백분위 순위 (동점은 절반으로 계산)"""
+    if not sorted_values:
+        return None
+    below = bisect_left(sorted_values, value)
+    equal = bisect_right(sorted_values, value) - below
+    return round((below + equal / 2) / len(sorted_values) * 100, 1)
+
+
+def percentile_value(sorted_values, pct):
+    """정렬된 목록의 pct 백분위수 (선형 보간)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return round(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower), 1)
+
+
+class GroupStats:
+    """비교 그룹 1개의 점수 분포 (정렬 목록/점수별 개수)"""
+
+    __slots__ = ('totals', 'categories', 'questions')
+
+    def __init__(self):
+        self.totals = []       # 총점 달성률(%) 정렬 목록
+        self.categories = {}   # {category_id: 달성률(%) 정렬 목록}
+        self.questions = {}    # {question_id: [0점, 1점, ..., 5점 개수]}
+
+    def add(self, total_pct, category_pcts, question_scores):
+        insort(self.totals, total_pct)
+        for category_id, pct in category_pcts.items():
+            insort(self.categories.setdefault(category_id, []), pct)
+        for question_id, score in question_scores.items():
+            counts = self.questions.setdefault(question_id, [0] * 6)
+            if 0 <= score <= 5:
+                counts[score] += 1
+
+    def question_percentile(self, question_id, score):
+        counts = self.questions.get(question_id)
+        if not counts or not sum(counts):
+            return None
+        below = sum(counts[:score])
+        return round((below + counts[score] / 2) / sum(counts) * 100, 1)
+
+    def summary(self):
+        distribution = [0] * (100 // DISTRIBUTION_BUCKET)
+        for pct in self.totals:
+            distribution[min(int(pct // DISTRIBUTION_BUCKET), len(distribution) - 1)] += 1
+        return {
+            'count': len(self.totals),
+            'average': round(sum(self.totals) / len(self.totals), 1) if self.totals else None,
+            'percentiles': {str(p): percentile_value(self.totals, p) for p in SUMMARY_PERCENTILES},
+            'distribution': distribution,
+            'category_averages': {
+                category_id: round(sum(values) / len(values), 1)
+                for category_id, values in self.categories.items() if values
+            },
+            'question_averages': {
+                question_id: round(sum(score * n for score, n in enumerate(counts)) / sum(counts), 2)
+                for question_id, counts in self.questions.items() if sum(counts)
+            },
+        }
+
+
+class ScoreMatrix:
+    """완료 평가의 점수 캐시
+
+    assessment_category_scores의 rowid를 기준점(watermark)으로 삼아
+    새로 제출된 평가만 읽어 그룹별 정렬 목록에 추가합니다.
+    삭제나 재제출이 감지되면 전체를 다시 읽습니다.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.watermark = 0
+        self.row_count = 0
+        self.groups = {}
+        self.assessments = {}  # {assessment_id: (industry, size, total_pct, category_pcts, question_scores)}
+
+    def group(self, dimension, value):
+        return self.groups.get((dimension, value if dimension != 'all' else None))
+
+    def refresh(self, c):
+        """새로 저장된 카테고리 점수를 반영"""
+        c.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM assessment_category_scores")
+        row_count, max_rowid = c.fetchone()
+        if max_rowid == self.watermark and row_count == self.row_count:
+            return
+        if row_count < self.row_count or max_rowid < self.watermark:
+            self.reset()
+
+        c.execute('''SELECT s.rowid, s.assessment_id, s.category_id, s.score, s.max_score, co.industry, co.size
+                     FROM assessment_category_scores s
+                     JOIN assessments a ON s.assessment_id = a.id
+                     JOIN companies co ON a.company_id = co.id
+                     WHERE s.rowid > ?
+                     ORDER BY s.rowid''', (self.watermark,))
+        new_rows = c.fetchall()
+
+        pending = {}
+        for rowid, assessment_id, category_id, score, max_score, industry, size in new_rows:
+            if assessment_id in self.assessments:
+                # 재제출된 평가: 기존 값을 제거할 수 없으므로 전체 재구성
+                self.reset()
+                return self.refresh(c)
+            entry = pending.setdefault(assessment_id, [industry, size, 0, 0, {}])
+            entry[2] += score or 0
+            entry[3] += max_score or 0
+            entry[4][category_id] = round((score or 0) / max_score * 100, 1) if max_score else 0.0
+
+        question_scores = {assessment_id: {} for assessment_id in pending}
+        ids = list(pending)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            c.execute(f'''SELECT assessment_id, question_id, score FROM assessment_results
+                          WHERE assessment_id IN ({",".join("?" * len(chunk))})''', chunk)
+            for assessment_id, question_id, score in c.fetchall():
+                question_scores[assessment_id][question_id] = score or 0
+
+        for assessment_id, (industry, size, score, max_score, category_pcts) in pending.items():
+            total_pct = round(score / max_score * 100, 1) if max_score else 0.0
+            scores = question_scores[assessment_id]
+            self.assessments[assessment_id] = (industry, size, total_pct, category_pcts, scores)
+            for key in (('all', None), ('industry', industry), ('size', size)):
+                self.groups.setdefault(key, GroupStats()).add(total_pct, category_pcts, scores)
+
+        self.watermark = max_rowid
+        self.row_count = row_count
+
+    def assessment_benchmark(self, assessment_id):
+        """평가 1건의 그룹별 백분위 (총점/카테고리/문항)"""
+        with self.lock:
+            return self._assessment_benchmark(assessment_id)
+
+    def _assessment_benchmark(self, assessment_id):
+        record = self.assessments.get(assessment_id)
+        if record is None:
+            return None
+        industry, size, total_pct, category_pcts, question_scores = record
+        result = {'assessment_id': assessment_id, 'total_percentage': total_pct, 'groups': {}}
+        for dimension, value in (('all', None), ('industry', industry), ('size', size)):
+            stats = self.group(dimension, value)
+            if stats is None:
+                continue
+            result['groups'][dimension] = {
+                'value': value,
+                'count': len(stats.totals),
+                'total_percentile': percentile_rank(stats.totals, total_pct),
+                'category_percentiles': {
+                    category_id: percentile_rank(stats.categories.get(category_id, []), pct)
+                    for category_id, pct in category_pcts.items()
+                },
+                'question_percentiles': {
+                    question_id: stats.question_percentile(question_id, score)
+                    for question_id, score in question_scores.items()
+                },
+            }
+        return result
+
+    def summary(self, dimension):
+        """차원(all/industry/size)별 그룹 요약"""
+        with self.lock:
+            return {
+                (value if value is not None else UNSPECIFIED if dimension != 'all' else 'all'): stats.summary()
+                for (group_dimension, value), stats in sorted(self.groups.items(), key=lambda item: str(item[0]))
+                if group_dimension == dimension
+            }
+
+
+def _percentage(score, max_score):
+    return round((score or 0) / max_score * 100, 1) if max_score else 0.0
+
+
+def _with_deltas(points, key):
+    """시계열 항목에 직전 대비 변화량(delta) 추가 후 전체 변화량 반환"""
+    previous = None
+    for point in points:
+        point['delta'] = round(point[key] - previous, 1) if previous is not None else None
+        previous = point[key]
+    if len(points) < 2:
+        return None
+    return round(points[-1][key] - points[0][key], 1)
+
+
+def company_trend(c, db_path, company_id):
+    """회사의 완료 평가 이력 (총점/카테고리/문항별 점수와 변화량)
+
+    카테고리 점수는 assessment_category_scores에서, 문항 점수는
+    assessments(company_id, status, assessment_date) 인덱스를 타는 단일 쿼리로 읽습니다.
+    카테고리/문항 이름과 순서는 각 평가에 고정된 문항 은행 카탈로그 기준이며(가장 최근 평가 우선),
+    삭제된 문항의 이력도 포함합니다.
+    """
+    c.execute('''SELECT a.id, a.assessment_date, a.total_score, a.maturity_level, a.question_bank_version_id,
+                        s.category_id, s.score, s.max_score
+                 FROM assessments a
+                 LEFT JOIN assessment_category_scores s ON s.assessment_id = a.id
+                 WHERE a.company_id = ? AND a.status = 'completed'
+                 ORDER BY a.assessment_date, a.id''', (company_id,))
+    rows = c.fetchall()
+
+    catalogs = {}
+    versions = {}
+
+    def catalog_of(assessment_id):
+        version_id = versions[assessment_id]
+        if version_id not in catalogs:
+            catalogs[version_id] = question_bank.get_catalog(c, db_path, version_id)
+        return catalogs[version_id]
+
+    assessments = []
+    categories = {}
+    category_order = {}
+    by_id = {}
+    for assessment_id, date, total_score, maturity_level, version_id, category_id, score, max_score in rows:
+        entry = by_id.get(assessment_id)
+        if entry is None:
+            entry = {'assessment_id': assessment_id, 'date': date, 'total_score': total_score,
+                     'maturity_level': maturity_level, 'score': 0, 'max_score': 0}
+            by_id[assessment_id] = entry
+            versions[assessment_id] = version_id
+            assessments.append(entry)
+        if category_id is None:
+            continue
+        entry['score'] += score or 0
+        entry['max_score'] += max_score or 0
+        position, name = next(((position, category['name'])
+                               for position, category in enumerate(catalog_of(assessment_id).categories)
+                               if category['id'] == category_id), (None, None))
+        category = categories.setdefault(category_id, {'category_id': category_id, 'name': name, 'points': []})
+        if position is not None:
+            category['name'] = name
+            category_order[category_id] = position
+        category['points'].append({'assessment_id': assessment_id, 'date': date, 'score': score,
+                                   'max_score': max_score, 'percentage': _percentage(score, max_score)})
+
+    for entry in assessments:
+        entry['percentage'] = _percentage(entry.pop('score'), entry.pop('max_score'))
+
+    c.execute('''SELECT ar.assessment_id, ar.question_id, ar.score
+                 FROM assessments a
+                 JOIN assessment_results ar ON ar.assessment_id = a.id
+                 WHERE a.company_id = ? AND a.status = 'completed'
+                 ORDER BY a.assessment_date, a.id''', (company_id,))
+    results = {}
+    for assessment_id, question_id, score in c.fetchall():
+        results.setdefault(assessment_id, []).append((question_id, score, None))
+
+    questions = {}
+    question_order = {}
+    for entry in assessments:
+        assessment_id = entry['assessment_id']
+        ordered = catalog_of(assessment_id).ordered_results(results.get(assessment_id, []))
+        for position, (info, category, score, _) in enumerate(ordered):
+            question = questions.setdefault(info['id'], {'question_id': info['id'], 'code': info['code'],
+                                                         'title': info['title'], 'category': None, 'points': []})
+            if category is not None:
+                question.update(code=info['code'], title=info['title'], category=category['name'])
+                question_order[info['id']] = position
+            question['points'].append({'assessment_id': assessment_id, 'date': entry['date'], 'score': score})
+
+    change = _with_deltas(assessments, 'percentage')
+    for category in categories.values():
+        category['change'] = _with_deltas(category['points'], 'percentage')
+    for question in questions.values():
+        question['change'] = _with_deltas(question['points'], 'score')
+
+    def in_catalog_order(items, order):
+        # 카탈로그에서 찾지 못한 항목(삭제된 영역/문항)은 마지막에 ID 순서로
+        return [items[key] for key in sorted(items, key=lambda key: (order.get(key, float('inf')), key))]
+
+    return {
+        'company_id': company_id,
+        'assessments': assessments,
+        'change': change,
+        'categories': in_catalog_order(categories, category_order),
+        'questions': in_catalog_order(questions, question_order),
+    }
+
+
+def improvement_leaderboard(c, limit=LEADERBOARD_LIMIT, industry=None, size=None, category_id=None):
+    """전체 회사의 첫 평가 대비 최근 평가 개선폭 순위 (단일 쿼리로 일괄 계산)
+
+    평가가 2건 이상인 회사만 포함하며, category_id를 주면 해당 카테고리 달성률로 비교합니다.
+    """
+    conditions = ["a.status = 'completed'"]
+    params = []
+    if industry:
+        conditions.append("co.industry = ?")
+        params.append(industry)
+    if size:
+        conditions.append("co.size = ?")
+        params.append(size)
+    if category_id:
+        conditions.append("s.category_id = ?")
+        params.append(category_id)
+
+    c.execute(f'''SELECT a.company_id, co.name, co.industry, co.size, a.id, a.assessment_date,
+                         SUM(s.score), SUM(s.max_score)
+                  FROM assessments a
+                  JOIN companies co ON a.company_id = co.id
+                  JOIN assessment_category_scores s ON s.assessment_id = a.id
+                  WHERE {' AND '.join(conditions)}
+                  GROUP BY a.id
+                  ORDER BY a.company_id, a.assessment_date, a.id''', params)
+
+    entries = []
+    current = None
+    for company_id, name, company_industry, company_size, assessment_id, date, score, max_score in c.fetchall():
+        percentage = _percentage(score, max_score)
+        if current is None or current['company_id'] != company_id:
+            current = {'company_id': company_id, 'name': name, 'industry': company_industry,
+                       'size': company_size, 'assessment_count': 0,
+                       'first_assessment_id': assessment_id, 'first_date': date, 'first_percentage': percentage,
+                       'previous_percentage': None}
+            entries.append(current)
+        else:
+            current['previous_percentage'] = current['latest_percentage']
+        current['assessment_count'] += 1
+        current['latest_assessment_id'] = assessment_id
+        current['latest_date'] = date
+        current['latest_percentage'] = percentage
+
+    leaderboard = []
+    for entry in entries:
+        if entry['assessment_count'] < 2:
+            continue
+        entry['improvement'] = round(entry['latest_percentage'] - entry['first_percentage'], 1)
+        entry['last_delta'] = round(entry['latest_percentage'] - entry['previous_percentage'], 1)
+        leaderboard.append(entry)
+    leaderboard.sort(key=lambda e: (-e['improvement'], -e['latest_percentage'], e['company_id']))
+    return leaderboard[:limit]
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def get_score_matrix(c, db_path):
+    """DB별 점수 캐시를 최신 상태로 갱신하여 반환"""
+    with _matrices_lock:
+        matrix = _matrices.setdefault(db_path, ScoreMatrix())
+    with matrix.lock:
+        matrix.refresh(c)
+    return matrix
+
+
+def drop_score_matrix(db_path):
+    """DB 경로의 점수 매트릭스 캐시 제거 (테넌트 DB를 닫을 때, 회사 업종/규모가 바뀌었을 때 사용)"""
+    with _matrices_lock:
+        _matrices.pop(db_path, None)
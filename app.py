@@ -1,28 +1,50 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, g, has_request_context
 import json
 from datetime import datetime
 import os
+import sqlite3
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 import io
 import tempfile
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from pathlib import Path
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 
 from config import Config
+from database import SnapshotStale, connect_db, drop_report_snapshots, get_report_snapshot
+import analytics
+import company_import
+import compression
+import events
+import excel_report
+import integrity
+import maintenance
+import metrics
+import offline_sync
+import pdf_report
+import question_bank
+import recommendations
+import query_log
+import report_model
+import search
+import tenants
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# 요청/SQL/템플릿/보고서 생성 시간 계측 (/metrics)
+metrics.init_app(app)
+
+# 느린 쿼리 로그 (EXPLAIN QUERY PLAN 포함)
+query_log.init_app(app)
+
+# 응답 압축(gzip/brotli), 정적 파일 지문 URL
+compression.init_app(app)
+
 # 한글 폰트 등록
 def register_korean_fonts():
     """한글 폰트를 ReportLab에 등록"""
@@ -81,14 +103,122 @@ def register_korean_fonts():
 # 한글 폰트 등록 실행
 KOREAN_FONT = register_korean_fonts()
 
+# 템플릿 사전 컴파일 (바이트코드 캐시 사용)
+def precompile_templates():
+    """모든 템플릿을 미리 컴파일하여 첫 요청 지연을 없앰"""
+    cache_dir = app.config['JINJA_BYTECODE_CACHE_DIR']
+    try:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        else:
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    except OSError as e:
+        print(f"템플릿 바이트코드 캐시를 사용할 수 없습니다: {e}")
+    
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+precompile_templates()
+
+# 데이터베이스 연결
+def current_db_path():
+    """현재 요청의 DB 경로 (테넌트 라우팅 사용 시 요청한 테넌트의 DB)"""
+    tenant = tenants.current_tenant() if has_request_context() else None
+    return tenant.db_path if tenant else app.config['DATABASE_PATH']
+
+def get_db_connection():
+    """운영 DB 연결 (쓰기 작업용, 테넌트 요청이면 테넌트 연결 풀에서 꺼냄)"""
+    tenant = tenants.current_tenant() if has_request_context() else None
+    if tenant:
+        return tenant.pool.acquire()
+    return connect_db(app.config['DATABASE_PATH'])
+
+def get_readonly_connection():
+    """운영 DB 읽기 전용 연결 (WAL 모드에서 쓰기 작업을 막지 않음)"""
+    tenant = tenants.current_tenant() if has_request_context() else None
+    if tenant:
+        return tenant.read_pool.acquire()
+    return connect_db(app.config['DATABASE_PATH'], readonly=True)
+
+def get_report_connection():
+    """보고서/조회용 DB 연결
+
+    REPORT_READ_MODE에 따라 WAL 읽기 전용 연결 또는 백업 스냅샷 연결을 반환하여
+    무거운 조회가 임시저장 쓰기를 막지 않도록 합니다.
+    스냅샷 모드에서는 요청 파라미터 max_staleness(초)로 허용 지연 시간을 줄일 수 있습니다.
+    """
+    mode = app.config['REPORT_READ_MODE']
+    db_path = current_db_path()
+
+    if mode == 'snapshot':
+        # 테넌트 DB는 항상 DB 파일 옆에 스냅샷을 둠 (REPORT_SNAPSHOT_PATH는 단일 DB용)
+        if db_path == app.config['DATABASE_PATH'] and app.config['REPORT_SNAPSHOT_PATH']:
+            snapshot_path = app.config['REPORT_SNAPSHOT_PATH']
+        else:
+            snapshot_path = db_path + '.snapshot'
+        snapshot = get_report_snapshot(db_path, snapshot_path, app.config['REPORT_SNAPSHOT_MAX_AGE'])
+        max_age = snapshot.max_age
+        requested = request.args.get('max_staleness', type=float) if has_request_context() else None
+        if requested is not None:
+            max_age = min(max(requested, 0), max_age)
+        try:
+            conn = snapshot.connect(max_age, timeout=app.config['REPORT_SNAPSHOT_WAIT'])
+            staleness = snapshot.age()
+        except SnapshotStale as e:
+            # 갱신이 늦어지면 오래된 스냅샷 대신 운영 DB를 읽기 전용으로 조회
+            app.logger.warning("보고서 스냅샷 갱신 지연, 운영 DB에서 조회합니다: %s", e)
+            conn = get_readonly_connection()
+            staleness = 0.0
+        if has_request_context():
+            g.report_staleness = staleness
+        return conn
+
+    if mode == 'wal':
+        return get_readonly_connection()
+
+    return get_db_connection()
+
+@app.after_request
+def add_staleness_header(response):
+    """스냅샷 조회 시 데이터 경과 시간을 응답 헤더로 노출"""
+    staleness = g.get('report_staleness')
+    if staleness is not None:
+        response.headers['X-Data-Staleness'] = f"{staleness:.1f}"
+    return response
+
+def get_assessment_results(c, assessment_id):
+    """평가에 고정된 문항 은행 카탈로그와 결과 목록 [(question_id, score, comment)]"""
+    c.execute("SELECT question_bank_version_id FROM assessments WHERE id = ?", (assessment_id,))
+    row = c.fetchone()
+    catalog = question_bank.get_catalog(c, current_db_path(), row[0] if row else None)
+    c.execute("SELECT question_id, score, comment FROM assessment_results WHERE assessment_id = ?",
+              (assessment_id,))
+    return catalog, c.fetchall()
+
+def get_assessment_benchmark(assessment_id):
+    """평가 1건의 전체/업종/규모 내 백분위 (점수 캐시는 운영 DB 기준으로 갱신)"""
+    conn = get_readonly_connection()
+    try:
+        matrix = analytics.get_score_matrix(conn.cursor(), current_db_path())
+    finally:
+        conn.close()
+    return matrix.assessment_benchmark(assessment_id)
+
 # 데이터베이스 초기화
-def init_db():
+def init_db(db_path=None):
+    """스키마 생성 및 마이그레이션 (db_path 미지정 시 현재 요청/설정의 DB)"""
+    db_path = db_path or current_db_path()
+    conn = None
     try:
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = connect_db(db_path)
         c = conn.cursor()
         
         print("데이터베이스 테이블 생성 중...")
         
+        # WAL 모드: 조회 연결이 쓰기 작업을 막지 않도록 설정
+        c.execute("PRAGMA journal_mode=WAL")
+        
         # 평가 영역 테이블
         c.execute('''CREATE TABLE IF NOT EXISTS categories (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -107,7 +237,7 @@ def init_db():
             description TEXT,
             max_score INTEGER DEFAULT 5,
             order_num INTEGER,
-            FOREIGN KEY (category_id) REFERENCES categories (id)
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE RESTRICT
         )''')
         
         # 문항 선택지 테이블
@@ -116,7 +246,7 @@ def init_db():
             question_id INTEGER,
             score INTEGER,
             description TEXT,
-            FOREIGN KEY (question_id) REFERENCES questions (id)
+            FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
         )''')
         
         # 회사 테이블
@@ -142,21 +272,20 @@ def init_db():
             status TEXT DEFAULT 'draft',
             last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             completion_percentage INTEGER DEFAULT 0,
-            FOREIGN KEY (company_id) REFERENCES companies (id)
+            FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE RESTRICT
         )''')
         
-        # 평가 상세 결과 테이블
+        # 평가 상세 결과 테이블 (question_id는 평가에 고정된 문항 은행 버전 기준이라 현재 문항을 참조하지 않음)
         c.execute('''CREATE TABLE IF NOT EXISTS assessment_results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             assessment_id INTEGER,
             question_id INTEGER,
             score INTEGER,
             comment TEXT,
-            FOREIGN KEY (assessment_id) REFERENCES assessments (id),
-            FOREIGN KEY (question_id) REFERENCES questions (id)
+            FOREIGN KEY (assessment_id) REFERENCES assessments (id) ON DELETE CASCADE
         )''')
         
-        # 평가 이력 추적 테이블
+        # 평가 이력 추적 테이블 (구버전: 이벤트 로그로 변환 후에는 기록하지 않음)
         c.execute('''CREATE TABLE IF NOT EXISTS assessment_history (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             assessment_id INTEGER,
@@ -166,7 +295,7 @@ def init_db():
             questions_answered INTEGER,
             total_questions INTEGER,
             notes TEXT,
-            FOREIGN KEY (assessment_id) REFERENCES assessments (id)
+            FOREIGN KEY (assessment_id) REFERENCES assessments (id) ON DELETE CASCADE
         )''')
         
         # 임시 저장 데이터 테이블
@@ -177,9 +306,33 @@ def init_db():
             score INTEGER,
             comment TEXT,
             saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (assessment_id) REFERENCES assessments (id),
-            FOREIGN KEY (question_id) REFERENCES questions (id)
+            FOREIGN KEY (assessment_id) REFERENCES assessments (id) ON DELETE CASCADE,
+            FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+        )''')
+        
+        # 완료 평가의 카테고리별 점수 (제출 시 저장, 벤치마킹 분석용, category_id는 평가 당시 문항 은행 기준)
+        c.execute('''CREATE TABLE IF NOT EXISTS assessment_category_scores (
+            assessment_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            score INTEGER,
+            max_score INTEGER,
+            PRIMARY KEY (assessment_id, category_id),
+            FOREIGN KEY (assessment_id) REFERENCES assessments (id) ON DELETE CASCADE
+        )''')
+        
+        # 문항 은행 버전 (문항/선택지/카테고리 변경 시 트리거로 증가)
+        c.execute('''CREATE TABLE IF NOT EXISTS question_bank_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
         )''')
+        c.execute("INSERT OR IGNORE INTO question_bank_meta (id, version) VALUES (1, 0)")
+        for table in ('categories', 'questions', 'question_options'):
+            for action in ('INSERT', 'UPDATE', 'DELETE'):
+                c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_{action.lower()}_bank_version
+                              AFTER {action} ON {table}
+                              BEGIN
+                                  UPDATE question_bank_meta SET version = version + 1 WHERE id = 1;
+                              END''')
         
         # 기존 테이블에 새 컬럼 추가
         c.execute("PRAGMA table_info(assessment_results)")
@@ -203,6 +356,66 @@ def init_db():
         if 'completion_percentage' not in existing_columns:
             c.execute("ALTER TABLE assessments ADD COLUMN completion_percentage INTEGER DEFAULT 0")
             print("assessments 테이블에 completion_percentage 컬럼 추가됨")
+            
+        if 'draft_version' not in existing_columns:
+            c.execute("ALTER TABLE assessments ADD COLUMN draft_version INTEGER DEFAULT 0")
+            print("assessments 테이블에 draft_version 컬럼 추가됨")
+        
+        # 회사 중복 확인용 정규화 키 (회사명/이메일)
+        backfilled_keys = company_import.create_schema(c)
+        if backfilled_keys > 0:
+            print(f"회사 {backfilled_keys}곳의 중복 확인 키 생성됨")
+        
+        # 회사별 평가 이력/추이 조회용 인덱스 (status 컬럼 추가 이후 생성)
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_assessments_company_status_date
+                     ON assessments (company_id, status, assessment_date)''')
+        
+        # 문항 은행 버전 (평가별 고정, 버전이 없는 기존 평가는 현재 문항 은행에 고정)
+        sorted_questions = question_bank.create_schema(c)
+        if sorted_questions > 0:
+            # 기존 문항은 코드 문자열 순서로 정렬되어 있었으므로 자연 정렬 순서로 한 번 다시 매김
+            maintenance.reorder_questions(c)
+            print(f"문항 {sorted_questions}개의 정렬 키 생성 후 순서 재설정됨")
+        pinned = question_bank.pin_unversioned(c, db_path)
+        if pinned > 0:
+            print(f"기존 평가 {pinned}건을 현재 문항 은행 버전에 고정함")
+        
+        # 평가 이벤트 로그 (기존 assessment_history 행은 한 번만 이벤트로 변환)
+        events.create_schema(c)
+        migrated = events.migrate_history(c)
+        if migrated > 0:
+            print(f"평가 이력 {migrated}건을 이벤트 로그로 변환함")
+        
+        # 전문 검색 색인 (FTS5) 및 동기화 트리거
+        search.create_schema(c)
+        
+        # 보고서 개선 권고 규칙 (규칙이 없으면 성숙도 레벨별 기본 권고사항 입력)
+        recommendations.create_schema(c)
+        
+        # 오프라인 동기화 작업 키 (보존 기간이 지난 키 정리)
+        offline_sync.create_schema(c)
+        offline_sync.prune(c)
+        
+        # 외래 키 정책(ON DELETE CASCADE/RESTRICT)이 다른 기존 테이블 재생성, 부모 행 삭제용 인덱스
+        rebuilt = integrity.migrate_foreign_keys(conn)
+        if rebuilt:
+            print(f"외래 키 정책 적용을 위해 테이블 재생성됨: {', '.join(rebuilt)}")
+            orphans = integrity.find_orphans(c)
+            if orphans:
+                print(f"고아 행이 남아 있습니다 (python integrity.py repair --include-restricted): "
+                      f"{', '.join(f'{table}.{column} {count}개' for table, column, _, _, count in orphans)}")
+        integrity.create_indexes(c)
+        
+        # 평가·문항당 답변 한 행, 회사당 임시저장 평가 한 건 (기존 DB는 중복 행을 한 번 정리)
+        duplicates = integrity.create_unique_indexes(c)
+        if duplicates:
+            print(f"중복 행 정리 후 고유 인덱스 생성됨: "
+                  f"{', '.join(f'{table} {count}행' for table, count in duplicates.items())}")
+        
+        # 카테고리 점수가 없는 기존 완료 평가 채우기
+        backfilled = analytics.backfill_category_scores(c)
+        if backfilled > 0:
+            print(f"카테고리 점수 {backfilled}행 생성됨")
         
         conn.commit()
         print("데이터베이스 테이블 생성 완료")
@@ -214,9 +427,10 @@ def init_db():
             conn.close()
 
 # 초기 데이터 삽입
-def insert_initial_data():
+def insert_initial_data(db_path=None):
+    conn = None
     try:
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = connect_db(db_path or current_db_path())
         c = conn.cursor()
         
         print("초기 데이터 확인 중...")
@@ -294,7 +508,8 @@ def insert_initial_data():
             (28, 4, '4.3.2', '투자 계획 및 예산 확보', '투자 계획 및 예산 확보 상태', 5, 7)
         ]
         
-            c.executemany("INSERT INTO questions (id, category_id, code, title, description, max_score, order_num) VALUES (?, ?, ?, ?, ?, ?, ?)", questions)
+            c.executemany("INSERT INTO questions (id, category_id, code, title, description, max_score, order_num, sort_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          [question + (question_bank.sort_key(question[2]),) for question in questions])
         
             # 문항별 선택지 삽입
             options_data = {
@@ -342,6 +557,18 @@ def insert_initial_data():
         if conn:
             conn.close()
 
+def drop_db_caches(db_path):
+    """DB 경로별 프로세스 캐시 정리 (테넌트 DB를 닫을 때 호출)"""
+    _question_bank_fragments.pop(db_path, None)
+    question_bank.drop_cache(db_path)
+    analytics.drop_score_matrix(db_path)
+    report_model.drop_cache(db_path)
+    recommendations.drop_cache(db_path)
+    drop_report_snapshots(db_path)
+
+# 멀티 테넌트 라우팅 (TENANT_MODE): 테넌트 DB는 처음 요청될 때 마이그레이션
+tenants.init_app(app, on_open=init_db, on_close=drop_db_caches)
+
 # 성숙도 레벨 계산
 def calculate_maturity_level(total_score):
     max_score = 140  # 28문항 × 5점
@@ -370,20 +597,20 @@ def index():
 
 @app.route('/companies')
 def companies():
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
-    c.execute('''SELECT c.*, 
-                        COUNT(a.id) as assessment_count,
-                        draft_assessments.draft_id,
-                        draft_assessments.completion_percentage
+    # 평가 수는 회사별로 먼저 집계하고, 임시저장 평가는 회사당 하나(고유 인덱스)라 조인해도 행이 늘지 않음
+    c.execute('''SELECT c.id, c.name, c.industry, c.size, c.contact_person, c.contact_email, c.created_date,
+                        COALESCE(counts.assessment_count, 0) as assessment_count,
+                        d.id as draft_id,
+                        d.completion_percentage
                  FROM companies c 
-                 LEFT JOIN assessments a ON c.id = a.company_id 
                  LEFT JOIN (
-                     SELECT company_id, id as draft_id, completion_percentage 
-                     FROM assessments 
-                     WHERE status = 'draft'
-                 ) draft_assessments ON c.id = draft_assessments.company_id
-                 GROUP BY c.id
+                     SELECT company_id, COUNT(*) as assessment_count
+                     FROM assessments
+                     GROUP BY company_id
+                 ) counts ON counts.company_id = c.id
+                 LEFT JOIN assessments d ON d.company_id = c.id AND d.status = 'draft'
                  ORDER BY c.created_date DESC''')
     companies_data = c.fetchall()
     conn.close()
@@ -392,28 +619,127 @@ def companies():
 @app.route('/company/new', methods=['GET', 'POST'])
 def new_company():
     if request.method == 'POST':
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
-        c.execute('''INSERT INTO companies (name, industry, size, contact_person, contact_email)
-                     VALUES (?, ?, ?, ?, ?)''',
+        c.execute('''INSERT INTO companies (name, industry, size, contact_person, contact_email, name_key, email_key)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)''',
                   (request.form['name'], request.form['industry'], request.form['size'],
-                   request.form['contact_person'], request.form['contact_email']))
+                   request.form['contact_person'], request.form['contact_email'],
+                   company_import.normalize_name(request.form['name']),
+                   company_import.normalize_email(request.form['contact_email'])))
         conn.commit()
         conn.close()
         flash('회사가 성공적으로 등록되었습니다.')
         return redirect(url_for('companies'))
     return render_template('company_form.html')
 
+@app.route('/companies/import', methods=['GET', 'POST'])
+def import_companies():
+    """Excel/CSV 파일로 회사 일괄 등록 (회사명/이메일이 같은 회사는 건너뛰거나 갱신)
+
+    결과는 행별 보고서로 표시하며, ?format=json이면 JSON으로 반환합니다.
+    """
+    wants_json = request.args.get('format') == 'json'
+    if request.method == 'GET':
+        return render_template('companies_import.html', results=None, counts=None,
+                               columns=company_import.HEADER_ALIASES)
+    
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        if wants_json:
+            return jsonify({'error': '파일이 선택되지 않았습니다.'}), 400
+        flash('파일이 선택되지 않았습니다.')
+        return redirect(url_for('import_companies'))
+    
+    update_existing = request.form.get('update_existing') == '1'
+    dry_run = request.form.get('dry_run') == '1'
+    conn = get_db_connection()
+    try:
+        rows = company_import.read_rows(file.stream, file.filename)
+        results, counts = company_import.import_companies(
+            conn, rows, update_existing=update_existing, dry_run=dry_run,
+            batch_size=app.config['COMPANY_IMPORT_BATCH_SIZE'], max_rows=app.config['COMPANY_IMPORT_MAX_ROWS'])
+    except Exception as e:
+        if wants_json:
+            return jsonify({'error': f'파일 처리 중 오류가 발생했습니다: {e}'}), 400
+        flash(f'파일 처리 중 오류가 발생했습니다: {str(e)}')
+        return redirect(url_for('import_companies'))
+    finally:
+        conn.close()
+        if update_existing and not dry_run:
+            # 갱신된 회사의 업종/규모가 점수 캐시의 벤치마킹 그룹에 반영되도록 다시 읽게 함 (일부 배치만 커밋된 경우 포함)
+            analytics.drop_score_matrix(current_db_path())
+    
+    if wants_json:
+        return jsonify({'dry_run': dry_run, 'counts': counts, 'results': results})
+    return render_template('companies_import.html', results=results, counts=counts, dry_run=dry_run,
+                           columns=company_import.HEADER_ALIASES)
+
+# 평가 폼 문항 은행 조각 캐시 {DB 경로: (문항 은행 버전, HTML)}
+_question_bank_fragments = {}
+
+def get_question_bank_version(c):
+    """현재 문항 은행 버전 조회"""
+    c.execute("SELECT version FROM question_bank_meta WHERE id = 1")
+    row = c.fetchone()
+    return row[0] if row else 0
+
+def render_question_bank_fragment(c):
+    """평가 폼의 카테고리/문항/선택지 HTML 조각 (문항 은행 버전이 같으면 캐시 사용)"""
+    db_path = current_db_path()
+    version = get_question_bank_version(c)
+    cached = _question_bank_fragments.get(db_path)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    # 카테고리별 질문
+    c.execute('''SELECT c.*, q.* FROM categories c
+                 LEFT JOIN questions q ON c.id = q.category_id
+                 ORDER BY c.order_num, c.id, q.sort_key, q.id''')
+    data = c.fetchall()
+    
+    # 질문별 선택지
+    c.execute('''SELECT qo.question_id, qo.score, qo.description 
+                 FROM question_options qo
+                 ORDER BY qo.question_id, qo.score''')
+    options_data = c.fetchall()
+    
+    # 데이터 구조화
+    categories = {}
+    options = {}
+    
+    for row in data:
+        cat_id = row[0]
+        if cat_id not in categories:
+            categories[cat_id] = {
+                'id': row[0], 'name': row[1], 'weight': row[2], 
+                'description': row[3], 'questions': []
+            }
+        if row[5]:  # question exists
+            categories[cat_id]['questions'].append({
+                'id': row[5], 'code': row[7], 'title': row[8], 'description': row[9]
+            })
+    
+    for option in options_data:
+        q_id = option[0]
+        if q_id not in options:
+            options[q_id] = []
+        options[q_id].append({'score': option[1], 'description': option[2]})
+    
+    html = Markup(render_template('assessment_form_questions.html', categories=categories, options=options))
+    _question_bank_fragments[db_path] = (version, html)
+    return html
+
 @app.route('/assessment/new/<int:company_id>')
 def new_assessment(company_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
     # URL에서 assessment_id 파라미터 확인 (계속하기용)
     assessment_id = request.args.get('assessment_id')
     
     if not assessment_id:
-        # 해당 회사의 기존 임시저장 평가 확인
+        # 해당 회사의 기존 임시저장 평가 확인 (회사당 하나)
         c.execute("SELECT id FROM assessments WHERE company_id = ? AND status = 'draft'", (company_id,))
         existing_draft = c.fetchone()
         
@@ -426,17 +752,8 @@ def new_assessment(company_id):
     c.execute("SELECT * FROM companies WHERE id = ?", (company_id,))
     company = c.fetchone()
     
-    # 카테고리별 질문
-    c.execute('''SELECT c.*, q.* FROM categories c
-                 LEFT JOIN questions q ON c.id = q.category_id
-                 ORDER BY c.order_num, q.order_num''')
-    data = c.fetchall()
-    
-    # 질문별 선택지
-    c.execute('''SELECT qo.question_id, qo.score, qo.description 
-                 FROM question_options qo
-                 ORDER BY qo.question_id, qo.score''')
-    options_data = c.fetchall()
+    # 문항 은행 영역 (버전별 캐시)
+    question_bank_html = render_question_bank_fragment(c)
     
     # 기존 임시저장 데이터 로드 (assessment_id가 있는 경우)
     existing_answers = {}
@@ -457,30 +774,8 @@ def new_assessment(company_id):
     
     conn.close()
     
-    # 데이터 구조화
-    categories = {}
-    options = {}
-    
-    for row in data:
-        cat_id = row[0]
-        if cat_id not in categories:
-            categories[cat_id] = {
-                'id': row[0], 'name': row[1], 'weight': row[2], 
-                'description': row[3], 'questions': []
-            }
-        if row[5]:  # question exists
-            categories[cat_id]['questions'].append({
-                'id': row[5], 'code': row[7], 'title': row[8], 'description': row[9]
-            })
-    
-    for option in options_data:
-        q_id = option[0]
-        if q_id not in options:
-            options[q_id] = []
-        options[q_id].append({'score': option[1], 'description': option[2]})
-    
     return render_template('assessment_form.html', company=company, 
-                         categories=categories, options=options,
+                         question_bank_html=question_bank_html,
                          existing_answers=existing_answers, 
                          existing_assessment=existing_assessment)
 
@@ -488,6 +783,7 @@ def new_assessment(company_id):
 @app.route('/assessment/save_draft', methods=['POST'])
 def save_draft():
     """평가 임시저장"""
+    conn = None
     try:
         data = request.get_json()
         company_id = data.get('company_id')
@@ -495,76 +791,264 @@ def save_draft():
         assessment_id = data.get('assessment_id')  # 기존 평가 ID (있는 경우)
         answers = data.get('answers', {})
         notes = data.get('notes', '')
+        version = data.get('version')  # 클라이언트가 알고 있는 임시저장 버전 (있는 경우)
         
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
+        total_questions = get_total_questions(c)
+        batch = events.EventBatch(c, assessor_name)
         
         # 새 평가인지 기존 평가 수정인지 확인
         if assessment_id:
             # 기존 평가 업데이트
-            c.execute("SELECT id FROM assessments WHERE id = ? AND status = 'draft'", (assessment_id,))
-            if not c.fetchone():
+            c.execute('''SELECT draft_version, notes, assessor_name FROM assessments
+                         WHERE id = ? AND status = 'draft' ''', (assessment_id,))
+            row = c.fetchone()
+            if not row:
                 return {'status': 'error', 'message': '수정할 수 없는 평가입니다.'}, 400
+            if version is not None and version != (row[0] or 0):
+                return draft_conflict_response(assessment_id)
+            previous_notes, previous_assessor = row[1] or '', row[2] or ''
+            previous_answers = get_draft_answers(c, assessment_id)
         else:
-            # 새 평가 생성
+            # 새 평가 생성 (회사당 임시저장 평가는 하나)
             c.execute('''INSERT INTO assessments (company_id, assessor_name, notes, status, 
                          last_modified, completion_percentage)
-                         VALUES (?, ?, ?, 'draft', CURRENT_TIMESTAMP, ?)''',
+                         VALUES (?, ?, ?, 'draft', CURRENT_TIMESTAMP, ?)
+                         ON CONFLICT (company_id) WHERE status = 'draft' DO NOTHING''',
                       (company_id, assessor_name, notes, 0))
+            if c.rowcount == 0:
+                # 다른 창/기기에서 먼저 시작한 임시저장 평가가 있음 → 충돌 응답으로 그 평가를 알려줌
+                c.execute("SELECT id FROM assessments WHERE company_id = ? AND status = 'draft'", (company_id,))
+                existing_id = c.fetchone()[0]
+                return draft_conflict_response(existing_id)
             assessment_id = c.lastrowid
-            
-            # 평가 이력 추가
-            c.execute('''INSERT INTO assessment_history (assessment_id, action_type, user_info,
-                         questions_answered, total_questions, notes)
-                         VALUES (?, 'created', ?, 0, 28, '평가 시작')''',
-                      (assessment_id, assessor_name))
+            question_bank.pin_assessment(c, current_db_path(), assessment_id)
+            batch.append(assessment_id, events.CREATED, [company_id, total_questions])
+            previous_notes, previous_assessor = '', assessor_name or ''
+            previous_answers = {}
         
-        # 기존 임시저장 데이터 삭제
-        c.execute("DELETE FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
-        
-        # 새 임시저장 데이터 삽입
-        questions_answered = 0
+        # 임시저장 답변 갱신 (보낸 답변은 upsert, 빠진 문항의 답변은 삭제)
+        saved_answers = {}
         for question_id, answer_data in answers.items():
             if answer_data.get('score'):
-                score = answer_data.get('score')
-                comment = answer_data.get('comment', '')
-                c.execute('''INSERT INTO assessment_drafts (assessment_id, question_id, score, comment)
-                             VALUES (?, ?, ?, ?)''', (assessment_id, question_id, score, comment))
-                questions_answered += 1
+                saved_answers[int(question_id)] = (int(answer_data.get('score')), answer_data.get('comment', '') or '')
+        upsert_draft_answers(c, assessment_id, saved_answers.items())
+        c.execute(f'''DELETE FROM assessment_drafts WHERE assessment_id = ?
+                      AND question_id NOT IN ({', '.join('?' * len(saved_answers))})''',
+                  (assessment_id, *saved_answers))
+        questions_answered = len(saved_answers)
         
         # 진행률 계산 및 업데이트
-        completion_percentage = int((questions_answered / 28) * 100)
+        completion_percentage = int((questions_answered / total_questions) * 100) if total_questions else 0
         c.execute('''UPDATE assessments SET completion_percentage = ?, last_modified = CURRENT_TIMESTAMP,
-                     notes = ?, assessor_name = ? WHERE id = ?''', (completion_percentage, notes, assessor_name or '', assessment_id))
-        
-        # 이력 추가
-        c.execute('''INSERT INTO assessment_history (assessment_id, action_type, user_info,
-                     questions_answered, total_questions, notes)
-                     VALUES (?, 'saved_draft', ?, ?, 28, '임시저장')''',
-                  (assessment_id, assessor_name, questions_answered))
+                     notes = ?, assessor_name = ?, draft_version = COALESCE(draft_version, 0) + 1
+                     WHERE id = ?''', (completion_percentage, notes, assessor_name or '', assessment_id))
+        c.execute("SELECT draft_version FROM assessments WHERE id = ?", (assessment_id,))
+        new_version = c.fetchone()[0]
+        
+        # 이벤트 기록
+        events.answers_diff(batch, assessment_id, previous_answers, saved_answers)
+        if (notes or '') != previous_notes:
+            batch.append(assessment_id, events.NOTES_CHANGED, [notes or ''])
+        if (assessor_name or '') != previous_assessor:
+            batch.append(assessment_id, events.ASSESSOR_CHANGED, [assessor_name or ''])
+        batch.append(assessment_id, events.DRAFT_SAVED, [questions_answered, total_questions, new_version])
+        batch.flush()
         
         conn.commit()
-        conn.close()
         
         return {
             'status': 'success', 
             'assessment_id': assessment_id,
+            'version': new_version,
+            'completion_percentage': completion_percentage,
+            'message': f'임시저장 완료 ({questions_answered}/{total_questions} 문항)'
+        }
+
+    except sqlite3.IntegrityError:
+        # 없는 회사/문항 ID (외래 키 위반)
+        return {'status': 'error', 'message': '존재하지 않는 회사 또는 문항입니다.'}, 400
+    except Exception as e:
+        return {'status': 'error', 'message': str(e)}, 500
+    finally:
+        # 오류/충돌로 일찍 반환한 경우에도 연결 정리 (커밋하지 않은 변경은 롤백)
+        if conn is not None:
+            conn.close()
+
+def get_total_questions(c):
+    """전체 문항 수"""
+    c.execute("SELECT COUNT(*) FROM questions")
+    return c.fetchone()[0]
+
+def upsert_draft_answers(c, assessment_id, answers):
+    """임시저장 답변 저장 (answers: [(question_id, (score, comment))], 평가·문항당 한 행)"""
+    c.executemany('''INSERT INTO assessment_drafts (assessment_id, question_id, score, comment)
+                     VALUES (?, ?, ?, ?)
+                     ON CONFLICT (assessment_id, question_id)
+                     DO UPDATE SET score = excluded.score, comment = excluded.comment, saved_at = CURRENT_TIMESTAMP''',
+                  [(assessment_id, question_id, score, comment) for question_id, (score, comment) in answers])
+
+def get_draft_answers(c, assessment_id):
+    """임시저장된 답변 {question_id: (score, comment)}"""
+    c.execute("SELECT question_id, score, comment FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
+    return {q_id: (score, comment or '') for q_id, score, comment in c.fetchall()}
+
+def draft_conflict_response(assessment_id):
+    """버전 충돌 응답 (서버의 현재 임시저장 상태 포함)"""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute("SELECT draft_version, notes, assessor_name FROM assessments WHERE id = ?", (assessment_id,))
+    row = c.fetchone()
+    c.execute("SELECT question_id, score, comment FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
+    answers = {str(q_id): {'score': score, 'comment': comment or ''} for q_id, score, comment in c.fetchall()}
+    conn.close()
+    return {
+        'status': 'conflict',
+        'message': '다른 창에서 이 평가가 먼저 저장되었습니다.',
+        'assessment_id': assessment_id,
+        'version': row[0] if row else None,
+        'answers': answers,
+        'notes': row[1] if row else '',
+        'assessor_name': row[2] if row else ''
+    }, 409
+
+@app.route('/assessment/<int:assessment_id>/sync_draft', methods=['POST'])
+def sync_draft(assessment_id):
+    """변경된 답변만 반영하는 임시저장 (버전 기반 낙관적 동시성 제어)
+
+    요청 형식: {"version": 3, "changes": {"12": [4, "의견"], "13": null}, "notes": "...", "assessor_name": "..."}
+    changes의 값이 null이면 해당 문항의 답변을 삭제합니다.
+    notes/assessor_name은 변경된 경우에만 포함합니다.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {'status': 'error', 'message': '요청 형식이 잘못되었습니다.'}, 400
+    version = data.get('version')
+    changes = data.get('changes', {})
+    # version이 null이면(알 수 없는 버전) 아래에서 충돌 응답으로 서버 상태를 다시 받게 함
+    if (version is not None and (not isinstance(version, int) or isinstance(version, bool))) \
+            or not isinstance(changes, dict):
+        return {'status': 'error', 'message': 'version은 정수, changes는 문항 ID별 변경이어야 합니다.'}, 400
+    try:
+        # 오프라인 동기화와 같은 형식/점수 범위(1~5) 검사
+        parsed = [offline_sync.parse_change(question_id, change) for question_id, change in changes.items()]
+    except (TypeError, ValueError) as e:
+        return {'status': 'error', 'message': str(e)}, 400
+    
+    conn = None
+    try:
+        conn = get_db_connection()
+        c = conn.cursor()
+        
+        # 버전이 일치할 때만 버전 증가 (일치하지 않으면 다른 창에서 먼저 저장한 것)
+        c.execute('''UPDATE assessments SET draft_version = COALESCE(draft_version, 0) + 1,
+                     last_modified = CURRENT_TIMESTAMP
+                     WHERE id = ? AND status = 'draft' AND COALESCE(draft_version, 0) = ?''',
+                  (assessment_id, version))
+        if c.rowcount == 0:
+            c.execute("SELECT status FROM assessments WHERE id = ?", (assessment_id,))
+            row = c.fetchone()
+            if not row or row[0] != 'draft':
+                return {'status': 'error', 'message': '수정할 수 없는 평가입니다.'}, 400
+            return draft_conflict_response(assessment_id)
+        
+        c.execute("SELECT assessor_name FROM assessments WHERE id = ?", (assessment_id,))
+        batch = events.EventBatch(c, data.get('assessor_name', c.fetchone()[0]))
+        
+        for question_id, score, comment in parsed:
+            if score is not None:
+                upsert_draft_answers(c, assessment_id, [(question_id, (score, comment))])
+                batch.append(assessment_id, events.ANSWER_CHANGED, [question_id, score, comment])
+            else:
+                c.execute("DELETE FROM assessment_drafts WHERE assessment_id = ? AND question_id = ?",
+                          (assessment_id, question_id))
+                batch.append(assessment_id, events.ANSWER_CLEARED, [question_id])
+        
+        if 'notes' in data:
+            c.execute("UPDATE assessments SET notes = ? WHERE id = ?", (data['notes'], assessment_id))
+            batch.append(assessment_id, events.NOTES_CHANGED, [data['notes'] or ''])
+        if 'assessor_name' in data:
+            c.execute("UPDATE assessments SET assessor_name = ? WHERE id = ?", (data['assessor_name'], assessment_id))
+            batch.append(assessment_id, events.ASSESSOR_CHANGED, [data['assessor_name'] or ''])
+        
+        # 진행률 갱신
+        total_questions = get_total_questions(c)
+        c.execute("SELECT COUNT(*) FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
+        questions_answered = c.fetchone()[0]
+        completion_percentage = int((questions_answered / total_questions) * 100) if total_questions else 0
+        c.execute("UPDATE assessments SET completion_percentage = ? WHERE id = ?",
+                  (completion_percentage, assessment_id))
+        
+        batch.append(assessment_id, events.DRAFT_SAVED, [questions_answered, total_questions, version + 1])
+        batch.flush()
+        
+        conn.commit()
+        
+        return {
+            'status': 'success',
+            'assessment_id': assessment_id,
+            'version': version + 1,
             'completion_percentage': completion_percentage,
-            'message': f'임시저장 완료 ({questions_answered}/28 문항)'
+            'message': f'자동저장 완료 ({questions_answered}/{total_questions} 문항)'
         }
         
+    except sqlite3.IntegrityError:
+        # 없는 문항 ID (외래 키 위반)
+        return {'status': 'error', 'message': '존재하지 않는 문항입니다.'}, 400
+    except Exception as e:
+        return {'status': 'error', 'message': str(e)}, 500
+    finally:
+        # 충돌/오류로 일찍 반환한 경우에도 연결 정리 (커밋하지 않은 변경은 롤백)
+        if conn is not None:
+            conn.close()
+
+@app.route('/api/sync', methods=['POST'])
+def sync_offline():
+    """오프라인에서 쌓인 답변 변경을 여러 평가에 걸쳐 한 트랜잭션으로 반영
+
+    요청 형식: {"ops": [작업, ...]} (Content-Encoding: gzip 가능, 작업 형식은 offline_sync.apply_ops 참고)
+    작업마다 클라이언트가 만든 key로 중복 적용을 막으므로, 응답을 받지 못한 요청은 그대로 다시 보내면 됩니다.
+    """
+    try:
+        data = offline_sync.read_payload(request)
+    except (OSError, ValueError) as e:
+        return {'status': 'error', 'message': f'요청 본문을 읽을 수 없습니다: {e}'}, 400
+    ops = data.get('ops') or []
+    if len(ops) > offline_sync.MAX_OPS:
+        return {'status': 'error', 'message': f'한 번에 최대 {offline_sync.MAX_OPS}개까지 보낼 수 있습니다.'}, 413
+    
+    conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        results = offline_sync.apply_ops(c, ops, current_db_path())
+        conn.commit()
     except Exception as e:
+        conn.rollback()
         return {'status': 'error', 'message': str(e)}, 500
+    finally:
+        conn.close()
+    return {'status': 'success', 'results': results}
+
+@app.route('/sw.js')
+def service_worker():
+    """오프라인 입력용 서비스 워커 (사이트 전체 범위로 등록하기 위해 루트 경로에서 제공)"""
+    response = make_response(send_file(os.path.join(app.static_folder, 'sw.js'), mimetype='application/javascript'))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/assessment/load_draft/<int:assessment_id>')
 def load_draft(assessment_id):
     """임시저장된 평가 불러오기"""
     try:
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
         
         # 평가 정보 확인
-        c.execute('''SELECT * FROM assessments WHERE id = ? AND status = 'draft' ''', (assessment_id,))
+        c.execute('''SELECT id, company_id, assessor_name, assessment_date, total_score, maturity_level,
+                            notes, status, last_modified, completion_percentage, draft_version
+                     FROM assessments WHERE id = ? AND status = 'draft' ''', (assessment_id,))
         assessment = c.fetchone()
         
         if not assessment:
@@ -591,7 +1075,8 @@ def load_draft(assessment_id):
             'answers': answers,
             'notes': assessment[6] or '',
             'assessor_name': assessment[2] or '',
-            'completion_percentage': assessment[9] or 0
+            'completion_percentage': assessment[9] or 0,
+            'version': assessment[10] or 0
         }
         
     except Exception as e:
@@ -601,11 +1086,11 @@ def load_draft(assessment_id):
 def delete_draft(assessment_id):
     """임시저장된 평가 삭제"""
     try:
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
         
         # draft 상태인지 확인
-        c.execute("SELECT status FROM assessments WHERE id = ?", (assessment_id,))
+        c.execute("SELECT status, assessor_name FROM assessments WHERE id = ?", (assessment_id,))
         result = c.fetchone()
         
         if not result:
@@ -614,10 +1099,11 @@ def delete_draft(assessment_id):
         if result[0] != 'draft':
             return {'status': 'error', 'message': '완료된 평가는 삭제할 수 없습니다.'}, 400
         
-        # 관련 데이터 모두 삭제
-        c.execute("DELETE FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
-        c.execute("DELETE FROM assessment_history WHERE assessment_id = ?", (assessment_id,))
+        # 평가 삭제 (임시저장 답변 등은 ON DELETE CASCADE로 함께 삭제, 이벤트 로그는 보존하고 삭제 이벤트 추가)
         c.execute("DELETE FROM assessments WHERE id = ?", (assessment_id,))
+        batch = events.EventBatch(c, result[1])
+        batch.append(assessment_id, events.DRAFT_DELETED)
+        batch.flush()
         
         conn.commit()
         conn.close()
@@ -630,7 +1116,7 @@ def delete_draft(assessment_id):
 @app.route('/assessment/continue/<int:assessment_id>')
 def continue_assessment(assessment_id):
     """임시저장된 평가 계속하기"""
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
     # 평가 정보와 회사 정보 조회
@@ -680,12 +1166,18 @@ def submit_assessment():
     maturity_level = calculate_maturity_level(total_score)
     
     # 데이터베이스 저장
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
+    total_questions = get_total_questions(c)
+    batch = events.EventBatch(c, assessor_name)
     
     if assessment_id and assessment_id.isdigit():
         # 기존 임시저장을 완료로 업데이트
         assessment_id = int(assessment_id)
+        c.execute("SELECT notes, assessor_name FROM assessments WHERE id = ?", (assessment_id,))
+        previous = c.fetchone() or ('', '')
+        previous_notes, previous_assessor = previous[0] or '', previous[1] or ''
+        previous_answers = get_draft_answers(c, assessment_id)
         c.execute('''UPDATE assessments SET total_score = ?, maturity_level = ?, notes = ?,
                      status = 'completed', last_modified = CURRENT_TIMESTAMP, completion_percentage = 100,
                      assessor_name = ? WHERE id = ?''',
@@ -693,12 +1185,6 @@ def submit_assessment():
         
         # 기존 임시저장 데이터 삭제
         c.execute("DELETE FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
-        
-        # 이력 추가
-        c.execute('''INSERT INTO assessment_history (assessment_id, action_type, user_info,
-                     questions_answered, total_questions, notes)
-                     VALUES (?, 'completed', ?, 28, 28, '평가 완료')''',
-                  (assessment_id, assessor_name))
     else:
         # 새 평가 생성 (완료 상태로)
         c.execute('''INSERT INTO assessments (company_id, assessor_name, total_score, maturity_level, notes,
@@ -706,18 +1192,34 @@ def submit_assessment():
                      VALUES (?, ?, ?, ?, ?, 'completed', 100, CURRENT_TIMESTAMP)''',
                   (company_id, assessor_name, total_score, maturity_level, notes))
         assessment_id = c.lastrowid
-        
-        # 이력 추가
-        c.execute('''INSERT INTO assessment_history (assessment_id, action_type, user_info,
-                     questions_answered, total_questions, notes)
-                     VALUES (?, 'completed', ?, 28, 28, '평가 완료')''',
-                  (assessment_id, assessor_name))
-    
-    # 상세 결과 저장 (기존 데이터 삭제 후 재삽입)
-    c.execute("DELETE FROM assessment_results WHERE assessment_id = ?", (assessment_id,))
-    for question_id, score, comment in results:
-        c.execute('''INSERT INTO assessment_results (assessment_id, question_id, score, comment)
-                     VALUES (?, ?, ?, ?)''', (assessment_id, question_id, score, comment))
+        batch.append(assessment_id, events.CREATED, [int(company_id), total_questions])
+        previous_notes, previous_assessor, previous_answers = '', assessor_name or '', {}
+    
+    # 상세 결과 저장 (평가·문항당 한 행, 제출에 없는 문항의 기존 결과는 삭제)
+    c.executemany('''INSERT INTO assessment_results (assessment_id, question_id, score, comment)
+                     VALUES (?, ?, ?, ?)
+                     ON CONFLICT (assessment_id, question_id)
+                     DO UPDATE SET score = excluded.score, comment = excluded.comment''',
+                  [(assessment_id, question_id, score, comment) for question_id, score, comment in results])
+    c.execute(f'''DELETE FROM assessment_results WHERE assessment_id = ?
+                  AND question_id NOT IN ({', '.join('?' * len(results))})''',
+              (assessment_id, *(question_id for question_id, _, _ in results)))
+    
+    # 제출 시점의 문항 은행 버전에 고정
+    question_bank.pin_assessment(c, current_db_path(), assessment_id)
+    
+    # 벤치마킹용 카테고리 점수 저장
+    analytics.materialize_category_scores(c, assessment_id)
+    
+    # 이벤트 기록 (제출 시 스냅샷 생성)
+    events.answers_diff(batch, assessment_id, previous_answers,
+                        {question_id: (score, comment) for question_id, score, comment in results})
+    if notes != previous_notes:
+        batch.append(assessment_id, events.NOTES_CHANGED, [notes])
+    if assessor_name != previous_assessor:
+        batch.append(assessment_id, events.ASSESSOR_CHANGED, [assessor_name])
+    batch.append(assessment_id, events.SUBMITTED, [total_score, maturity_level, len(results), total_questions])
+    batch.flush()
     
     conn.commit()
     conn.close()
@@ -727,43 +1229,38 @@ def submit_assessment():
 
 @app.route('/assessment/<int:assessment_id>')
 def assessment_detail(assessment_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
     # 평가 기본 정보
-    c.execute('''SELECT a.*, c.name as company_name FROM assessments a
+    c.execute('''SELECT a.id, a.company_id, a.assessor_name, a.assessment_date, a.total_score,
+                        a.maturity_level, a.notes, a.status, c.name as company_name
+                 FROM assessments a
                  JOIN companies c ON a.company_id = c.id
                  WHERE a.id = ?''', (assessment_id,))
     assessment = c.fetchone()
     
-    # 카테고리별 점수
-    c.execute('''SELECT cat.id, cat.name, cat.weight, SUM(ar.score) as category_score,
-                        COUNT(ar.score) * 5 as max_category_score
-                 FROM categories cat
-                 JOIN questions q ON cat.id = q.category_id
-                 JOIN assessment_results ar ON q.id = ar.question_id
-                 WHERE ar.assessment_id = ?
-                 GROUP BY cat.id, cat.name, cat.weight
-                 ORDER BY cat.order_num''', (assessment_id,))
-    category_scores = c.fetchall()
-    
-    # 상세 결과
-    c.execute('''SELECT q.code, q.title, ar.score, qo.description, ar.comment
-                 FROM assessment_results ar
-                 JOIN questions q ON ar.question_id = q.id
-                 JOIN question_options qo ON q.id = qo.question_id AND ar.score = qo.score
-                 WHERE ar.assessment_id = ?
-                 ORDER BY q.category_id, q.order_num''', (assessment_id,))
-    detailed_results = c.fetchall()
+    # 평가에 고정된 문항 은행 버전 기준 카테고리별 점수/상세 결과
+    catalog, results = get_assessment_results(c, assessment_id)
+    category_scores = catalog.category_scores(results)
+    detailed_results = [(question['code'], question['title'], score,
+                         catalog.option(question['id'], score) or '', comment)
+                        for question, category, score, comment in catalog.ordered_results(results)]
     
     conn.close()
     
+    # 업종/규모 내 백분위
+    benchmark = None
+    if assessment and assessment[7] == 'completed':
+        benchmark = get_assessment_benchmark(assessment_id)
+    
     return render_template('assessment_detail.html', assessment=assessment,
-                         category_scores=category_scores, detailed_results=detailed_results)
+                         category_scores=category_scores, detailed_results=detailed_results,
+                         benchmark=benchmark)
 
 @app.route('/assessments')
 def assessments():
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_report_connection()
     c = conn.cursor()
     c.execute('''SELECT a.id, c.name as company_name, a.assessor_name, 
                         a.assessment_date, a.total_score, a.maturity_level,
@@ -778,7 +1275,7 @@ def assessments():
 @app.route('/assessment_history')
 def assessment_history():
     """평가 이력 관리 페이지"""
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_report_connection()
     c = conn.cursor()
     
     # 전체 평가 통계
@@ -801,22 +1298,8 @@ def assessment_history():
                  ORDER BY last_activity DESC''')
     assessor_stats = c.fetchall()
     
-    # 최근 활동 이력
-    c.execute('''SELECT 
-                   h.action_timestamp,
-                   h.action_type,
-                   h.user_info,
-                   c.name as company_name,
-                   h.questions_answered,
-                   h.total_questions,
-                   h.notes,
-                   a.id as assessment_id
-                 FROM assessment_history h
-                 JOIN assessments a ON h.assessment_id = a.id
-                 JOIN companies c ON a.company_id = c.id
-                 ORDER BY h.action_timestamp DESC
-                 LIMIT 50''')
-    recent_activities = c.fetchall()
+    # 최근 활동 이력 (이벤트 로그 기준)
+    recent_activities = events.recent_activities(c, 50)
     
     # 월별 완료 통계 (최근 6개월)
     c.execute('''SELECT 
@@ -837,46 +1320,131 @@ def assessment_history():
                          recent_activities=recent_activities,
                          monthly_stats=monthly_stats)
 
-@app.route('/api/assessment/<int:assessment_id>/chart')
-def assessment_chart_data(assessment_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+@app.route('/api/assessment/<int:assessment_id>/events')
+def assessment_events(assessment_id):
+    """평가의 전체 변경 이벤트 (감사 기록)"""
+    conn = get_report_connection()
     c = conn.cursor()
+    event_list = events.assessment_events(c, assessment_id)
+    conn.close()
     
-    c.execute('''SELECT cat.name, SUM(ar.score) as score, COUNT(ar.score) * 5 as max_score
-                 FROM categories cat
-                 JOIN questions q ON cat.id = q.category_id
-                 JOIN assessment_results ar ON q.id = ar.question_id
-                 WHERE ar.assessment_id = ?
-                 GROUP BY cat.id, cat.name
-                 ORDER BY cat.order_num''', (assessment_id,))
+    if not event_list:
+        return jsonify({'error': 'No data found'}), 404
+    return jsonify({'assessment_id': assessment_id, 'events': event_list})
+
+@app.route('/api/assessment/<int:assessment_id>/state')
+def assessment_state(assessment_id):
+    """이벤트 로그로 재구성한 평가 상태 (at=시점 'YYYY-MM-DD HH:MM:SS' UTC, 없으면 현재)"""
+    conn = get_report_connection()
+    c = conn.cursor()
+    try:
+        state = events.rebuild_state(c, assessment_id, at=request.args.get('at'))
+    except ValueError:
+        conn.close()
+        return jsonify({'error': 'at 형식이 올바르지 않습니다'}), 400
+    conn.close()
     
-    data = c.fetchall()
+    if state['event_id'] == 0:
+        return jsonify({'error': 'No data found'}), 404
+    return jsonify(state)
+
+@app.route('/api/assessment/<int:assessment_id>/chart')
+def assessment_chart_data(assessment_id):
+    conn = get_db_connection()
+    c = conn.cursor()
+    catalog, results = get_assessment_results(c, assessment_id)
     conn.close()
     
+    data = catalog.category_scores(results)
     chart_data = {
-        'categories': [row[0] for row in data],
-        'scores': [row[1] for row in data],
-        'maxScores': [row[2] for row in data],
-        'percentages': [round((row[1]/row[2])*100, 1) for row in data]
+        'categoryIds': [row[0] for row in data],
+        'categories': [row[1] for row in data],
+        'scores': [row[3] for row in data],
+        'maxScores': [row[4] for row in data],
+        'percentages': [round((row[3]/row[4])*100, 1) for row in data]
     }
     
     return jsonify(chart_data)
 
-@app.route('/api/assessment/<int:assessment_id>/category/<int:category_id>/detail')
-def assessment_category_detail(assessment_id, category_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+@app.route('/api/assessment/<int:assessment_id>/benchmark')
+def assessment_benchmark_data(assessment_id):
+    """평가 1건의 전체/업종/규모 내 백분위"""
+    benchmark = get_assessment_benchmark(assessment_id)
+    if benchmark is None:
+        return jsonify({'error': 'No data found'}), 404
+    return jsonify(benchmark)
+
+@app.route('/api/benchmark/summary')
+def benchmark_summary():
+    """업종/규모별 점수 분포 요약 (dimension=all|industry|size)"""
+    dimension = request.args.get('dimension', 'industry')
+    if dimension not in analytics.DIMENSIONS:
+        return jsonify({'error': f'dimension은 {", ".join(analytics.DIMENSIONS)} 중 하나여야 합니다'}), 400
+    
+    conn = get_readonly_connection()
+    try:
+        matrix = analytics.get_score_matrix(conn.cursor(), current_db_path())
+    finally:
+        conn.close()
+    
+    return jsonify({'dimension': dimension, 'groups': matrix.summary(dimension)})
+
+@app.route('/company/<int:company_id>/trend')
+def company_trend(company_id):
+    """회사의 반복 평가 추이 페이지"""
+    conn = get_report_connection()
     c = conn.cursor()
+    c.execute("SELECT id, name, industry, size FROM companies WHERE id = ?", (company_id,))
+    company = c.fetchone()
+    if not company:
+        conn.close()
+        flash('회사를 찾을 수 없습니다.')
+        return redirect(url_for('companies'))
     
-    c.execute('''SELECT q.title, ar.score, cat.name as category_name
-                 FROM questions q
-                 JOIN assessment_results ar ON q.id = ar.question_id
-                 JOIN categories cat ON q.category_id = cat.id
-                 WHERE ar.assessment_id = ? AND q.category_id = ?
-                 ORDER BY q.order_num''', (assessment_id, category_id))
+    trend = analytics.company_trend(c, current_db_path(), company_id)
+    conn.close()
     
-    data = c.fetchall()
+    return render_template('company_trend.html', company=company, trend=trend)
+
+@app.route('/api/company/<int:company_id>/trend')
+def company_trend_data(company_id):
+    """회사의 총점/카테고리/문항별 점수 이력과 변화량"""
+    conn = get_report_connection()
+    c = conn.cursor()
+    trend = analytics.company_trend(c, current_db_path(), company_id)
     conn.close()
     
+    if not trend['assessments']:
+        return jsonify({'error': 'No data found'}), 404
+    return jsonify(trend)
+
+@app.route('/api/leaderboard/improvement')
+def improvement_leaderboard():
+    """전체 회사의 개선폭 순위 (industry, size, category_id, limit 필터)"""
+    limit = min(max(request.args.get('limit', analytics.LEADERBOARD_LIMIT, type=int), 1),
+                analytics.LEADERBOARD_MAX_LIMIT)
+    conn = get_report_connection()
+    c = conn.cursor()
+    leaderboard = analytics.improvement_leaderboard(
+        c, limit=limit,
+        industry=request.args.get('industry'),
+        size=request.args.get('size'),
+        category_id=request.args.get('category_id', type=int))
+    conn.close()
+    
+    return jsonify({'leaderboard': leaderboard})
+
+@app.route('/api/assessment/<int:assessment_id>/category/<int:category_id>/detail')
+def assessment_category_detail(assessment_id, category_id):
+    conn = get_db_connection()
+    c = conn.cursor()
+    catalog, results = get_assessment_results(c, assessment_id)
+    conn.close()
+    
+    data = [(question['title'], score, category['name'])
+            for question, category, score, comment in catalog.ordered_results(results)
+            if category and category['id'] == category_id]
+    
     if not data:
         return jsonify({'error': 'No data found'}), 404
     
@@ -890,29 +1458,61 @@ def assessment_category_detail(assessment_id, category_id):
     
     return jsonify(detail_data)
 
+@app.route('/search')
+def search_page():
+    """회사/문항/평가 의견 통합 검색 페이지"""
+    query = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'companies')
+    if search_type not in search.SEARCH_TYPES:
+        search_type = 'companies'
+    
+    conn = get_report_connection()
+    c = conn.cursor()
+    results = search.search(c, query, search_type, page=request.args.get('page', 1, type=int))
+    conn.close()
+    
+    return render_template('search.html', results=results, search_types=search.SEARCH_TYPES)
+
+@app.route('/api/search')
+def search_api():
+    """검색 API (q, type=companies|questions|comments, page, per_page)"""
+    search_type = request.args.get('type', 'companies')
+    if search_type not in search.SEARCH_TYPES:
+        return jsonify({'error': f'type은 {", ".join(search.SEARCH_TYPES)} 중 하나여야 합니다'}), 400
+    
+    conn = get_report_connection()
+    c = conn.cursor()
+    results = search.search(c, request.args.get('q', '').strip(), search_type,
+                            page=request.args.get('page', 1, type=int),
+                            per_page=request.args.get('per_page', search.DEFAULT_PER_PAGE, type=int))
+    conn.close()
+    
+    return jsonify(results)
+
 @app.route('/questions')
 def questions():
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     c.execute('''SELECT q.id, c.name as category_name, q.code, q.title, q.description
                  FROM questions q
                  JOIN categories c ON q.category_id = c.id
-                 ORDER BY c.order_num, q.order_num''')
+                 ORDER BY c.order_num, c.id, q.sort_key, q.id''')
     questions_data = c.fetchall()
     conn.close()
     return render_template('questions.html', questions=questions_data)
 
 @app.route('/question/<int:question_id>/edit', methods=['GET', 'POST'])
 def edit_question(question_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
     if request.method == 'POST':
         # 문항 정보 업데이트
-        c.execute('''UPDATE questions SET code = ?, title = ?, description = ? 
+        c.execute('''UPDATE questions SET code = ?, title = ?, description = ?, sort_key = ?
                      WHERE id = ?''',
                   (request.form['code'], request.form['title'], 
-                   request.form['description'], question_id))
+                   request.form['description'], question_bank.sort_key(request.form['code']), question_id))
+        maintenance.reorder_questions(c)
         
         # 선택지 업데이트
         for score in range(1, 6):
@@ -921,6 +1521,10 @@ def edit_question(question_id):
                          WHERE question_id = ? AND score = ?''',
                       (option_desc, question_id, score))
         
+        batch = events.EventBatch(c)
+        batch.append(None, events.QUESTION_EDITED, [question_id, request.form['code'], request.form['title']])
+        batch.flush()
+        
         conn.commit()
         conn.close()
         flash('문항이 성공적으로 수정되었습니다.')
@@ -928,7 +1532,8 @@ def edit_question(question_id):
     
     # GET 요청 - 수정 폼 표시
     # 문항 정보 조회
-    c.execute('''SELECT q.*, c.name as category_name, c.id as category_id
+    c.execute('''SELECT q.id, q.category_id, q.code, q.title, q.description, q.max_score, q.order_num,
+                        c.name as category_name, c.id as category_id
                  FROM questions q
                  JOIN categories c ON q.category_id = c.id
                  WHERE q.id = ?''', (question_id,))
@@ -950,18 +1555,17 @@ def edit_question(question_id):
 
 @app.route('/question/<int:question_id>/delete', methods=['POST'])
 def delete_question(question_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
-    # 선택지 먼저 삭제
-    c.execute('DELETE FROM question_options WHERE question_id = ?', (question_id,))
-    
-    # 평가 결과 삭제 (만약 있다면)
-    c.execute('DELETE FROM assessment_results WHERE question_id = ?', (question_id,))
-    
-    # 문항 삭제
+    # 문항 삭제 (선택지/임시저장 답변은 ON DELETE CASCADE로 함께 삭제,
+    # 기존 평가 결과는 보존하며 평가에 고정된 문항 은행 버전으로 표시)
     c.execute('DELETE FROM questions WHERE id = ?', (question_id,))
     
+    batch = events.EventBatch(c)
+    batch.append(None, events.QUESTION_DELETED, [question_id])
+    batch.flush()
+    
     conn.commit()
     conn.close()
     
@@ -971,17 +1575,18 @@ def delete_question(question_id):
 @app.route('/question/new', methods=['GET', 'POST'])
 def new_question():
     if request.method == 'POST':
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
         
         # 새 문항 추가
-        c.execute('''INSERT INTO questions (category_id, code, title, description, max_score, order_num)
-                     VALUES (?, ?, ?, ?, 5, 
-                     (SELECT COALESCE(MAX(order_num), 0) + 1 FROM questions WHERE category_id = ?))''',
+        c.execute('''INSERT INTO questions (category_id, code, title, description, max_score, sort_key)
+                     VALUES (?, ?, ?, ?, 5, ?)''',
                   (request.form['category_id'], request.form['code'], request.form['title'],
-                   request.form['description'], request.form['category_id']))
+                   request.form['description'], question_bank.sort_key(request.form['code'])))
         
         question_id = c.lastrowid
+        # 코드 순서 위치에 order_num 부여 (뒤 문항들은 한 칸씩 밀림)
+        maintenance.reorder_questions(c)
         
         # 선택지 추가
         for score in range(1, 6):
@@ -989,6 +1594,9 @@ def new_question():
             c.execute('''INSERT INTO question_options (question_id, score, description)
                          VALUES (?, ?, ?)''', (question_id, score, option_desc))
         
+        batch = events.EventBatch(c)
+        batch.append(None, events.QUESTION_CREATED, [question_id, request.form['code'], request.form['title']])
+        batch.flush()
         conn.commit()
         conn.close()
         
@@ -996,7 +1604,7 @@ def new_question():
         return redirect(url_for('questions'))
     
     # GET 요청 - 새 문항 폼 표시
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     c.execute('SELECT id, name FROM categories ORDER BY order_num')
     categories = c.fetchall()
@@ -1006,7 +1614,7 @@ def new_question():
 
 @app.route('/categories')
 def categories():
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     c.execute('''SELECT c.*, COUNT(q.id) as question_count
                  FROM categories c
@@ -1019,7 +1627,7 @@ def categories():
 
 @app.route('/category/<int:category_id>/edit', methods=['GET', 'POST'])
 def edit_category(category_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
     if request.method == 'POST':
@@ -1042,7 +1650,7 @@ def edit_category(category_id):
 @app.route('/category/new', methods=['GET', 'POST'])
 def new_category():
     if request.method == 'POST':
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
+        conn = get_db_connection()
         c = conn.cursor()
         
         # 새 카테고리의 order_num 계산 (기존 최대값 + 1)
@@ -1062,20 +1670,19 @@ def new_category():
 
 @app.route('/category/<int:category_id>/delete', methods=['POST'])
 def delete_category(category_id):
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_db_connection()
     c = conn.cursor()
     
-    # 카테고리에 연결된 문항이 있는지 확인
-    c.execute('SELECT COUNT(*) FROM questions WHERE category_id = ?', (category_id,))
-    question_count = c.fetchone()[0]
-    
-    if question_count > 0:
+    # 카테고리 삭제 (연결된 문항이 있으면 ON DELETE RESTRICT로 거부됨)
+    try:
+        c.execute('DELETE FROM categories WHERE id = ?', (category_id,))
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        c.execute('SELECT COUNT(*) FROM questions WHERE category_id = ?', (category_id,))
+        question_count = c.fetchone()[0]
         flash(f'이 카테고리에는 {question_count}개의 문항이 연결되어 있어 삭제할 수 없습니다. 먼저 연결된 문항들을 삭제하거나 다른 카테고리로 이동해주세요.')
         conn.close()
         return redirect(url_for('categories'))
-    
-    # 카테고리 삭제
-    c.execute('DELETE FROM categories WHERE id = ?', (category_id,))
     conn.commit()
     conn.close()
     
@@ -1083,9 +1690,10 @@ def delete_category(category_id):
     return redirect(url_for('categories'))
 
 @app.route('/questions/export')
+@tenants.limit_exports
 def export_questions():
     """평가 문항을 Excel 파일로 내보내기"""
-    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn = get_report_connection()
     c = conn.cursor()
     
     # 문항과 선택지 데이터 조회
@@ -1094,7 +1702,7 @@ def export_questions():
                  FROM questions q
                  JOIN categories c ON q.category_id = c.id
                  JOIN question_options qo ON q.id = qo.question_id
-                 ORDER BY c.order_num, q.order_num, qo.score''')
+                 ORDER BY c.order_num, c.id, q.sort_key, q.id, qo.score''')
     data = c.fetchall()
     conn.close()
     
@@ -1157,7 +1765,8 @@ def export_questions():
     
     # 메모리에 파일 저장
     output = io.BytesIO()
-    wb.save(output)
+    with metrics.timed('excel_export'):
+        wb.save(output)
     output.seek(0)
     
     # 파일명 생성
@@ -1194,7 +1803,7 @@ def import_questions():
             wb = load_workbook(tmp.name)
             ws = wb.active
             
-            conn = sqlite3.connect(app.config['DATABASE_PATH'])
+            conn = get_db_connection()
             c = conn.cursor()
             
             # 카테고리 매핑 생성 (이름 -> ID)
@@ -1203,6 +1812,8 @@ def import_questions():
             
             updated_count = 0
             error_rows = []
+            # 문항별 생성/수정 이벤트 (문항 변경과 같은 트랜잭션에서 기록)
+            batch = events.EventBatch(c)
             
             # 데이터 행 처리 (첫 번째 행은 헤더이므로 2번째부터)
             for row_num in range(2, ws.max_row + 1):
@@ -1232,16 +1843,20 @@ def import_questions():
                     
                     if existing_question:
                         # 기존 문항 업데이트
-                        c.execute('''UPDATE questions SET category_id = ?, code = ?, title = ?, description = ?
-                                     WHERE id = ?''', (category_id, code, title, description or '', question_id))
+                        c.execute('''UPDATE questions SET category_id = ?, code = ?, title = ?, description = ?,
+                                     sort_key = ? WHERE id = ?''',
+                                  (category_id, code, title, description or '', question_bank.sort_key(code), question_id))
                         action = "업데이트"
+                        event_type = events.QUESTION_EDITED
                     else:
                         # 새 문항 생성
                         # order_num은 임시로 999로 설정 (나중에 자동 정렬에서 수정됨)
-                        c.execute('''INSERT INTO questions (id, category_id, code, title, description, max_score, order_num)
-                                     VALUES (?, ?, ?, ?, ?, 5, 999)''', 
-                                  (question_id, category_id, code, title, description or ''))
+                        c.execute('''INSERT INTO questions (id, category_id, code, title, description, max_score, order_num,
+                                                            sort_key)
+                                     VALUES (?, ?, ?, ?, ?, 5, 999, ?)''', 
+                                  (question_id, category_id, code, title, description or '', question_bank.sort_key(code)))
                         action = "생성"
+                        event_type = events.QUESTION_CREATED
                     
                     # 선택지 처리 (DELETE 후 INSERT 방식으로 안전하게 처리)
                     c.execute('DELETE FROM question_options WHERE question_id = ?', (question_id,))
@@ -1254,6 +1869,7 @@ def import_questions():
                         c.execute('''INSERT INTO question_options (question_id, score, description)
                                      VALUES (?, ?, ?)''', (question_id, score, option_desc))
                     
+                    batch.append(None, event_type, [question_id, code, title])
                     updated_count += 1
                     
                 except Exception as e:
@@ -1263,30 +1879,12 @@ def import_questions():
             if updated_count > 0:
                 try:
                     # 카테고리별로 문항 코드 순으로 order_num 재설정
-                    c.execute('''
-                        SELECT q.id, q.code, q.category_id, c.order_num as cat_order
-                        FROM questions q
-                        JOIN categories c ON q.category_id = c.id
-                        ORDER BY c.order_num, q.code
-                    ''')
-                    
-                    questions = c.fetchall()
-                    current_category = None
-                    category_order = 0
-                    
-                    for q_id, q_code, category_id, cat_order in questions:
-                        if category_id != current_category:
-                            current_category = category_id
-                            category_order = 1
-                        
-                        c.execute('UPDATE questions SET order_num = ? WHERE id = ?', 
-                                (category_order, q_id))
-                        category_order += 1
-                    
+                    maintenance.reorder_questions(c)
                     print(f"문항 순서 자동 재정렬 완료")
                 except Exception as e:
                     print(f"문항 순서 재정렬 중 오류: {e}")
             
+            batch.flush()
             conn.commit()
             conn.close()
             
@@ -1308,291 +1906,161 @@ def import_questions():
     
     return redirect(url_for('questions'))
 
+def load_report_views(assessment_ids):
+    """보고서용 평가 뷰 모델 목록 (스냅샷 갱신 이후 완료된 평가는 운영 DB(읽기 전용)에서 조회)"""
+    db_path = current_db_path()
+    conn = get_report_connection()
+    try:
+        views = report_model.load_assessments(conn.cursor(), db_path, assessment_ids)
+    finally:
+        conn.close()
+    if len(views) < len(set(assessment_ids)) and app.config['REPORT_READ_MODE'] == 'snapshot':
+        conn = get_readonly_connection()
+        try:
+            views = report_model.load_assessments(conn.cursor(), db_path, assessment_ids)
+        finally:
+            conn.close()
+    return views
+
+def load_recommendations(views):
+    """평가 뷰 모델 목록의 개선 권고사항 {평가 ID: [권고사항]} (규칙 기반, 완료 평가는 캐시)"""
+    conn = get_report_connection()
+    try:
+        return recommendations.recommend(conn.cursor(), current_db_path(), views)
+    finally:
+        conn.close()
+
+def send_excel_report(views, filename, company_report=False):
+    """평가 뷰 모델로 Excel 결과 보고서를 생성하여 다운로드 응답 반환"""
+    conn = get_readonly_connection()
+    try:
+        matrix = analytics.get_score_matrix(conn.cursor(), current_db_path())
+    finally:
+        conn.close()
+    benchmarks = {}
+    for view in views:
+        benchmark = matrix.assessment_benchmark(view.id)
+        if benchmark:
+            benchmarks[view.id] = {
+                dimension: round(group['total_percentile'])
+                for dimension, group in benchmark['groups'].items()
+                if dimension in ('industry', 'size') and group['total_percentile'] is not None
+            }
+    texts = load_recommendations(views)
+    
+    # 입력이 같으면 생성하지 않고 304 (xlsx 본문에는 생성 시각이 들어가 본문 해시로 비교할 수 없음)
+    etag = compression.render_etag('xlsx', [vars(view) for view in views], benchmarks, company_report, texts)
+    cached = compression.not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    try:
+        with metrics.timed('excel_report'):
+            data = excel_report.render(views, benchmarks, company_report, texts,
+                                       workers=app.config['EXCEL_RENDER_WORKERS'],
+                                       timeout=app.config['EXCEL_RENDER_TIMEOUT'])
+    except TimeoutError:
+        return ('Excel 보고서 생성 시간이 초과되었습니다. 대상 회사를 줄여 다시 시도하세요.', 503,
+                {'Retry-After': '30'})
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    response = send_file(io.BytesIO(data),
+                         as_attachment=True,
+                         download_name=f"{filename}_{timestamp}.xlsx",
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response.set_etag(etag)
+    return response
+
+@app.route('/assessment/<int:assessment_id>/excel')
+@tenants.limit_exports
+def export_assessment_excel(assessment_id):
+    """평가 1건의 결과를 Excel 보고서로 내보내기 (요약/카테고리 차트, 문항별 점수와 의견)"""
+    views = load_report_views([assessment_id])
+    if not views:
+        flash('평가 데이터를 찾을 수 없습니다.')
+        return redirect(url_for('assessments'))
+    return send_excel_report(views, f"APS_진단결과_{views[0].company_name}")
+
+@app.route('/company/<int:company_id>/excel')
+@tenants.limit_exports
+def export_company_excel(company_id):
+    """회사의 완료된 평가 이력을 Excel 보고서로 내보내기 (달성률 추이 차트 포함)"""
+    conn = get_report_connection()
+    c = conn.cursor()
+    c.execute("SELECT name FROM companies WHERE id = ?", (company_id,))
+    company = c.fetchone()
+    assessment_ids = report_model.company_assessment_ids(c, company_id) if company else []
+    conn.close()
+    
+    if not company:
+        flash('회사를 찾을 수 없습니다.')
+        return redirect(url_for('companies'))
+    views = load_report_views(assessment_ids)
+    if not views:
+        flash('완료된 평가가 없습니다.')
+        return redirect(url_for('company_trend', company_id=company_id))
+    return send_excel_report(views, f"APS_진단이력_{company[0]}", company_report=True)
+
+@app.route('/reports/excel')
+@tenants.limit_exports
+def export_companies_excel():
+    """여러 회사의 최근 완료 평가를 한 Excel 보고서로 내보내기 (company_id 반복 지정, 미지정 시 전체 회사)"""
+    company_ids = request.args.getlist('company_id', type=int) or None
+    conn = get_report_connection()
+    assessment_ids = report_model.latest_assessment_ids(conn.cursor(), company_ids)
+    conn.close()
+    
+    if not assessment_ids:
+        flash('완료된 평가가 없습니다.')
+        return redirect(url_for('companies'))
+    max_companies = app.config['EXCEL_MAX_COMPANIES']
+    if len(assessment_ids) > max_companies:
+        flash(f'한 번에 최대 {max_companies}개 회사까지 내보낼 수 있습니다. company_id로 대상을 지정하세요.')
+        return redirect(url_for('companies'))
+    return send_excel_report(load_report_views(assessment_ids), "APS_진단결과_회사별")
+
 @app.route('/assessment/<int:assessment_id>/report')
+@tenants.limit_exports
 def generate_pdf_report(assessment_id):
-    """평가 결과를 PDF 보고서로 생성"""
+    """평가 결과를 PDF 보고서로 생성 (template=full|summary)"""
+    template = request.args.get('template', pdf_report.DEFAULT_TEMPLATE)
+    if template not in pdf_report.TEMPLATES:
+        flash(f'알 수 없는 보고서 종류입니다: {template}')
+        return redirect(url_for('assessment_detail', assessment_id=assessment_id))
+    
     try:
-        # 평가 데이터 조회
-        conn = sqlite3.connect(app.config['DATABASE_PATH'])
-        c = conn.cursor()
-        
-        # 기본 평가 정보
-        c.execute('''SELECT a.*, co.name as company_name, co.industry, co.size
-                     FROM assessments a
-                     JOIN companies co ON a.company_id = co.id
-                     WHERE a.id = ?''', (assessment_id,))
-        assessment_data = c.fetchone()
-        
-        if not assessment_data:
+        # 평가 정보, 평가에 고정된 문항 은행 버전 기준 카테고리별 점수/상세 결과 (주관식 답변 포함)
+        views = load_report_views([assessment_id])
+        if not views:
             flash('평가 데이터를 찾을 수 없습니다.')
             return redirect(url_for('assessments'))
+        view = views[0]
         
-        # 카테고리별 점수
-        c.execute('''SELECT cat.id, cat.name, cat.weight, SUM(ar.score) as category_score,
-                            COUNT(ar.score) * 5 as max_category_score
-                     FROM categories cat
-                     JOIN questions q ON cat.id = q.category_id
-                     JOIN assessment_results ar ON q.id = ar.question_id
-                     WHERE ar.assessment_id = ?
-                     GROUP BY cat.id, cat.name, cat.weight
-                     ORDER BY cat.order_num''', (assessment_id,))
-        category_scores = c.fetchall()
-        
-        # 상세 결과 (주관식 답변 포함)
-        c.execute('''SELECT q.code, q.title, ar.score, qo.description, cat.name as category_name, ar.comment
-                     FROM assessment_results ar
-                     JOIN questions q ON ar.question_id = q.id
-                     JOIN question_options qo ON q.id = qo.question_id AND ar.score = qo.score
-                     JOIN categories cat ON q.category_id = cat.id
-                     WHERE ar.assessment_id = ?
-                     ORDER BY cat.order_num, q.order_num''', (assessment_id,))
-        detailed_results = c.fetchall()
-        
-        conn.close()
-        
-        # PDF 생성
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        
-        # 스타일 설정 (한글 폰트 적용)
-        styles = getSampleStyleSheet()
-        
-        # 한글 폰트 적용한 스타일들
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontName=KOREAN_FONT,
-            fontSize=18,
-            textColor=colors.darkblue,
-            alignment=TA_CENTER,
-            spaceAfter=20
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontName=KOREAN_FONT,
-            fontSize=14,
-            textColor=colors.darkblue,
-            spaceBefore=20,
-            spaceAfter=10
-        )
+        texts = load_recommendations(views)[view.id]
+        benchmark = get_assessment_benchmark(assessment_id)
         
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontName=KOREAN_FONT,
-            fontSize=10
-        )
-        
-        # PDF 콘텐츠 구성
-        story = []
-        
-        # 제목
-        story.append(Paragraph("APS 준비도 진단 보고서", title_style))
-        story.append(Spacer(1, 20))
-        
-        # 기본 정보 표
-        basic_info = [
-            ['평가 항목', '내용'],
-            ['회사명', assessment_data[7]],
-            ['업종', assessment_data[8]],
-            ['규모', assessment_data[9]],
-            ['평가일', assessment_data[4]],
-            ['총점', f"{assessment_data[2]}/140점"],
-            ['성숙도 레벨', f"Level {assessment_data[3]}"]
-        ]
-        
-        basic_table = Table(basic_info, colWidths=[2*inch, 3*inch])
-        basic_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), KOREAN_FONT),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), KOREAN_FONT),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(basic_table)
-        story.append(Spacer(1, 30))
-        
-        # 성숙도 레벨 설명
-        story.append(Paragraph("성숙도 레벨 평가", heading_style))
-        
-        maturity_levels = [
-            "Level 1 (< 40%): 기초 수준 - 체계적인 계획 수립이 필요",
-            "Level 2 (40-60%): 발전 수준 - 부분적 개선이 필요",
-            "Level 3 (60-80%): 우수 수준 - 전반적으로 양호한 상태",
-            "Level 4 (80-91%): 최적 수준 - 일부 고도화 필요",
-            "Level 5 (≥ 91%): 혁신 수준 - APS 도입 최적 상태"
-        ]
-        
-        for level in maturity_levels:
-            story.append(Paragraph(f"• {level}", normal_style))
-        
-        story.append(Spacer(1, 20))
-        
-        # 카테고리별 점수 표
-        story.append(Paragraph("카테고리별 상세 점수", heading_style))
-        
-        category_data = [['카테고리', '획득점수', '만점', '달성률', '가중치']]
-        for cat in category_scores:
-            achievement_rate = (cat[3] / cat[4]) * 100
-            category_data.append([
-                cat[1], 
-                f"{cat[3]}점", 
-                f"{cat[4]}점", 
-                f"{achievement_rate:.1f}%", 
-                f"{cat[2]*100:.0f}%"
-            ])
-        
-        category_table = Table(category_data, colWidths=[2.5*inch, 1*inch, 1*inch, 1*inch, 1*inch])
-        category_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), KOREAN_FONT),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), KOREAN_FONT),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(category_table)
-        story.append(Spacer(1, 30))
-        
-        # 상세 평가 결과 (카테고리별)
-        story.append(Paragraph("상세 평가 결과", heading_style))
-        
-        current_category = ""
-        for result in detailed_results:
-            if current_category != result[4]:  # 새로운 카테고리
-                current_category = result[4]
-                story.append(Spacer(1, 15))
-                cat_style = ParagraphStyle(
-                    'CategoryStyle',
-                    parent=styles['Heading3'],
-                    fontName=KOREAN_FONT,
-                    fontSize=12,
-                    textColor=colors.darkred,
-                    spaceBefore=10,
-                    spaceAfter=5
-                )
-                story.append(Paragraph(f"▶ {current_category}", cat_style))
-            
-            # 문항별 결과
-            question_text = f"{result[0]} {result[1]} (점수: {result[2]}/5)"
-            answer_text = f"선택: {result[3]}"
-            
-            story.append(Paragraph(question_text, normal_style))
-            answer_style = ParagraphStyle(
-                'AnswerStyle',
-                parent=normal_style,
-                fontName=KOREAN_FONT,
-                fontSize=9,
-                textColor=colors.darkgreen,
-                leftIndent=20,
-                spaceAfter=5
-            )
-            story.append(Paragraph(answer_text, answer_style))
-            
-            # 주관식 답변이 있는 경우 추가
-            if result[5]:  # comment 필드
-                comment_style = ParagraphStyle(
-                    'CommentStyle',
-                    parent=normal_style,
-                    fontName=KOREAN_FONT,
-                    fontSize=9,
-                    textColor=colors.darkblue,
-                    leftIndent=20,
-                    spaceAfter=8,
-                    borderColor=colors.lightgrey,
-                    borderWidth=1,
-                    borderPadding=5
-                )
-                comment_text = f"※ 상세 의견: {result[5]}"
-                story.append(Paragraph(comment_text, comment_style))
-        
-        # 권고사항
-        story.append(Spacer(1, 30))
-        story.append(Paragraph("개선 권고사항", heading_style))
-        
-        # 성숙도 레벨에 따른 권고사항
-        level = assessment_data[3]
-        recommendations = []
-        
-        if level == 1:
-            recommendations = [
-                "기본적인 생산계획 프로세스 정립이 필요합니다.",
-                "기준정보(BOM, 라우팅) 정확도 개선이 시급합니다.",
-                "ERP 시스템 활용도를 높여야 합니다.",
-                "APS 도입을 위한 기초 역량 강화가 필요합니다."
-            ]
-        elif level == 2:
-            recommendations = [
-                "생산계획 수립 주기를 단축하여 민첩성을 높이세요.",
-                "실시간 데이터 수집 체계를 구축하세요.",
-                "시스템 간 연동을 강화하여 정보 일관성을 확보하세요.",
-                "계획 담당자의 역량 개발이 필요합니다."
-            ]
-        elif level == 3:
-            recommendations = [
-                "고급 스케줄링 기법 도입을 검토하세요.",
-                "예외상황 대응 프로세스를 체계화하세요.",
-                "성과 측정 및 분석 체계를 고도화하세요.",
-                "APS 시스템 도입을 본격 검토할 시점입니다."
-            ]
-        elif level == 4:
-            recommendations = [
-                "AI/ML 기반 수요예측 고도화를 추진하세요.",
-                "실시간 최적화 알고리즘 적용을 검토하세요.",
-                "공급망 전체 관점의 통합 계획을 수립하세요.",
-                "APS 시스템 도입에 최적한 상태입니다."
-            ]
-        else:
-            recommendations = [
-                "현재 우수한 수준을 유지하면서 지속적 개선을 추진하세요.",
-                "차세대 기술(디지털 트윈, IoT 등) 활용을 검토하세요.",
-                "벤치마킹을 통한 글로벌 수준 달성을 목표로 하세요.",
-                "APS 시스템의 고도화 및 확장을 추진하세요."
-            ]
-        
-        for rec in recommendations:
-            story.append(Paragraph(f"• {rec}", normal_style))
-        
-        # 보고서 생성 정보
-        story.append(Spacer(1, 40))
-        footer_style = ParagraphStyle(
-            'FooterStyle',
-            parent=normal_style,
-            fontName=KOREAN_FONT,
-            fontSize=8,
-            textColor=colors.grey,
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph(f"본 보고서는 {datetime.now().strftime('%Y년 %m월 %d일')}에 생성되었습니다.", footer_style))
-        story.append(Paragraph("APS 준비도 진단 시스템 v1.0", footer_style))
+        # 입력이 같으면 생성하지 않고 304 (PDF 본문에는 생성 시각/문서 ID가 들어가 본문 해시로 비교할 수 없음)
+        etag = compression.render_etag('pdf', vars(view), KOREAN_FONT, template, benchmark, texts)
+        cached = compression.not_modified(etag)
+        if cached is not None:
+            return cached
         
-        # PDF 생성
-        doc.build(story)
-        buffer.seek(0)
+        with metrics.timed('pdf_report'):
+            data, _pages = pdf_report.render(view, KOREAN_FONT, template,
+                                             benchmark=benchmark, recommendations=texts)
         
         # 파일명 생성
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"APS_진단보고서_{assessment_data[7]}_{timestamp}.pdf"
+        filename = f"APS_진단보고서_{view.company_name}_{timestamp}.pdf"
         
-        return send_file(
-            buffer,
+        response = send_file(
+            io.BytesIO(data),
             as_attachment=True,
             download_name=filename,
             mimetype='application/pdf'
         )
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         flash(f'PDF 보고서 생성 중 오류가 발생했습니다: {str(e)}')
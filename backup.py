@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+운영 DB 온라인 백업 / 복원 / WAL 전송
+
+운영 중인 DB 파일을 그대로 복사하면 쓰기 도중의 깨진 사본이 만들어질 수 있으므로,
+SQLite 온라인 백업 API로 페이지 단위로 나누어 복사한 뒤 gzip으로 압축하고
+SHA-256 체크섬과 함께 manifest(.json)를 남깁니다.
+
+    # 백업 생성 (보존 정책 적용)
+    python backup.py create
+    python backup.py list
+    python backup.py verify --all
+    python backup.py restore /app/data/backups/aps_assessment_20250131_180000_000000.db.gz --db /app/data/aps_assessment.db
+
+    # WAL 전송: 기준 백업 + 커밋된 WAL 프레임을 주기적으로 복사 (중지: Ctrl+C)
+    python backup.py ship --dest /app/data/wal_archive
+    python backup.py restore-wal --dest /app/data/wal_archive --db /tmp/restored.db --until "2025-01-31 18:00:00"
+
+복원은 애플리케이션을 중지한 상태에서 실행해야 합니다.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from database import BUSY_TIMEOUT_MS, backup_database
+
+BACKUP_SUFFIX = '.db.gz'
+
+# 복사 중 다른 연결의 쓰기로 백업이 처음부터 다시 시작된 횟수가 이 값을 넘으면 한 번에 복사
+# (WAL 모드에서는 한 번에 복사해도 쓰기 작업을 막지 않음)
+MAX_BACKUP_RESTARTS = 5
+
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+WAL_MAGIC = (0x377f0682, 0x377f0683)
+
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+# 같은 초에 만든 백업이 서로 덮어쓰지 않도록 마이크로초까지 (이전 백업은 초 단위 이름)
+BACKUP_TIMESTAMP_FORMAT = TIMESTAMP_FORMAT + '_%f'
+_BACKUP_NAME = re.compile(r'^(.*)_(\d{8}_\d{6}(?:_\d{6})?)$')
+
+
+class BackupError(Exception):
+    """백업 파일 손상, 체크섬 불일치 등"""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_database(db_path, dest_path, pages, sleep):
+    """온라인 백업 API로 복사 (재시작이 반복되면 한 번에 복사)"""
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_BACKUP_RESTARTS:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+
+    try:
+        backup_database(db_path, dest_path, pages=pages, sleep=sleep, progress=progress)
+    except _TooManyRestarts:
+        backup_database(db_path, dest_path, pages=-1)
+    return state['restarts']
+
+
+def _database_info(path):
+    """복사본 무결성 검사 결과와 페이지 정보"""
+    conn = sqlite3.connect(path)
+    try:
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {'integrity': integrity, 'page_size': page_size, 'page_count': page_count}
+
+
+def _compress(src_path, dest_path, level):
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    with open(src_path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=level) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, dest_path)
+
+
+def _decompress(src_path, dest_path):
+    with gzip.open(src_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def manifest_path(backup_path):
+    return backup_path[:-len(BACKUP_SUFFIX)] + '.json'
+
+
+def create_backup(db_path, dest_dir, prefix=None, pages=256, sleep=0.005, level=6):
+    """압축/체크섬 백업 생성 후 manifest 반환"""
+    os.makedirs(dest_dir, exist_ok=True)
+    prefix = prefix or os.path.splitext(os.path.basename(db_path))[0]
+    started = time.time()
+    backup_path = os.path.join(dest_dir, f"{prefix}_{datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)}{BACKUP_SUFFIX}")
+    if os.path.exists(backup_path):
+        raise BackupError(f"같은 이름의 백업이 이미 있습니다: {backup_path}")
+
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=dest_dir)
+    os.close(fd)
+    try:
+        restarts = _copy_database(db_path, raw_path, pages, sleep)
+        info = _database_info(raw_path)
+        if info['integrity'] != 'ok':
+            raise BackupError(f"백업 사본 무결성 검사 실패: {info['integrity']}")
+        raw_sha256 = _sha256(raw_path)
+        raw_size = os.path.getsize(raw_path)
+        _compress(raw_path, backup_path, level)
+    finally:
+        os.remove(raw_path)
+
+    manifest = {
+        'file': os.path.basename(backup_path),
+        'source': os.path.abspath(db_path),
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'size': os.path.getsize(backup_path),
+        'sha256': _sha256(backup_path),
+        'raw_size': raw_size,
+        'raw_sha256': raw_sha256,
+        'page_size': info['page_size'],
+        'page_count': info['page_count'],
+        'restarts': restarts,
+        'elapsed': round(time.time() - started, 3),
+    }
+    with open(manifest_path(backup_path), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def list_backups(dest_dir, prefix=None):
+    """백업 파일 경로 목록 (오래된 순)"""
+    if not os.path.isdir(dest_dir):
+        return []
+    paths = []
+    for filename in sorted(os.listdir(dest_dir)):
+        if not filename.endswith(BACKUP_SUFFIX):
+            continue
+        if prefix and not filename.startswith(prefix + '_'):
+            continue
+        paths.append(os.path.join(dest_dir, filename))
+    return paths
+
+
+def _split_name(path):
+    """파일 이름의 (prefix, 시각 문자열) (<prefix>_YYYYmmdd_HHMMSS[_ffffff].db.gz)"""
+    name = os.path.basename(path)[:-len(BACKUP_SUFFIX)]
+    match = _BACKUP_NAME.match(name)
+    return (match.group(1), match.group(2)) if match else (name, None)
+
+
+def _backup_time(path):
+    """파일 이름의 생성 시각"""
+    stamp = _split_name(path)[1]
+    if stamp is None:
+        return datetime.fromtimestamp(os.path.getmtime(path))
+    return datetime.strptime(stamp, BACKUP_TIMESTAMP_FORMAT if stamp.count('_') == 2 else TIMESTAMP_FORMAT)
+
+
+def prune_backups(dest_dir, keep=14, keep_daily=7, prefix=None):
+    """보존 정책에 따라 백업 삭제 후 삭제한 경로 목록 반환
+
+    최근 keep개와, 최근 keep_daily일 동안 날짜별 마지막 백업은 남깁니다.
+    """
+    by_prefix = {}
+    for path in list_backups(dest_dir, prefix):
+        by_prefix.setdefault(_split_name(path)[0], []).append(path)
+
+    removed = []
+    for paths in by_prefix.values():
+        paths.sort(key=_backup_time, reverse=True)
+        kept = set(paths[:keep])
+        days = []
+        for path in paths:
+            day = _backup_time(path).date()
+            if day not in days:
+                days.append(day)
+                if len(days) <= keep_daily:
+                    kept.add(path)
+        for path in paths:
+            if path in kept:
+                continue
+            os.remove(path)
+            if os.path.exists(manifest_path(path)):
+                os.remove(manifest_path(path))
+            removed.append(path)
+    return removed
+
+
+def verify_backup(backup_path, keep_copy=None):
+    """체크섬과 복원본 무결성 검사 (keep_copy 경로를 주면 압축 해제본을 남김)"""
+    try:
+        with open(manifest_path(backup_path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BackupError(f"manifest를 읽을 수 없습니다: {e}")
+
+    if _sha256(backup_path) != manifest['sha256']:
+        raise BackupError("백업 파일 체크섬이 일치하지 않습니다")
+
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(keep_copy or backup_path) or '.')
+    os.close(fd)
+    try:
+        try:
+            _decompress(backup_path, raw_path)
+        except (OSError, EOFError) as e:
+            raise BackupError(f"압축을 풀 수 없습니다: {e}")
+        if _sha256(raw_path) != manifest['raw_sha256']:
+            raise BackupError("압축 해제본 체크섬이 일치하지 않습니다")
+        info = _database_info(raw_path)
+        if info['integrity'] != 'ok':
+            raise BackupError(f"무결성 검사 실패: {info['integrity']}")
+        if keep_copy:
+            os.replace(raw_path, keep_copy)
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+    return manifest
+
+
+def _install(restored_path, db_path, force):
+    """검증된 복원본을 db_path로 교체 (기존 파일은 .before-restore-<시각>으로 보관)"""
+    if os.path.exists(db_path):
+        if not force:
+            raise BackupError(f"{db_path}가 이미 있습니다 (--force로 교체)")
+        kept_path = f"{db_path}.before-restore-{datetime.now().strftime(TIMESTAMP_FORMAT)}"
+        os.replace(db_path, kept_path)
+        print(f"기존 DB 보관: {kept_path}")
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(restored_path, db_path)
+
+
+def restore_backup(backup_path, db_path, force=False):
+    """백업 검증 후 db_path로 복원"""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    restored_path = f"{db_path}.restore.tmp"
+    manifest = verify_backup(backup_path, keep_copy=restored_path)
+    _install(restored_path, db_path, force)
+    return manifest
+
+
+# WAL 전송
+#
+# 아카이브 디렉터리는 기준 백업마다 체인 디렉터리를 만들고, WAL 세대(체크포인트 후 WAL이
+# 처음부터 다시 쓰일 때마다 바뀜)별 헤더와 커밋된 프레임 묶음을 순서대로 저장합니다.
+#   <dest>/<체인>/base_<시각>.db.gz, base_<시각>.json   기준 백업
+#   <dest>/<체인>/<세대>.hdr            WAL 헤더 (32바이트)
+#   <dest>/<체인>/<세대>-<순번>.wal.gz   커밋된 프레임
+#   <dest>/<체인>/segments.jsonl        프레임 묶음 목록 (체크섬, 전송 시각)
+# 복원은 기준 백업에 세대별 WAL을 차례로 붙여 체크포인트합니다.
+
+def _wal_checksum(data, s0, s1, big_endian):
+    words = struct.unpack(('>' if big_endian else '<') + f"{len(data) // 4}I", data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xffffffff
+        s1 = (s1 + words[i + 1] + s0) & 0xffffffff
+    return s0, s1
+
+
+def read_wal_header(db_path):
+    """WAL 헤더 (raw, page_size, checkpoint 순번, salt1, salt2, checksum), 유효하지 않으면 None"""
+    try:
+        with open(db_path + '-wal', 'rb') as f:
+            raw = f.read(WAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(raw) < WAL_HEADER_SIZE:
+        return None
+    magic, _, page_size, checkpoint_seq, salt1, salt2, c0, c1 = struct.unpack('>8I', raw)
+    if magic not in WAL_MAGIC or _wal_checksum(raw[:24], 0, 0, magic & 1) != (c0, c1):
+        return None
+    return {'raw': raw, 'page_size': page_size, 'checkpoint_seq': checkpoint_seq,
+            'salt': (salt1, salt2), 'checksum': (c0, c1), 'big_endian': magic & 1}
+
+
+def read_committed_frames(db_path, header, start_frame, checksum):
+    """start_frame부터 마지막 커밋 프레임까지의 유효한 프레임 (bytes, 프레임 수, 누적 체크섬)
+
+    작성 중이거나 이전 세대에서 남은 프레임은 salt/체크섬이 맞지 않으므로 그 앞에서 멈춥니다.
+    """
+    frame_size = WAL_FRAME_HEADER_SIZE + header['page_size']
+    frames, count = [], 0
+    committed, committed_count, committed_checksum = [], 0, checksum
+    with open(db_path + '-wal', 'rb') as f:
+        f.seek(WAL_HEADER_SIZE + start_frame * frame_size)
+        while True:
+            frame = f.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            _, commit_size, salt1, salt2, c0, c1 = struct.unpack('>6I', frame[:WAL_FRAME_HEADER_SIZE])
+            if (salt1, salt2) != header['salt']:
+                break
+            checksum = _wal_checksum(frame[:8] + frame[WAL_FRAME_HEADER_SIZE:], *checksum, header['big_endian'])
+            if checksum != (c0, c1):
+                break
+            frames.append(frame)
+            count += 1
+            if commit_size:
+                committed.extend(frames)
+                frames = []
+                committed_count, committed_checksum = count, checksum
+    return b''.join(committed), committed_count, committed_checksum
+
+
+class WalShipper:
+    """운영 DB의 커밋된 WAL 프레임을 아카이브 디렉터리로 주기적으로 복사
+
+    WAL이 checkpoint_frames 이상 쌓이면 직접 RESTART 체크포인트를 실행하고, 그때까지의
+    프레임을 모두 복사한 경우 다음 WAL 세대를 같은 체인에 이어 붙입니다.
+    복사하지 못한 프레임이 있을 수 있으면(다른 연결의 체크포인트 등) 새 기준 백업으로 체인을 시작합니다.
+    """
+
+    def __init__(self, db_path, dest_dir, checkpoint_frames=500, level=6):
+        self.db_path = db_path
+        self.dest_dir = dest_dir
+        self.checkpoint_frames = checkpoint_frames
+        self.level = level
+        self.state_path = os.path.join(dest_dir, 'state.json')
+        self.state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _chain_dir(self):
+        return os.path.join(self.dest_dir, self.state['chain'])
+
+    def _start_generation(self, header):
+        self.state.update(generation=self.state['generation'] + 1, salt=list(header['salt']),
+                          frames=0, checksum=list(header['checksum']), segment=0, continues=False)
+        with open(os.path.join(self._chain_dir(), f"{self.state['generation']:06d}.hdr"), 'wb') as f:
+            f.write(header['raw'])
+
+    def _start_chain(self):
+        """새 기준 백업으로 체인 시작 (백업 중 WAL 세대가 바뀌면 다시 백업)"""
+        for _ in range(3):
+            header = read_wal_header(self.db_path)
+            chain = datetime.now().strftime(TIMESTAMP_FORMAT + '_%f')
+            chain_dir = os.path.join(self.dest_dir, chain)
+            os.makedirs(chain_dir)
+            create_backup(self.db_path, chain_dir, prefix='base', level=self.level)
+            if header == read_wal_header(self.db_path):
+                break
+            shutil.rmtree(chain_dir)
+        else:
+            raise BackupError("WAL이 계속 바뀌어 기준 백업을 만들 수 없습니다")
+        self.state = {'chain': chain, 'generation': 0, 'salt': None, 'frames': 0, 'checksum': None,
+                      'segment': 0, 'continues': False}
+        if header:
+            self._start_generation(header)
+        self._save_state()
+        return chain
+
+    def ship_once(self):
+        """한 번 전송 (복사한 프레임 수 반환)"""
+        header = read_wal_header(self.db_path)
+        if self.state is None:
+            self._start_chain()
+        if header is None:
+            return 0
+
+        if self.state['salt'] != list(header['salt']):
+            previous = self.state['salt']
+            # 직접 체크포인트한 직후의 바로 다음 세대(salt1 + 1)만 이어 붙일 수 있음
+            if previous is None or (self.state['continues']
+                                    and header['salt'][0] == (previous[0] + 1) & 0xffffffff):
+                self._start_generation(header)
+            else:
+                self._start_chain()
+                header = read_wal_header(self.db_path)
+                if header is None:
+                    return 0
+
+        data, count, checksum = read_committed_frames(self.db_path, header, self.state['frames'],
+                                                      tuple(self.state['checksum']))
+        if count:
+            self.state['segment'] += 1
+            filename = f"{self.state['generation']:06d}-{self.state['segment']:06d}.wal.gz"
+            path = os.path.join(self._chain_dir(), filename)
+            with gzip.open(path + '.tmp', 'wb', compresslevel=self.level) as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+            segment = {'file': filename, 'generation': self.state['generation'], 'frames': count,
+                       'sha256': _sha256(path), 'shipped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            with open(os.path.join(self._chain_dir(), 'segments.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(segment) + '\n')
+            self.state['frames'] += count
+            self.state['checksum'] = list(checksum)
+            self._save_state()
+
+        if self.state['frames'] >= self.checkpoint_frames:
+            self._checkpoint()
+        return count
+
+    def _checkpoint(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            busy, log_frames, _ = conn.execute("PRAGMA wal_checkpoint(RESTART)").fetchone()
+        finally:
+            conn.close()
+        if not busy:
+            # 체크포인트 시점의 WAL을 모두 복사했으면 다음 세대를 이어 붙임
+            self.state['continues'] = log_frames == self.state['frames']
+            self._save_state()
+
+    def run(self, interval):
+        while True:
+            self.ship_once()
+            time.sleep(interval)
+
+
+def list_chains(dest_dir):
+    return sorted(name for name in os.listdir(dest_dir)
+                  if os.path.isdir(os.path.join(dest_dir, name)) and list_backups(os.path.join(dest_dir, name), 'base'))
+
+
+def restore_wal(dest_dir, db_path, until=None, chain=None, force=False):
+    """WAL 아카이브에서 복원 (until 'YYYY-MM-DD HH:MM:SS'까지 전송된 프레임만 적용)
+
+    적용한 (체인, 세대 수, 프레임 수) 반환
+    """
+    chains = list_chains(dest_dir)
+    if until:
+        chains = [name for name in chains if name[:len('YYYYmmdd_HHMMSS')] <=
+                  datetime.strptime(until, '%Y-%m-%d %H:%M:%S').strftime(TIMESTAMP_FORMAT)]
+    chain = chain or (chains[-1] if chains else None)
+    if chain is None:
+        raise BackupError("복원할 수 있는 WAL 아카이브가 없습니다")
+    chain_dir = os.path.join(dest_dir, chain)
+
+    segments = []
+    segments_path = os.path.join(chain_dir, 'segments.jsonl')
+    if os.path.exists(segments_path):
+        with open(segments_path, encoding='utf-8') as f:
+            segments = [json.loads(line) for line in f if line.strip()]
+    if until:
+        segments = [segment for segment in segments if segment['shipped_at'] <= until]
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    restored_path = f"{db_path}.restore.tmp"
+    base_path = list_backups(chain_dir, 'base')[0]
+    verify_backup(base_path, keep_copy=restored_path)
+
+    conn = sqlite3.connect(restored_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    generations = sorted({segment['generation'] for segment in segments})
+    frames = 0
+    for generation in generations:
+        with open(os.path.join(chain_dir, f"{generation:06d}.hdr"), 'rb') as f:
+            wal = [f.read()]
+        for segment in segments:
+            if segment['generation'] != generation:
+                continue
+            path = os.path.join(chain_dir, segment['file'])
+            if _sha256(path) != segment['sha256']:
+                raise BackupError(f"{segment['file']} 체크섬이 일치하지 않습니다")
+            with gzip.open(path, 'rb') as f:
+                wal.append(f.read())
+            frames += segment['frames']
+        with open(restored_path + '-wal', 'wb') as f:
+            f.write(b''.join(wal))
+        conn = sqlite3.connect(restored_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+    conn = sqlite3.connect(restored_path)
+    try:
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if integrity != 'ok':
+        raise BackupError(f"복원본 무결성 검사 실패: {integrity}")
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(restored_path + suffix):
+            os.remove(restored_path + suffix)
+    _install(restored_path, db_path, force)
+    return chain, len(generations), frames
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='DB 백업/복원 도구')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='압축/체크섬 백업 생성 후 보존 정책 적용')
+    create_parser.add_argument('--dest', default=Config.BACKUP_DIR, help='백업 디렉터리')
+    create_parser.add_argument('--no-prune', action='store_true', help='보존 정책 적용 안 함')
+
+    list_parser = subparsers.add_parser('list', help='백업 목록')
+    list_parser.add_argument('--dest', default=Config.BACKUP_DIR, help='백업 디렉터리')
+
+    prune_parser = subparsers.add_parser('prune', help='보존 정책 적용')
+    prune_parser.add_argument('--dest', default=Config.BACKUP_DIR, help='백업 디렉터리')
+
+    verify_parser = subparsers.add_parser('verify', help='체크섬/무결성 검사')
+    verify_parser.add_argument('files', nargs='*')
+    verify_parser.add_argument('--all', action='store_true', help='백업 디렉터리의 모든 백업')
+    verify_parser.add_argument('--dest', default=Config.BACKUP_DIR, help='백업 디렉터리')
+
+    restore_parser = subparsers.add_parser('restore', help='백업 검증 후 --db 경로로 복원')
+    restore_parser.add_argument('file')
+    restore_parser.add_argument('--force', action='store_true', help='기존 DB 파일 교체')
+
+    ship_parser = subparsers.add_parser('ship', help='WAL 프레임 연속 전송')
+    ship_parser.add_argument('--dest', default=Config.WAL_SHIP_DIR, help='WAL 아카이브 디렉터리')
+    ship_parser.add_argument('--interval', type=float, default=Config.WAL_SHIP_INTERVAL, help='전송 주기(초)')
+    ship_parser.add_argument('--once', action='store_true', help='한 번만 전송')
+
+    restore_wal_parser = subparsers.add_parser('restore-wal', help='WAL 아카이브에서 --db 경로로 복원')
+    restore_wal_parser.add_argument('--dest', default=Config.WAL_SHIP_DIR, help='WAL 아카이브 디렉터리')
+    restore_wal_parser.add_argument('--until', help="복원 시점 ('YYYY-MM-DD HH:MM:SS', 미지정 시 최신)")
+    restore_wal_parser.add_argument('--chain', help='기준 백업 체인 이름')
+    restore_wal_parser.add_argument('--force', action='store_true', help='기존 DB 파일 교체')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'create':
+            manifest = create_backup(args.db, args.dest, pages=Config.BACKUP_PAGES_PER_STEP,
+                                     level=Config.BACKUP_COMPRESS_LEVEL)
+            print(f"{manifest['file']}: {manifest['raw_size'] / 1024 / 1024:.1f}MB → "
+                  f"{manifest['size'] / 1024 / 1024:.1f}MB ({manifest['elapsed']}초, sha256 {manifest['sha256'][:12]})")
+            if not args.no_prune:
+                for path in prune_backups(args.dest, Config.BACKUP_KEEP, Config.BACKUP_KEEP_DAILY):
+                    print(f"삭제: {os.path.basename(path)}")
+            return 0
+
+        if args.command == 'list':
+            for path in list_backups(args.dest):
+                print(f"{os.path.basename(path):<48} {os.path.getsize(path) / 1024 / 1024:8.1f}MB")
+            return 0
+
+        if args.command == 'prune':
+            removed = prune_backups(args.dest, Config.BACKUP_KEEP, Config.BACKUP_KEEP_DAILY)
+            print(f"{len(removed)}개 삭제")
+            return 0
+
+        if args.command == 'verify':
+            files = list_backups(args.dest) if args.all else args.files
+            if not files:
+                verify_parser.error('백업 파일 또는 --all이 필요합니다')
+            failed = 0
+            for path in files:
+                try:
+                    verify_backup(path)
+                    print(f"{os.path.basename(path)}: ok")
+                except BackupError as e:
+                    failed += 1
+                    print(f"{os.path.basename(path)}: {e}")
+            return 1 if failed else 0
+
+        if args.command == 'restore':
+            manifest = restore_backup(args.file, args.db, args.force)
+            print(f"{manifest['file']} → {args.db} 복원 완료")
+            return 0
+
+        if args.command == 'ship':
+            shipper = WalShipper(args.db, args.dest, Config.WAL_SHIP_CHECKPOINT_FRAMES, Config.BACKUP_COMPRESS_LEVEL)
+            os.makedirs(args.dest, exist_ok=True)
+            if args.once:
+                print(f"{shipper.ship_once()}개 프레임 전송")
+                return 0
+            print(f"WAL 전송 시작: {args.db} → {args.dest} ({args.interval}초 주기)")
+            try:
+                shipper.run(args.interval)
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        chain, generations, frames = restore_wal(args.dest, args.db, args.until, args.chain, args.force)
+        print(f"{chain} 기준 백업 + WAL {generations}세대 {frames}프레임 → {args.db} 복원 완료")
+        return 0
+
+    except BackupError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
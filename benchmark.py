@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+평가 워크플로 부하 테스트/벤치마크 스크립트
+
+합성 데이터로 DB를 만든 뒤 실제 평가 흐름
+(평가 폼 → 임시저장 → 제출 → 상세 조회 → 차트 API → PDF → 문항 내보내기)을
+Flask 테스트 클라이언트 또는 HTTP로 반복 실행하고,
+단계별 처리량, p50/p95/p99 지연 시간, 최대 RSS를 JSON으로 저장합니다.
+
+    # 테스트 클라이언트 (임시 DB 자동 생성)
+    python benchmark.py --companies 50 --assessments 200 --iterations 20
+
+    # 실행 중인 서버 대상 (서버와 같은 DB 파일을 --db로 지정)
+    DATABASE_PATH=bench.db python app.py
+    python benchmark.py --db bench.db --url http://localhost:5000
+
+    # 이전 결과와 비교 (p95가 20% 이상 느려지면 종료 코드 1)
+    python benchmark.py --compare benchmark_results/benchmark_20240101_120000.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+import datagen
+
+# 앱 임포트 전에 벤치마크에 불필요한 부가 기능 비활성화
+os.environ.setdefault('SLOW_QUERY_LOG_ENABLED', '0')
+
+STEPS = [
+    'open_form', 'save_draft', 'submit', 'detail', 'chart_api',
+    'category_api', 'pdf_report', 'export_questions', 'assessments', 'assessment_history'
+]
+
+
+# ---------------------------------------------------------------------------
+# 합성 데이터 (datagen 모듈로 생성)
+# ---------------------------------------------------------------------------
+
+def load_fixture(db_path):
+    """벤치마크에 사용할 회사/문항/카테고리 ID 조회"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute('SELECT id FROM companies ORDER BY id')
+    company_ids = [row[0] for row in c.fetchall()]
+    c.execute('SELECT id FROM questions ORDER BY id')
+    question_ids = [row[0] for row in c.fetchall()]
+    c.execute('SELECT id FROM categories ORDER BY order_num')
+    category_ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    return company_ids, question_ids, category_ids
+
+
+# ---------------------------------------------------------------------------
+# 클라이언트
+# ---------------------------------------------------------------------------
+
+class TestClientDriver:
+    """Flask 테스트 클라이언트로 요청 실행"""
+
+    measures_rss = True
+
+    def __init__(self, db_path):
+        from app import app
+
+        app.config['DATABASE_PATH'] = db_path
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_data(), response.headers.get('Location')
+
+    def post_json(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_data(), response.headers.get('Location')
+
+    def post_form(self, path, form):
+        response = self.client.post(path, data=form)
+        return response.status_code, response.get_data(), response.headers.get('Location')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpDriver:
+    """실행 중인 서버에 HTTP 요청 실행 (서버 프로세스의 RSS는 측정하지 않음)"""
+
+    measures_rss = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def _send(self, request):
+        try:
+            with self.opener.open(request, timeout=120) as response:
+                return response.status, response.read(), response.headers.get('Location')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers.get('Location')
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+    def post_json(self, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        return self._send(urllib.request.Request(self.base_url + path, data=body,
+                                                 headers={'Content-Type': 'application/json'}))
+
+    def post_form(self, path, form):
+        body = urllib.parse.urlencode(form).encode('utf-8')
+        return self._send(urllib.request.Request(self.base_url + path, data=body))
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+
+def _reset_peak_rss():
+    """Linux에서 프로세스 최대 RSS(VmHWM) 초기화"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_kb():
+    """현재까지의 최대 RSS (KB)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage // 1024 if sys.platform == 'darwin' else usage
+    except ImportError:
+        return None
+
+
+def percentile(sorted_values, pct):
+    """최근접 순위 방식 백분위수"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class StepRecorder:
+    """단계별 지연 시간/오류/최대 RSS 수집"""
+
+    def __init__(self, measure_rss):
+        self.measure_rss = measure_rss
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.peak_rss = {step: None for step in STEPS}
+        self.spans = {}  # {단계: [처음 시작 시각, 마지막 종료 시각]} - 처리량 계산용
+
+    def run(self, step, func, *args):
+        if self.measure_rss:
+            _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            status, body, location = func(*args)
+        except Exception as e:
+            status, body, location = 599, str(e).encode('utf-8'), None
+        end = time.perf_counter()
+        elapsed = end - start
+        self.samples[step].append(elapsed)
+        self.spans.setdefault(step, [start, end])[1] = end
+        if status >= 400:
+            self.errors[step] += 1
+        if self.measure_rss:
+            rss = _peak_rss_kb()
+            if rss is not None:
+                self.peak_rss[step] = max(self.peak_rss[step] or 0, rss)
+        return status, body, location
+
+    def summary(self):
+        result = {}
+        for step in STEPS:
+            values = sorted(self.samples[step])
+            if not values:
+                continue
+            total = sum(values)
+            # 처리량: 단계가 처음 시작해서 마지막으로 끝날 때까지의 실제 경과 시간 기준 (다른 단계 시간 포함)
+            span = self.spans[step][1] - self.spans[step][0]
+            result[step] = {
+                'count': len(values),
+                'errors': self.errors[step],
+                'throughput_rps': round(len(values) / span, 2) if span else None,
+                'mean_ms': round(total / len(values) * 1000, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+                'peak_rss_kb': self.peak_rss[step],
+            }
+        return result
+
+
+def run_workflow(driver, recorder, company_id, question_ids, category_ids, drafts_per_assessment, rng):
+    """회사 1곳에 대해 평가 전체 흐름 1회 실행"""
+    _, _, location = recorder.run('open_form', driver.get, f'/assessment/new/{company_id}')
+
+    answers = {}
+    # 회사의 임시저장 평가가 있으면 그 평가로 이동하므로 이어서 저장 (회사당 하나)
+    assessment_id = None
+    if location and '/assessment/continue/' in location:
+        assessment_id = int(location.rstrip('/').rsplit('/', 1)[-1])
+    batch = max(1, len(question_ids) // max(1, drafts_per_assessment))
+    for i in range(drafts_per_assessment):
+        for q_id in question_ids[i * batch:(i + 1) * batch]:
+            answers[str(q_id)] = {'score': rng.randint(1, 5), 'comment': '벤치마크 의견' if rng.random() < 0.3 else ''}
+        payload = {'company_id': company_id, 'assessor_name': '벤치마크', 'assessment_id': assessment_id,
+                   'answers': answers, 'notes': ''}
+        status, body, _ = recorder.run('save_draft', driver.post_json, '/assessment/save_draft', payload)
+        if status == 200:
+            assessment_id = json.loads(body).get('assessment_id')
+
+    form = {'company_id': company_id, 'assessor_name': '벤치마크', 'notes': '',
+            'assessment_id': assessment_id or ''}
+    for q_id in question_ids:
+        form[f'question_{q_id}'] = answers.get(str(q_id), {}).get('score') or rng.randint(1, 5)
+        form[f'comment_{q_id}'] = answers.get(str(q_id), {}).get('comment', '')
+    status, _, location = recorder.run('submit', driver.post_form, '/assessment/submit', form)
+    if location:
+        assessment_id = int(location.rstrip('/').rsplit('/', 1)[-1])
+    if not assessment_id:
+        return
+
+    recorder.run('detail', driver.get, f'/assessment/{assessment_id}')
+    recorder.run('chart_api', driver.get, f'/api/assessment/{assessment_id}/chart')
+    for category_id in category_ids:
+        recorder.run('category_api', driver.get, f'/api/assessment/{assessment_id}/category/{category_id}/detail')
+    recorder.run('pdf_report', driver.get, f'/assessment/{assessment_id}/report')
+    recorder.run('export_questions', driver.get, '/questions/export')
+    recorder.run('assessments', driver.get, '/assessments')
+    recorder.run('assessment_history', driver.get, '/assessment_history')
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current, baseline_path, threshold):
+    """기준 결과 대비 p95 변화율 출력, 회귀 단계 목록 반환"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n=== 기준 결과와 비교: {baseline_path} ({baseline.get('revision')}) ===")
+    for step, stats in current['steps'].items():
+        base = baseline.get('steps', {}).get(step)
+        if not base or not base.get('p95_ms'):
+            continue
+        change = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+        mark = ''
+        if change > threshold:
+            mark = '  ← 회귀'
+            regressions.append(step)
+        print(f"{step:20s} p95 {base['p95_ms']:9.2f}ms → {stats['p95_ms']:9.2f}ms ({change:+.1f}%){mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='APS 평가 워크플로 벤치마크')
+    parser.add_argument('--db', help='사용할 DB 파일 (미지정 시 임시 DB 생성)')
+    parser.add_argument('--url', help='HTTP 모드 대상 서버 주소 (예: http://localhost:5000)')
+    parser.add_argument('--no-seed', action='store_true', help='기존 DB를 그대로 사용')
+    parser.add_argument('--companies', type=int, default=50, help='합성 회사 수')
+    parser.add_argument('--assessments', type=int, default=200, help='합성 완료 평가 수')
+    parser.add_argument('--drafts', type=int, default=20, help='합성 임시저장 평가 수')
+    parser.add_argument('--categories', type=int, default=4, help='카테고리 수')
+    parser.add_argument('--questions', type=int, default=28, help='문항 수')
+    parser.add_argument('--iterations', type=int, default=10, help='워크플로 반복 횟수')
+    parser.add_argument('--drafts-per-assessment', type=int, default=3, help='워크플로당 임시저장 횟수')
+    parser.add_argument('--seed', type=int, default=42, help='난수 시드')
+    parser.add_argument('--output', help='결과 JSON 경로 (기본: benchmark_results/benchmark_<시각>.json)')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=20.0, help='회귀로 판단할 p95 증가율(%%)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='aps_bench_'), 'aps_benchmark.db')
+    if not args.no_seed:
+        if os.path.exists(db_path):
+            print(f"❌ 이미 존재하는 DB에는 합성 데이터를 만들지 않습니다: {db_path} (--no-seed 사용)")
+            return 2
+        print(f"합성 데이터 생성 중: {db_path}")
+        start = time.perf_counter()
+        datagen.generate(db_path, companies=args.companies, categories=args.categories, questions=args.questions,
+                         assessments=args.assessments, drafts=args.drafts, seed=args.seed, progress=None)
+        print(f"합성 데이터 생성 완료 ({time.perf_counter() - start:.1f}초)")
+
+    company_ids, question_ids, category_ids = load_fixture(db_path)
+    if not company_ids or not question_ids:
+        print("❌ 회사 또는 문항 데이터가 없습니다.")
+        return 2
+
+    driver = HttpDriver(args.url) if args.url else TestClientDriver(db_path)
+    recorder = StepRecorder(driver.measures_rss)
+    rng = random.Random(args.seed)
+
+    print(f"워크플로 {args.iterations}회 실행 중 ({'HTTP ' + args.url if args.url else '테스트 클라이언트'})...")
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        run_workflow(driver, recorder, rng.choice(company_ids), question_ids, category_ids,
+                     args.drafts_per_assessment, rng)
+    wall_time = time.perf_counter() - started
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'mode': 'http' if args.url else 'test_client',
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'parameters': {
+            'companies': args.companies, 'categories': len(category_ids), 'assessments': args.assessments, 'drafts': args.drafts,
+            'questions': len(question_ids), 'iterations': args.iterations,
+            'drafts_per_assessment': args.drafts_per_assessment, 'seed': args.seed,
+        },
+        'wall_time_s': round(wall_time, 2),
+        'workflows_per_s': round(args.iterations / wall_time, 2) if wall_time else None,
+        'steps': recorder.summary(),
+    }
+
+    print(f"\n{'단계':20s} {'횟수':>5s} {'오류':>4s} {'req/s':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'RSS(MB)':>8s}")
+    for step, stats in result['steps'].items():
+        rss = f"{stats['peak_rss_kb'] / 1024:.1f}" if stats['peak_rss_kb'] else '-'
+        print(f"{step:20s} {stats['count']:5d} {stats['errors']:4d} {stats['throughput_rps'] or 0:8.1f} "
+              f"{stats['p50_ms']:8.1f}ms {stats['p95_ms']:8.1f}ms {stats['p99_ms']:8.1f}ms {rss:>8s}")
+
+    output = args.output or os.path.join('benchmark_results',
+                                         f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}")
+
+    if args.compare:
+        regressions = compare_results(result, args.compare, args.threshold)
+        if regressions:
+            print(f"\n⚠️  성능 회귀 감지: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
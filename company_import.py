@@ -0,0 +1,242 @@
+# company_import.py - 회사 일괄 등록 (Excel/CSV), 정규화한 회사명/이메일 기준 중복 제거
+import csv
+import io
+import re
+import unicodedata
+
+from openpyxl import load_workbook
+
+# 헤더 이름 → 컬럼 (한글/영문 헤더 모두 허용)
+HEADER_ALIASES = {
+    'name': ('회사명', '회사', '사업장', 'name', 'company', 'company_name'),
+    'industry': ('업종', 'industry'),
+    'size': ('규모', 'size'),
+    'contact_person': ('담당자', '담당자명', 'contact', 'contact_person'),
+    'contact_email': ('이메일', '담당자 이메일', 'email', 'contact_email'),
+}
+COLUMNS = tuple(HEADER_ALIASES)
+
+# 배치당 행 수 (배치마다 커밋)
+BATCH_SIZE = 500
+
+# 법인 형태 표기 (회사명 비교 시 제외)
+_LEGAL_FORMS = re.compile(r'주식회사|유한회사|유한책임회사|합자회사|합명회사|\(주\)|\(유\)|\(합\)|'
+                          r'\b(?:co\.?,?\s*ltd|ltd|inc|corp|corporation|llc|gmbh)\b\.?')
+_NON_WORD = re.compile(r'[\W_]+')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# 결과 상태
+CREATED = 'created'
+UPDATED = 'updated'
+DUPLICATE = 'duplicate'
+ERROR = 'error'
+
+
+def normalize_name(name):
+    """회사명 비교 키 (전각/반각·대소문자·공백·기호·법인 형태 표기 무시)"""
+    key = unicodedata.normalize('NFKC', name or '').casefold()
+    key = _LEGAL_FORMS.sub('', key)
+    return _NON_WORD.sub('', key) or None
+
+
+def normalize_email(email):
+    """이메일 비교 키 (앞뒤 공백 제거, 소문자)"""
+    key = unicodedata.normalize('NFKC', email or '').strip().lower()
+    return key or None
+
+
+def create_schema(c):
+    """회사 비교 키 컬럼과 색인 생성, 키가 없는 기존 회사 채우기 (init_db에서 호출)"""
+    c.execute("PRAGMA table_info(companies)")
+    columns = [column[1] for column in c.fetchall()]
+    for column in ('name_key', 'email_key'):
+        if column not in columns:
+            c.execute(f"ALTER TABLE companies ADD COLUMN {column} TEXT")
+            print(f"companies 테이블에 {column} 컬럼 추가됨")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_companies_name_key ON companies (name_key)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_companies_email_key ON companies (email_key)")
+    return backfill_keys(c)
+
+
+def backfill_keys(c):
+    """비교 키가 없는 회사의 키 채우기"""
+    c.execute("SELECT id, name, contact_email FROM companies WHERE name_key IS NULL")
+    rows = [(normalize_name(name), normalize_email(email), company_id) for company_id, name, email in c.fetchall()]
+    c.executemany("UPDATE companies SET name_key = ?, email_key = ? WHERE id = ?", rows)
+    return len(rows)
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _header_map(header):
+    """헤더 행 → {컬럼: 위치}"""
+    aliases = {alias.casefold(): column for column, names in HEADER_ALIASES.items() for alias in names}
+    positions = {}
+    for position, value in enumerate(header):
+        column = aliases.get(_clean(value).casefold())
+        if column and column not in positions:
+            positions[column] = position
+    if 'name' not in positions:
+        raise ValueError("헤더에 '회사명' 컬럼이 없습니다")
+    return positions
+
+
+def read_rows(stream, filename):
+    """업로드 파일의 데이터 행을 (행 번호, {컬럼: 값})로 차례로 반환 (.xlsx/.csv)
+
+    Excel은 읽기 전용 모드, CSV는 한 줄씩 읽으므로 파일 전체를 메모리에 올리지 않습니다.
+    """
+    lower = filename.lower()
+    if lower.endswith('.xlsx'):
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            yield from _map_rows(rows)
+        finally:
+            wb.close()
+    elif lower.endswith('.csv'):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        yield from _map_rows(csv.reader(text))
+    else:
+        raise ValueError('Excel(.xlsx) 또는 CSV(.csv) 파일만 업로드 가능합니다')
+
+
+def _map_rows(rows):
+    positions = None
+    for row_num, row in enumerate(rows, 1):
+        if positions is None:
+            positions = _header_map(row)
+            continue
+        values = {column: _clean(row[position]) if position < len(row) else ''
+                  for column, position in positions.items()}
+        if any(values.values()):
+            yield row_num, values
+
+
+def _validate(values):
+    if not values.get('name'):
+        return '회사명이 없습니다'
+    if len(values['name']) > 200:
+        return '회사명이 너무 깁니다'
+    email = values.get('contact_email')
+    if email and not _EMAIL.match(email):
+        return f"이메일 형식이 올바르지 않습니다: {email}"
+    return None
+
+
+def _find_existing(c, batch):
+    """배치의 이름/이메일 키와 일치하는 기존 회사 {('name'|'email', 키): id}"""
+    name_keys = list({entry['name_key'] for entry in batch if entry['name_key']})
+    email_keys = list({entry['email_key'] for entry in batch if entry['email_key']})
+    existing = {}
+    if name_keys:
+        c.execute(f"SELECT name_key, MIN(id) FROM companies WHERE name_key IN ({','.join('?' * len(name_keys))}) "
+                  "GROUP BY name_key", name_keys)
+        existing.update((('name', key), company_id) for key, company_id in c.fetchall())
+    if email_keys:
+        c.execute(f"SELECT email_key, MIN(id) FROM companies WHERE email_key IN ({','.join('?' * len(email_keys))}) "
+                  "GROUP BY email_key", email_keys)
+        existing.update((('email', key), company_id) for key, company_id in c.fetchall())
+    return existing
+
+
+def _process_batch(c, batch, seen, update_existing):
+    existing = _find_existing(c, batch)
+    for entry in batch:
+        result = entry['result']
+        values = entry['values']
+        match = None
+        for kind, key in (('name', entry['name_key']), ('email', entry['email_key'])):
+            if key and ((kind, key) in seen or (kind, key) in existing):
+                match = kind, seen.get((kind, key)), existing.get((kind, key))
+                break
+
+        if match is None:
+            c.execute('''INSERT INTO companies (name, industry, size, contact_person, contact_email, name_key, email_key)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      (values['name'], values.get('industry', ''), values.get('size', ''),
+                       values.get('contact_person', ''), values.get('contact_email', ''),
+                       entry['name_key'], entry['email_key']))
+            result.update(status=CREATED, company_id=c.lastrowid)
+        else:
+            kind, earlier, company_id = match
+            label = '회사명' if kind == 'name' else '이메일'
+            if earlier is not None:
+                # 같은 파일의 앞선 행에서 등록한 회사
+                result.update(status=DUPLICATE, company_id=earlier['company_id'],
+                              message=f"{earlier['row']}행과 {label}이 같습니다")
+            elif update_existing:
+                updates = {column: values[column] for column in COLUMNS[1:] if values.get(column)}
+                if updates:
+                    if 'contact_email' in updates:
+                        updates['email_key'] = entry['email_key']
+                    c.execute(f"UPDATE companies SET {', '.join(f'{column} = ?' for column in updates)} WHERE id = ?",
+                              list(updates.values()) + [company_id])
+                result.update(status=UPDATED, company_id=company_id, message=f"{label}이 같은 회사 정보 갱신")
+            else:
+                result.update(status=DUPLICATE, company_id=company_id, message=f"{label}이 같은 회사가 이미 있습니다")
+
+        if result['status'] == CREATED:
+            for kind, key in (('name', entry['name_key']), ('email', entry['email_key'])):
+                if key:
+                    seen.setdefault((kind, key), result)
+
+
+def import_companies(conn, rows, update_existing=False, dry_run=False, batch_size=BATCH_SIZE, max_rows=None):
+    """회사 일괄 등록 후 (행별 결과 목록, 상태별 건수) 반환
+
+    batch_size행마다 한 트랜잭션으로 기존 회사와 한 번에 대조하여 등록합니다.
+    dry_run이면 결과만 계산하고 롤백합니다.
+    """
+    c = conn.cursor()
+    results = []
+    counts = {CREATED: 0, UPDATED: 0, DUPLICATE: 0, ERROR: 0}
+    seen = {}
+    batch = []
+
+    def flush():
+        _process_batch(c, batch, seen, update_existing)
+        for entry in batch:
+            counts[entry['result']['status']] += 1
+        if dry_run:
+            conn.rollback()
+            # 롤백으로 등록되지 않은 회사 ID는 결과에 남기지 않음
+            created = {entry['result']['company_id'] for entry in batch if entry['result']['status'] == CREATED}
+            for entry in batch:
+                if entry['result']['company_id'] in created:
+                    entry['result']['company_id'] = None
+        else:
+            conn.commit()
+        batch.clear()
+
+    try:
+        for row_num, values in rows:
+            if max_rows is not None and len(results) >= max_rows:
+                results.append({'row': row_num, 'name': '', 'status': ERROR, 'company_id': None,
+                                'message': f"최대 {max_rows}행까지 가져올 수 있습니다 (이후 행 무시)"})
+                counts[ERROR] += 1
+                break
+            result = {'row': row_num, 'name': values.get('name', ''), 'status': None, 'company_id': None,
+                      'message': ''}
+            results.append(result)
+            error = _validate(values)
+            if error:
+                result.update(status=ERROR, message=error)
+                counts[ERROR] += 1
+                continue
+            batch.append({'result': result, 'values': values, 'name_key': normalize_name(values['name']),
+                          'email_key': normalize_email(values.get('contact_email'))})
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        conn.rollback()
+        raise
+    return results, counts
@@ -0,0 +1,243 @@
+# compression.py - 응답 압축(gzip/brotli), 조건부 요청(ETag), 정적 파일 지문 URL 및 사전 압축
+import gzip
+import hashlib
+import mimetypes
+import os
+import time
+
+from flask import current_app, make_response, request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli 미설치 시 gzip만 사용
+    brotli = None
+
+# 압축할 Content-Type → 최소 크기(바이트), 이보다 작으면 헤더/CPU 비용이 더 큼
+# xlsx(zip)와 이미지는 이미 압축된 형식이라 제외
+MIN_SIZES = {
+    'text/html': 1024,
+    'text/plain': 1024,
+    'text/csv': 1024,
+    'text/css': 1024,
+    'text/javascript': 1024,
+    'application/javascript': 1024,
+    'application/json': 512,
+    'image/svg+xml': 1024,
+    # 페이지 스트림은 이미 압축되어 있고 글꼴 등 일부만 줄어듦
+    'application/pdf': 64 * 1024,
+}
+
+# 압축 결과가 원본의 이 비율보다 크면 원본 그대로 전송
+MAX_RATIO = 0.9
+
+# 본문 해시로 ETag를 붙여 변경이 없으면 304로 응답할 GET 응답 (차트/조회 API, 다운로드 파일)
+# PDF/xlsx는 생성 시각/문서 ID가 들어가 본문이 매번 다르므로 라우트에서 render_etag로 미리 붙임
+ETAG_TYPES = {
+    'application/json',
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# 메모리에 읽어 압축할 파일 응답(send_file)의 최대 크기
+MAX_BUFFER_SIZE = 32 * 1024 * 1024
+
+# 지문 URL 정적 파일: 해시 길이, 캐시 기간 (내용이 바뀌면 URL이 바뀌므로 1년)
+HASH_LENGTH = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+metrics.registry.describe('aps_http_response_bytes_total', 'counter', '압축 대상 응답의 원본 크기 합계')
+metrics.registry.describe('aps_http_response_sent_bytes_total', 'counter', '압축 대상 응답의 전송 크기 합계')
+
+
+def choose_encoding(accept, available=('br', 'gzip')):
+    """Accept-Encoding에서 사용할 인코딩 ('br', 'gzip' 또는 None), 품질이 같으면 brotli 우선"""
+    best = None
+    best_quality = 0
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# 입력 기반 ETag에 섞는 프로세스 값 (재시작/배포로 보고서 생성 코드가 바뀌면 ETag도 바뀜)
+_RENDER_TOKEN = f"{os.getpid()}-{time.time()}"
+
+
+def render_etag(*inputs):
+    """렌더링 입력(뷰 모델, 벤치마크, 권고사항 등)으로 만든 ETag (출력이 매번 달라지는 PDF/xlsx용)"""
+    return hashlib.sha1(repr((_RENDER_TOKEN,) + inputs).encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """If-None-Match가 etag(압축 인코딩별 ETag 포함)와 같으면 렌더링 없이 보낼 304 응답, 아니면 None"""
+    matched = next((tag for tag in (etag, f"{etag}-br", f"{etag}-gzip") if request.if_none_match.contains(tag)), None)
+    if matched is None:
+        return None
+    response = make_response('', 304)
+    response.set_etag(matched)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def compress(data, encoding, level=6, quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality)
+    # mtime=0: 같은 내용이면 같은 결과 (ETag/캐시 일관성)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Asset:
+    """지문 URL 정적 파일 1개 (인코딩별 사전 압축본)"""
+
+    def __init__(self, name, data, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest}{ext}"
+        self.variants = {None: data}
+        min_size = MIN_SIZES.get(mimetype)
+        if min_size is not None and len(data) >= min_size:
+            # 한 번만 압축하므로 최고 압축률 사용
+            for encoding in ('br', 'gzip'):
+                if encoding == 'br' and brotli is None:
+                    continue
+                compressed = compress(data, encoding, level=9, quality=11)
+                if len(compressed) <= len(data) * MAX_RATIO:
+                    self.variants[encoding] = compressed
+
+
+class StaticAssets:
+    """static 폴더 파일의 지문 URL 목록 (프로세스 시작 시 한 번 읽고 압축)"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.by_name = {}    # 'offline.js' → Asset
+        self.by_hashed = {}  # 'offline.<해시>.js' → Asset
+        if not os.path.isdir(folder):
+            return
+        for root, _dirs, names in os.walk(folder):
+            for filename in names:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                asset = Asset(name, data, mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+                self.by_name[name] = asset
+                self.by_hashed[asset.hashed_name] = asset
+
+    def url_name(self, name):
+        asset = self.by_name.get(name)
+        return asset.hashed_name if asset else name
+
+    def respond(self, asset):
+        """사전 압축본 중 클라이언트가 받을 수 있는 것으로 응답 (1년 캐시, If-None-Match 시 304)"""
+        encoding = choose_encoding(request.accept_encodings, [e for e in asset.variants if e])
+        response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{asset.digest}-{encoding}" if encoding else asset.digest)
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
+
+
+def init_app(app):
+    """응답 압축 훅과 정적 파일 지문 URL 등록"""
+    if app.config['STATIC_FINGERPRINT'] and not app.debug:
+        _init_static(app)
+    if app.config['COMPRESS_ENABLED']:
+        _init_compression(app)
+
+
+def _init_static(app):
+    assets = StaticAssets(app.static_folder)
+    app.extensions['static_assets'] = assets
+    send_static = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        # url_for('static', filename='offline.js') → /static/offline.<해시>.js
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = assets.url_name(values['filename'])
+
+    def static(filename):
+        asset = assets.by_hashed.get(filename)
+        if asset is None:
+            # 지문 없는 URL은 기본 처리 (짧은 캐시)
+            return send_static(filename=filename)
+        return assets.respond(asset)
+
+    app.view_functions['static'] = static
+
+
+def _init_compression(app):
+    level = app.config['COMPRESS_LEVEL']
+    quality = app.config['COMPRESS_BROTLI_QUALITY']
+    record = app.config['METRICS_ENABLED']
+
+    @app.after_request
+    def compress_response(response):
+        if request.method not in ('GET', 'POST') or request.endpoint == 'static':
+            return response
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        mimetype = response.mimetype
+        min_size = MIN_SIZES.get(mimetype)
+        use_etag = request.method == 'GET' and mimetype in ETAG_TYPES
+        if min_size is None and not use_etag:
+            return response
+
+        if response.is_streamed:
+            # send_file 응답은 크기를 알 수 있을 때만 읽어서 처리, 생성기 응답은 그대로 전송
+            if not response.direct_passthrough or response.content_length is None \
+                    or response.content_length > MAX_BUFFER_SIZE:
+                return response
+            response.direct_passthrough = False
+        data = response.get_data()
+
+        encoding = None
+        if min_size is not None:
+            response.vary.add('Accept-Encoding')
+            if len(data) >= min_size and 'no-transform' not in response.headers.get('Cache-Control', ''):
+                encoding = choose_encoding(request.accept_encodings)
+
+        if use_etag:
+            # 인코딩별로 다른 표현이므로 ETag에 인코딩을 붙임
+            etag = response.get_etag()[0] or hashlib.sha1(data).hexdigest()
+            response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+            if 'Cache-Control' not in response.headers:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        if encoding is None:
+            return response
+        compressed = compress(data, encoding, level, quality)
+        if record:
+            metrics.registry.inc('aps_http_response_bytes_total', (('encoding', encoding),), len(data))
+        if len(compressed) > len(data) * MAX_RATIO:
+            if record:
+                metrics.registry.inc('aps_http_response_sent_bytes_total', (('encoding', encoding),), len(data))
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if not use_etag:
+            # 다른 곳에서 붙인 ETag(send_file 등)는 약한 ETag로 바꿔 인코딩이 달라도 같은 내용으로 비교
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+        if record:
+            metrics.registry.inc('aps_http_response_sent_bytes_total', (('encoding', encoding),), len(compressed))
+        return response
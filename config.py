@@ -2,4 +2,75 @@ import os
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'aps-assessment-secret-key-2024'
-    DATABASE_PATH = '/app/data/aps_assessment.db'
\ No newline at end of file
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', '/app/data/aps_assessment.db')
+
+    # 보고서/조회 화면 읽기 방식: 'wal'(읽기 전용 연결), 'snapshot'(백업 스냅샷), 'direct'(운영 DB 직접)
+    REPORT_READ_MODE = os.environ.get('REPORT_READ_MODE', 'wal')
+    # 스냅샷 파일 경로 (미지정 시 DATABASE_PATH + '.snapshot')
+    REPORT_SNAPSHOT_PATH = os.environ.get('REPORT_SNAPSHOT_PATH')
+    # 스냅샷 허용 지연 시간(초)
+    REPORT_SNAPSHOT_MAX_AGE = float(os.environ.get('REPORT_SNAPSHOT_MAX_AGE', 60))
+    # 스냅샷이 허용 지연 시간을 넘었을 때 갱신을 기다리는 최대 시간(초), 넘으면 운영 DB를 읽기 전용으로 조회
+    REPORT_SNAPSHOT_WAIT = float(os.environ.get('REPORT_SNAPSHOT_WAIT', 5))
+
+    # 계측: /metrics 엔드포인트 및 요청/SQL/템플릿 시간 기록
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # 요청 헤더 X-Profile: 1 로 단일 요청 cProfile 프로파일링 허용 여부
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', '/app/data/profiles')
+
+    # 느린 쿼리 로그: 임계값(ms)을 넘은 SQL 문을 파라미터/실행 계획과 함께 기록
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', '1') == '1'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    # 로그 파일 경로 (미지정 시 DATABASE_PATH와 같은 디렉터리의 slow_queries.log)
+    SLOW_QUERY_LOG_PATH = os.environ.get('SLOW_QUERY_LOG_PATH')
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 3
+
+    # 템플릿 바이트코드 캐시 디렉터리 (미지정 시 시스템 임시 디렉터리)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+    # 멀티 테넌트: 'off'(단일 DB), 'subdomain'(acme.example.com → acme), 'header'(TENANT_HEADER 값)
+    TENANT_MODE = os.environ.get('TENANT_MODE', 'off')
+    TENANT_HEADER = os.environ.get('TENANT_HEADER', 'X-Tenant')
+    # 서브도메인 모드의 기준 도메인 (미지정 시 호스트의 첫 번째 레이블을 테넌트로 사용)
+    TENANT_BASE_DOMAIN = os.environ.get('TENANT_BASE_DOMAIN')
+    # 테넌트 DB 디렉터리 (테넌트별 <이름>.db)
+    TENANT_DATA_DIR = os.environ.get('TENANT_DATA_DIR', '/app/data/tenants')
+    # 동시에 열어 둘 테넌트 DB 수 (초과 시 가장 오래 사용하지 않은 테넌트부터 닫음)
+    TENANT_MAX_OPEN = int(os.environ.get('TENANT_MAX_OPEN', 32))
+    # 이 시간(초) 동안 요청이 없는 테넌트 DB는 닫음
+    TENANT_IDLE_TIMEOUT = float(os.environ.get('TENANT_IDLE_TIMEOUT', 600))
+    # 테넌트별 유휴 연결 풀 크기 (쓰기/읽기 전용 각각)
+    TENANT_POOL_SIZE = int(os.environ.get('TENANT_POOL_SIZE', 4))
+    # 테넌트별 동시 Excel/PDF 생성 수와 대기 시간(초) - 한 테넌트의 내보내기가 작업 스레드를 독점하지 않도록 제한
+    TENANT_EXPORT_CONCURRENCY = int(os.environ.get('TENANT_EXPORT_CONCURRENCY', 2))
+    TENANT_EXPORT_WAIT = float(os.environ.get('TENANT_EXPORT_WAIT', 10))
+
+    # 백업: 온라인 백업 API로 페이지 단위 복사 후 gzip 압축 + SHA-256 manifest (python backup.py create)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', '/app/data/backups')
+    # 보존 정책: 최근 BACKUP_KEEP개 + 최근 BACKUP_KEEP_DAILY일의 날짜별 마지막 백업
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 14))
+    BACKUP_KEEP_DAILY = int(os.environ.get('BACKUP_KEEP_DAILY', 7))
+    BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+    BACKUP_COMPRESS_LEVEL = int(os.environ.get('BACKUP_COMPRESS_LEVEL', 6))
+    # WAL 전송 (python backup.py ship): 아카이브 디렉터리, 전송 주기(초), 직접 체크포인트할 WAL 프레임 수
+    WAL_SHIP_DIR = os.environ.get('WAL_SHIP_DIR', '/app/data/wal_archive')
+    WAL_SHIP_INTERVAL = float(os.environ.get('WAL_SHIP_INTERVAL', 10))
+    WAL_SHIP_CHECKPOINT_FRAMES = int(os.environ.get('WAL_SHIP_CHECKPOINT_FRAMES', 500))
+
+    # 회사 일괄 등록: 배치(트랜잭션)당 행 수, 파일당 최대 행 수
+    COMPANY_IMPORT_BATCH_SIZE = int(os.environ.get('COMPANY_IMPORT_BATCH_SIZE', 500))
+    COMPANY_IMPORT_MAX_ROWS = int(os.environ.get('COMPANY_IMPORT_MAX_ROWS', 20000))
+
+    # 응답 압축 (gzip, brotli 패키지가 있으면 brotli 우선): HTML/JSON/CSS/JS 등 Content-Type별 최소 크기 이상만 압축
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    # 정적 파일 URL에 내용 해시를 넣고 1년 캐시 (디버그 모드에서는 사용 안 함)
+    STATIC_FINGERPRINT = os.environ.get('STATIC_FINGERPRINT', '1') == '1'
+
+    # Excel 결과 보고서: 렌더링 프로세스 수(0이면 요청 스레드에서 생성), 대기 시간(초), 한 번에 내보낼 최대 회사 수
+    EXCEL_RENDER_WORKERS = int(os.environ.get('EXCEL_RENDER_WORKERS', 2))
+    EXCEL_RENDER_TIMEOUT = float(os.environ.get('EXCEL_RENDER_TIMEOUT', 120))
+    EXCEL_MAX_COMPANIES = int(os.environ.get('EXCEL_MAX_COMPANIES', 200))
@@ -0,0 +1,347 @@
+# database.py - SQLite 연결 관리
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# 잠금 대기 시간 (밀리초)
+BUSY_TIMEOUT_MS = 5000
+
+# 커서를 반복(for row in cursor)할 때 이 행 수마다 모아서 리스너에 통지
+ITER_NOTIFY_ROWS = 256
+
+# 스냅샷 백업 시 한 번에 복사할 페이지 수
+SNAPSHOT_PAGES_PER_STEP = 256
+
+# 허용 지연 시간의 이 비율이 지나면 조회는 기존 스냅샷으로 하고 백그라운드에서 미리 갱신
+SNAPSHOT_REFRESH_AHEAD = 0.5
+
+_WHITESPACE = re.compile(r'\s+')
+
+# SQL 문 실행/조회 리스너 (계측, 느린 쿼리 로그 등)
+_statement_listeners = []
+
+
+def normalize_statement(sql, max_length=None):
+    """SQL 문 공백 정규화 (max_length 지정 시 길이 제한)"""
+    statement = _WHITESPACE.sub(' ', sql).strip()
+    return statement[:max_length] if max_length else statement
+
+
+def add_statement_listener(listener):
+    """SQL 문 실행/조회 시 호출될 리스너 등록
+
+    listener(trace, elapsed, rows) 형태로 execute 직후와 fetch 호출마다 호출되며,
+    elapsed/rows는 이번 호출분, trace.elapsed/trace.rows는 해당 문장 실행 이후 누적값입니다.
+    """
+    if listener not in _statement_listeners:
+        _statement_listeners.append(listener)
+
+
+class StatementTrace:
+    """실행 중인 SQL 문 1건의 누적 실행 정보"""
+
+    __slots__ = ('sql', 'parameters', 'connection', 'elapsed', 'rows', 'calls', 'flagged')
+
+    def __init__(self, sql, parameters, connection):
+        self.sql = sql
+        self.parameters = parameters
+        self.connection = connection
+        self.elapsed = 0.0
+        self.rows = 0
+        self.calls = 0  # 리스너 통지 횟수 (1이면 execute 직후)
+        self.flagged = False  # 리스너가 중복 처리를 막기 위해 사용
+
+
+class TracedCursor(sqlite3.Cursor):
+    """실행/조회 시간과 반환 행 수를 리스너에 전달하는 커서
+
+    fetch* 호출은 호출마다, 반복(for row in cursor)은 ITER_NOTIFY_ROWS행마다와 끝에서 통지합니다.
+    """
+
+    trace = None
+    _iter_rows = 0
+    _iter_elapsed = 0.0
+
+    def _notify(self, start, rows):
+        self._notify_elapsed(time.perf_counter() - start, rows)
+
+    def _notify_elapsed(self, elapsed, rows):
+        trace = self.trace
+        trace.elapsed += elapsed
+        trace.rows += rows
+        trace.calls += 1
+        for listener in _statement_listeners:
+            listener(trace, elapsed, rows)
+
+    def _flush_iteration(self):
+        """반복 중 모아 둔 행 수/시간 통지"""
+        if self._iter_rows or self._iter_elapsed:
+            rows, elapsed = self._iter_rows, self._iter_elapsed
+            self._iter_rows, self._iter_elapsed = 0, 0.0
+            if self.trace:
+                self._notify_elapsed(elapsed, rows)
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._iter_elapsed += time.perf_counter() - start
+            self._flush_iteration()
+            raise
+        self._iter_elapsed += time.perf_counter() - start
+        self._iter_rows += 1
+        if self._iter_rows >= ITER_NOTIFY_ROWS:
+            self._flush_iteration()
+        return row
+
+    def close(self):
+        # 끝까지 반복하지 않은 커서의 행 수도 반영
+        self._flush_iteration()
+        super().close()
+
+    def execute(self, sql, parameters=()):
+        self._flush_iteration()
+        self.trace = StatementTrace(sql, parameters, self.connection)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._notify(start, 0)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush_iteration()
+        self.trace = StatementTrace(sql, None, self.connection)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._notify(start, 0)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self.trace:
+            self._notify(start, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self.trace:
+            self._notify(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self.trace:
+            self._notify(start, len(rows))
+        return rows
+
+
+class Connection(sqlite3.Connection):
+    """풀에서 꺼낸 연결은 close() 시 실제로 닫지 않고 풀에 반환"""
+
+    pool = None
+
+    def close(self):
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+
+class TracedConnection(Connection):
+    """TracedCursor를 기본 커서로 사용하는 연결"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect_db(db_path, readonly=False, pool=None):
+    """SQLite 연결 생성 (readonly=True이면 읽기 전용 연결, pool을 주면 스레드 간 재사용 가능한 풀 연결)"""
+    factory = TracedConnection if _statement_listeners else Connection
+    shared = pool is not None
+    if readonly:
+        uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, factory=factory, check_same_thread=not shared)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(db_path, factory=factory, check_same_thread=not shared)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # 외래 키 제약(ON DELETE CASCADE/RESTRICT) 적용 - SQLite는 연결마다 켜야 함
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.pool = pool
+    return conn
+
+
+class ConnectionPool:
+    """DB 파일 1개에 대한 유휴 연결 풀
+
+    acquire()로 꺼낸 연결은 한 번에 한 요청만 사용하며, close() 시 열린 트랜잭션을
+    롤백하고 유휴 연결이 max_idle개 미만이면 풀에 반환합니다.
+    """
+
+    def __init__(self, db_path, readonly=False, max_idle=4):
+        self.db_path = db_path
+        self.readonly = readonly
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return connect_db(self.db_path, readonly=self.readonly, pool=self)
+
+    def release(self, conn):
+        """풀에 반환했으면 True (호출한 쪽에서 실제로 닫지 않음)"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            return False
+        with self._lock:
+            if self._closed or len(self._idle) >= self.max_idle:
+                return False
+            self._idle.append(conn)
+            return True
+
+    def close(self):
+        """유휴 연결을 모두 닫음 (사용 중인 연결은 반환 시 닫힘)"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+
+def backup_database(db_path, dest_path, pages=SNAPSHOT_PAGES_PER_STEP, sleep=0.005, progress=None):
+    """온라인 백업 API로 DB를 dest_path에 복사 (임시 파일에 복사한 뒤 교체)
+
+    페이지 단위로 나누어 복사하므로 백업 중에도 다른 연결의 쓰기가 진행될 수 있습니다.
+    progress(status, remaining, total)는 단계마다 호출되며, 예외를 내면 백업을 중단합니다.
+    """
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        src.backup(dst, pages=pages, sleep=sleep, progress=progress)
+        # 백업 파일은 WAL 파일 없이 단독으로 열 수 있게 함
+        dst.execute("PRAGMA journal_mode = DELETE")
+    except BaseException:
+        dst.close()
+        os.remove(tmp_path)
+        raise
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, dest_path)
+
+
+class SnapshotStale(Exception):
+    """대기 시간 안에 허용 지연 시간 내의 스냅샷을 만들지 못함"""
+
+
+class ReportSnapshot:
+    """보고서 조회용 스냅샷 DB
+
+    SQLite 온라인 백업 API로 운영 DB를 페이지 단위로 복사해 두고,
+    허용 지연 시간(max_age)에 가까워지면 백그라운드 스레드에서 다시 복사합니다.
+    조회 요청은 스냅샷 파일만 읽으므로 임시저장 쓰기와 잠금을 공유하지 않습니다.
+    """
+
+    def __init__(self, db_path, snapshot_path, max_age):
+        self.db_path = db_path
+        self.snapshot_path = snapshot_path
+        self.max_age = max_age
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refresh_done = None  # 진행 중인 갱신의 완료 이벤트
+
+    def age(self):
+        """스냅샷 경과 시간(초), 스냅샷이 없으면 None"""
+        try:
+            return time.time() - os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """운영 DB를 임시 파일로 백업한 뒤 스냅샷 파일과 교체"""
+        started = time.time()
+        backup_database(self.db_path, self.snapshot_path)
+        # 경과 시간은 복사를 시작한 시각 기준 (복사 중 커밋된 변경은 빠질 수 있음)
+        os.utime(self.snapshot_path, (started, started))
+
+    def _start_refresh(self):
+        """백그라운드 갱신 시작 후 완료 이벤트 반환 (이미 갱신 중이면 그 이벤트)"""
+        with self._lock:
+            if self._refresh_done is None:
+                self._refresh_done = threading.Event()
+                threading.Thread(target=self._refresh_worker, args=(self._refresh_done,),
+                                 name='report-snapshot', daemon=True).start()
+            return self._refresh_done
+
+    def _refresh_worker(self, done):
+        try:
+            self.refresh()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+        finally:
+            with self._lock:
+                self._refresh_done = None
+            done.set()
+
+    def connect(self, max_age=None, timeout=None):
+        """허용 지연 시간 내의 스냅샷에 대한 읽기 전용 연결 반환
+
+        스냅샷이 허용 지연 시간을 넘었으면 갱신을 최대 timeout초 기다리고,
+        그래도 오래된 경우 SnapshotStale을 발생시킵니다 (오래된 데이터를 반환하지 않음).
+        """
+        if max_age is None:
+            max_age = self.max_age
+        age = self.age()
+        if age is None or age > self.max_age * SNAPSHOT_REFRESH_AHEAD or age > max_age:
+            done = self._start_refresh()
+            if age is None or age > max_age:
+                done.wait(timeout)
+                age = self.age()
+                if age is None or age > max_age:
+                    reason = f": {self.last_error}" if self.last_error else ''
+                    raise SnapshotStale(f"{max_age:g}초 이내의 스냅샷이 없습니다{reason}")
+        return connect_db(self.snapshot_path, readonly=True)
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_report_snapshot(db_path, snapshot_path, max_age):
+    """DB 경로별 스냅샷 관리 객체 반환 (프로세스 내에서 공유)"""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(snapshot_path)
+        if snapshot is None or snapshot.db_path != db_path:
+            snapshot = ReportSnapshot(db_path, snapshot_path, max_age)
+            _snapshots[snapshot_path] = snapshot
+        snapshot.max_age = max_age
+        return snapshot
+
+
+def drop_report_snapshots(db_path):
+    """DB 경로에 대한 스냅샷 관리 객체 제거 (스냅샷 파일은 유지)"""
+    with _snapshots_lock:
+        for snapshot_path in [path for path, snapshot in _snapshots.items() if snapshot.db_path == db_path]:
+            del _snapshots[snapshot_path]
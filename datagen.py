@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+대용량 테스트 DB용 합성 데이터 생성기
+
+시드 값이 같으면 항상 같은 데이터를 만듭니다.
+회사, 카테고리/문항/선택지, 완료 평가와 상세 결과, 임시저장(반복 저장 이력 포함)을
+대량 INSERT(executemany)와 적재용 PRAGMA 설정으로 빠르게 기록합니다.
+
+    # 회사 5천 곳, 문항 300개(카테고리 12개), 완료 평가 3만 건 → 결과 약 900만 행
+    python datagen.py --db big.db --companies 5000 --categories 12 --questions 300 --assessments 30000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import analytics
+import company_import
+import events
+import question_bank
+import search
+
+OPTION_LEVELS = ['기본', '관리', '정의', '최적화', '혁신']
+
+CATEGORY_NAMES = [
+    '현행 프로세스 평가', '데이터 준비도 평가', '관련 시스템 평가', '거버넌스 평가',
+    '수요 관리 평가', '자재 관리 평가', '설비 관리 평가', '품질 관리 평가',
+    '물류 관리 평가', '원가 관리 평가', '인력 운영 평가', '디지털 역량 평가'
+]
+
+INDUSTRIES = ['자동차 부품', '전자', '반도체', '화학', '식품', '기계', '철강', '섬유', '제약', '조선']
+SIZES = ['대기업', '중견기업', '중소기업']
+COMPANY_PREFIXES = ['한국', '대한', '동양', '신성', '삼진', '우진', '태광', '현대', '세진', '미래']
+COMPANY_SUFFIXES = ['산업', '정밀', '전자', '화학', '테크', '금속', '기계', '식품']
+COMMENTS = [
+    '현업 인터뷰 결과 반영', '관련 문서 확인 완료', '일부 공정만 해당', '개선 계획 수립 중',
+    '시스템 화면으로 확인', '담당자별 편차가 큼', '차기 평가 시 재확인 필요'
+]
+
+# 적재 중에만 사용하는 PRAGMA (완료 후 WAL/NORMAL로 복원)
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",  # 256MB
+]
+
+BASE_DATE = datetime(2024, 1, 1)
+
+
+def _timestamp(days, seconds=0):
+    return (BASE_DATE + timedelta(days=days, seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _epoch(days, seconds=0):
+    return int((BASE_DATE + timedelta(days=days, seconds=seconds)).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _create_schema(db_path):
+    """앱의 init_db로 스키마 생성"""
+    from app import app, init_db
+
+    app.config['DATABASE_PATH'] = db_path
+    init_db()
+
+
+def generate(db_path, companies=1000, categories=4, questions=28, assessments=5000, drafts=200,
+             draft_saves=3, comment_ratio=0.3, seed=42, batch_size=50000, progress=print):
+    """합성 데이터 생성 후 테이블별 행 수 반환
+
+    drafts는 임시저장 상태로 남는 평가 수(회사 수 이하)이며, 완료 평가도 draft_saves 범위 내에서
+    여러 번 임시저장한 이력을 가집니다.
+    """
+    _create_schema(db_path)
+    rng = random.Random(seed)
+    categories = max(1, min(categories, questions))
+    counts = {}
+
+    conn = sqlite3.connect(db_path)
+    for pragma in LOAD_PRAGMAS:
+        conn.execute(pragma)
+    c = conn.cursor()
+
+    # 검색 색인은 적재 후 한 번에 생성 (행마다 트리거가 실행되지 않도록)
+    search.drop_schema(c)
+
+    # 카테고리
+    category_rows = []
+    for cat_id in range(1, categories + 1):
+        base_name = CATEGORY_NAMES[(cat_id - 1) % len(CATEGORY_NAMES)]
+        name = base_name if cat_id <= len(CATEGORY_NAMES) else f'{base_name} {(cat_id - 1) // len(CATEGORY_NAMES) + 1}'
+        category_rows.append((cat_id, name, round(1.0 / categories, 4), f'{name} 영역', cat_id))
+    c.executemany("INSERT INTO categories (id, name, weight, description, order_num) VALUES (?, ?, ?, ?, ?)",
+                  category_rows)
+    counts['categories'] = len(category_rows)
+
+    # 문항/선택지 (카테고리별로 고르게 분배, 코드는 카테고리.그룹.순번)
+    question_rows = []
+    question_category = []
+    for cat_id in range(1, categories + 1):
+        per_category = questions // categories + (1 if cat_id <= questions % categories else 0)
+        for order in range(1, per_category + 1):
+            q_id = len(question_rows) + 1
+            code = f'{cat_id}.{(order - 1) // 5 + 1}.{(order - 1) % 5 + 1}'
+            question_rows.append((q_id, cat_id, code, f'평가 문항 {code}', f'평가 문항 {code}에 대한 설명', 5, order,
+                                  question_bank.sort_key(code)))
+            question_category.append(cat_id)
+    c.executemany('''INSERT INTO questions (id, category_id, code, title, description, max_score, order_num, sort_key)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', question_rows)
+    c.executemany("INSERT INTO question_options (question_id, score, description) VALUES (?, ?, ?)",
+                  ((q_id, score, f"Level {score} - {OPTION_LEVELS[score - 1]} 수준")
+                   for q_id in range(1, questions + 1) for score in range(1, 6)))
+    counts['questions'] = questions
+    counts['question_options'] = questions * 5
+
+    # 회사 (회사별 기준 성숙도를 함께 생성)
+    company_rows = []
+    company_level = []
+    for company_id in range(1, companies + 1):
+        name = f'{rng.choice(COMPANY_PREFIXES)}{rng.choice(COMPANY_SUFFIXES)} {company_id:06d}'
+        email = f'contact{company_id}@example.com'
+        company_rows.append((company_id, name, rng.choice(INDUSTRIES), rng.choice(SIZES),
+                             f'담당자{company_id}', email, _timestamp(rng.randint(0, 365)),
+                             company_import.normalize_name(name), company_import.normalize_email(email)))
+        company_level.append(rng.randint(1, 5))
+    c.executemany('''INSERT INTO companies (id, name, industry, size, contact_person, contact_email, created_date,
+                                            name_key, email_key)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', company_rows)
+    counts['companies'] = companies
+    conn.commit()
+
+    # 평가자 (이벤트 로그의 행위자)
+    c.executemany("INSERT INTO event_actors (id, name) VALUES (?, ?)",
+                  ((n, f'평가자{n:02d}') for n in range(1, 51)))
+
+    # 평가/결과/임시저장/이벤트 (배치 단위로 기록)
+    assessment_buf, result_buf, draft_buf, event_buf = [], [], [], []
+    for key in ('assessments', 'assessment_results', 'assessment_drafts', 'assessment_events'):
+        counts[key] = 0
+
+    def flush():
+        c.executemany('''INSERT INTO assessments (id, company_id, assessor_name, assessment_date, total_score,
+                         maturity_level, notes, status, last_modified, completion_percentage)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', assessment_buf)
+        c.executemany('''INSERT INTO assessment_results (assessment_id, question_id, score, comment)
+                         VALUES (?, ?, ?, ?)''', result_buf)
+        c.executemany('''INSERT INTO assessment_drafts (assessment_id, question_id, score, comment, saved_at)
+                         VALUES (?, ?, ?, ?, ?)''', draft_buf)
+        c.executemany('''INSERT INTO assessment_events (assessment_id, ts, type, actor_id, payload)
+                         VALUES (?, ?, ?, ?, ?)''', event_buf)
+        conn.commit()
+        counts['assessments'] += len(assessment_buf)
+        counts['assessment_results'] += len(result_buf)
+        counts['assessment_drafts'] += len(draft_buf)
+        counts['assessment_events'] += len(event_buf)
+        for buf in (assessment_buf, result_buf, draft_buf, event_buf):
+            buf.clear()
+
+    # 회사당 임시저장 평가는 하나 (고유 인덱스)
+    drafts = min(drafts, companies)
+    draft_companies = rng.sample(range(1, companies + 1), drafts)
+    total = assessments + drafts
+    started = time.perf_counter()
+    max_total = questions * 5
+    for assessment_id in range(1, total + 1):
+        is_draft = assessment_id > assessments
+        company_id = draft_companies[assessment_id - assessments - 1] if is_draft else rng.randint(1, companies)
+        level = company_level[company_id - 1]
+        actor_id = rng.randint(1, 50)
+        assessor = f'평가자{actor_id:02d}'
+        day = rng.randint(0, 730)
+        answered = rng.randint(1, questions - 1) if is_draft and questions > 1 else questions
+
+        scores = [min(5, max(1, level + rng.randint(-1, 1))) for _ in range(answered)]
+        rows = [(assessment_id, q_id, score, rng.choice(COMMENTS) if rng.random() < comment_ratio else '')
+                for q_id, score in enumerate(scores, 1)]
+
+        # 임시저장 반복 이력 (저장할 때마다 답변 수 증가)
+        saves = rng.randint(1, max(1, draft_saves))
+        event_buf.append((assessment_id, _epoch(day), events.CREATED, actor_id,
+                          events.encode([company_id, questions])))
+        saved = 0
+        for save in range(1, saves + 1):
+            ts = _epoch(day, save * 600)
+            upto = answered * save // saves
+            event_buf.extend((assessment_id, ts, events.ANSWER_CHANGED, actor_id, events.encode(list(row[1:])))
+                             for row in rows[saved:upto])
+            saved = upto
+            event_buf.append((assessment_id, ts, events.DRAFT_SAVED, actor_id,
+                              events.encode([upto, questions, save])))
+        last_modified = _timestamp(day, (saves + 1) * 600)
+
+        if is_draft:
+            draft_buf.extend(row + (last_modified,) for row in rows)
+            assessment_buf.append((assessment_id, company_id, assessor, _timestamp(day), None, None, '',
+                                   'draft', last_modified, int(answered / questions * 100)))
+        else:
+            total_score = sum(scores)
+            percentage = total_score / max_total * 100
+            maturity = 1 if percentage < 40 else 2 if percentage < 60 else 3 if percentage < 80 else \
+                4 if percentage < 91 else 5
+            result_buf.extend(rows)
+            event_buf.append((assessment_id, _epoch(day, (saves + 1) * 600), events.SUBMITTED, actor_id,
+                              events.encode([total_score, maturity, questions, questions])))
+            assessment_buf.append((assessment_id, company_id, assessor, _timestamp(day), total_score, maturity,
+                                   '', 'completed', last_modified, 100))
+
+        if len(result_buf) + len(draft_buf) >= batch_size:
+            flush()
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress(f"  평가 {assessment_id:,}/{total:,} ({assessment_id / total * 100:.0f}%, {elapsed:.1f}초)")
+    flush()
+
+    # 검색 색인 재생성
+    search.create_schema(c)
+    conn.commit()
+
+    # 모든 평가를 생성한 문항 은행 버전에 고정
+    question_bank.pin_unversioned(c, db_path)
+    conn.commit()
+
+    # 벤치마킹용 카테고리 점수
+    counts['assessment_category_scores'] = analytics.backfill_category_scores(c)
+    conn.commit()
+
+    # 적재 후 일반 운영 설정 복원 및 통계 수집
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='대용량 합성 테스트 DB 생성')
+    parser.add_argument('--db', required=True, help='생성할 DB 파일 경로')
+    parser.add_argument('--force', action='store_true', help='기존 파일이 있으면 삭제 후 생성')
+    parser.add_argument('--companies', type=int, default=1000, help='회사 수')
+    parser.add_argument('--categories', type=int, default=4, help='카테고리 수')
+    parser.add_argument('--questions', type=int, default=28, help='문항 수')
+    parser.add_argument('--assessments', type=int, default=5000, help='완료 평가 수')
+    parser.add_argument('--drafts', type=int, default=200, help='임시저장 상태 평가 수')
+    parser.add_argument('--draft-saves', type=int, default=3, help='평가당 최대 임시저장 횟수')
+    parser.add_argument('--comment-ratio', type=float, default=0.3, help='의견이 달린 답변 비율')
+    parser.add_argument('--seed', type=int, default=42, help='난수 시드')
+    parser.add_argument('--batch-size', type=int, default=50000, help='배치당 결과 행 수')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            print(f"❌ 파일이 이미 존재합니다: {args.db} (--force로 덮어쓰기)")
+            return 2
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    print(f"합성 데이터 생성 시작: {args.db} (seed={args.seed})")
+    started = time.perf_counter()
+    counts = generate(args.db, companies=args.companies, categories=args.categories, questions=args.questions,
+                      assessments=args.assessments, drafts=args.drafts, draft_saves=args.draft_saves,
+                      comment_ratio=args.comment_ratio, seed=args.seed, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    print("\n=== 생성 결과 ===")
+    for table, count in counts.items():
+        print(f"{table}: {count:,}행")
+    total_rows = sum(counts.values())
+    print(f"\n총 {total_rows:,}행, {elapsed:.1f}초 ({total_rows / elapsed:,.0f}행/초), "
+          f"파일 크기 {os.path.getsize(args.db) / 1024 / 1024:.1f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+평가 이벤트 로그 (추가 전용)
+
+평가의 모든 변경(답변 변경, 임시저장, 제출, 삭제, 문항 수정)을 assessment_events에
+짧은 JSON 배열 형태로 기록합니다. 기록된 이벤트는 트리거로 수정/삭제가 막혀 있으며,
+평가별로 주기적인 스냅샷을 남겨 임의 시점의 상태를 빠르게 재구성할 수 있습니다.
+
+    # 평가 12의 현재 상태 / 특정 시점 상태
+    python events.py state 12
+    python events.py state 12 --at "2025-01-31 18:00:00"
+
+    # 스냅샷이 오래된 평가 모두 스냅샷 생성
+    python events.py snapshot --all
+"""
+import argparse
+import json
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
+# 이벤트 종류 (저장 값은 정수 코드)
+CREATED = 1           # [company_id, total_questions]
+ANSWER_CHANGED = 2    # [question_id, score, comment]
+ANSWER_CLEARED = 3    # [question_id]
+NOTES_CHANGED = 4     # [notes]
+ASSESSOR_CHANGED = 5  # [assessor_name]
+DRAFT_SAVED = 6       # [questions_answered, total_questions, version]
+SUBMITTED = 7         # [total_score, maturity_level, questions_answered, total_questions]
+DRAFT_DELETED = 8     # []
+QUESTION_EDITED = 9   # [question_id, code, title] (assessment_id 없음)
+QUESTION_DELETED = 10  # [question_id] (assessment_id 없음)
+QUESTION_CREATED = 11  # [question_id, code, title] (assessment_id 없음)
+
+EVENT_NAMES = {
+    CREATED: 'created',
+    ANSWER_CHANGED: 'answer_changed',
+    ANSWER_CLEARED: 'answer_cleared',
+    NOTES_CHANGED: 'notes_changed',
+    ASSESSOR_CHANGED: 'assessor_changed',
+    DRAFT_SAVED: 'saved_draft',
+    SUBMITTED: 'completed',
+    DRAFT_DELETED: 'draft_deleted',
+    QUESTION_EDITED: 'question_edited',
+    QUESTION_DELETED: 'question_deleted',
+    QUESTION_CREATED: 'question_created',
+}
+
+# 이력 화면에 표시하는 평가 단위 이벤트와 설명
+LIFECYCLE_NOTES = {
+    CREATED: '평가 시작',
+    DRAFT_SAVED: '임시저장',
+    SUBMITTED: '평가 완료',
+    DRAFT_DELETED: '임시저장 삭제',
+}
+
+# 평가별 스냅샷 간격 (마지막 스냅샷 이후 이벤트 수)
+SNAPSHOT_INTERVAL = 100
+
+
+def create_schema(c):
+    """이벤트/행위자/스냅샷 테이블 생성 (init_db에서 호출)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS event_actors (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS assessment_events (
+        id INTEGER PRIMARY KEY,
+        assessment_id INTEGER,
+        ts INTEGER NOT NULL,
+        type INTEGER NOT NULL,
+        actor_id INTEGER,
+        payload TEXT
+    )''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_assessment_events_assessment
+                 ON assessment_events (assessment_id, id)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS assessment_snapshots (
+        assessment_id INTEGER NOT NULL,
+        event_id INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        state BLOB NOT NULL,
+        PRIMARY KEY (assessment_id, event_id)
+    )''')
+
+    # 추가 전용: 기록된 이벤트는 수정/삭제 불가
+    for action in ('UPDATE', 'DELETE'):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS assessment_events_no_{action.lower()}
+                      BEFORE {action} ON assessment_events
+                      BEGIN
+                          SELECT RAISE(ABORT, 'assessment_events는 추가 전용입니다');
+                      END''')
+
+
+def migrate_history(c):
+    """기존 assessment_history 행을 이벤트로 변환 (이벤트가 없을 때 한 번만)"""
+    c.execute("SELECT EXISTS (SELECT 1 FROM assessment_events)")
+    if c.fetchone()[0]:
+        return 0
+    c.execute('''INSERT OR IGNORE INTO event_actors (name)
+                 SELECT DISTINCT user_info FROM assessment_history WHERE user_info IS NOT NULL''')
+    c.execute(f'''INSERT INTO assessment_events (assessment_id, ts, type, actor_id, payload)
+                  SELECT h.assessment_id,
+                         CAST(strftime('%s', COALESCE(h.action_timestamp, CURRENT_TIMESTAMP)) AS INTEGER),
+                         CASE h.action_type WHEN 'created' THEN {CREATED}
+                                            WHEN 'completed' THEN {SUBMITTED}
+                                            ELSE {DRAFT_SAVED} END,
+                         ea.id,
+                         CASE h.action_type
+                             WHEN 'created' THEN json_array(a.company_id, h.total_questions)
+                             WHEN 'completed' THEN json_array(a.total_score, a.maturity_level,
+                                                              h.questions_answered, h.total_questions)
+                             ELSE json_array(h.questions_answered, h.total_questions, NULL) END
+                  FROM assessment_history h
+                  LEFT JOIN assessments a ON h.assessment_id = a.id
+                  LEFT JOIN event_actors ea ON ea.name = h.user_info
+                  ORDER BY h.action_timestamp, h.id''')
+    return c.rowcount
+
+
+def encode(payload):
+    """이벤트 내용을 공백 없는 JSON 배열로 변환"""
+    if not payload:
+        return None
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode(payload):
+    return json.loads(payload) if payload else []
+
+
+class EventBatch:
+    """요청 단위 이벤트 버퍼
+
+    append()로 모은 이벤트를 flush()에서 executemany 한 번으로 기록합니다.
+    상태 변경과 같은 트랜잭션에서 flush한 뒤 commit하므로 이벤트와 데이터가 함께 반영됩니다.
+    """
+
+    def __init__(self, c, actor=None):
+        self.c = c
+        self.actor = actor
+        self.events = []
+        self._actor_ids = {}
+
+    def append(self, assessment_id, event_type, payload=None, actor=None):
+        self.events.append((assessment_id, event_type, payload, actor if actor is not None else self.actor))
+
+    def _actor_id(self, name):
+        if not name:
+            return None
+        if name not in self._actor_ids:
+            self.c.execute("INSERT OR IGNORE INTO event_actors (name) VALUES (?)", (name,))
+            self.c.execute("SELECT id FROM event_actors WHERE name = ?", (name,))
+            self._actor_ids[name] = self.c.fetchone()[0]
+        return self._actor_ids[name]
+
+    def flush(self):
+        """버퍼의 이벤트 기록 후 스냅샷이 필요한 평가는 스냅샷 생성"""
+        if not self.events:
+            return 0
+        now = int(time.time())
+        rows = [(assessment_id, now, event_type, self._actor_id(actor), encode(payload))
+                for assessment_id, event_type, payload, actor in self.events]
+        self.c.executemany('''INSERT INTO assessment_events (assessment_id, ts, type, actor_id, payload)
+                              VALUES (?, ?, ?, ?, ?)''', rows)
+
+        touched = {}
+        for assessment_id, event_type, _, _ in self.events:
+            if assessment_id is not None:
+                touched[assessment_id] = touched.get(assessment_id, False) or event_type == SUBMITTED
+        for assessment_id, submitted in touched.items():
+            maybe_snapshot(self.c, assessment_id, force=submitted)
+
+        count = len(self.events)
+        self.events.clear()
+        return count
+
+
+def answers_diff(batch, assessment_id, before, after):
+    """답변 변경분을 이벤트로 추가 ({question_id: (score, comment)} 두 개 비교)"""
+    for question_id in sorted(set(before) | set(after)):
+        if question_id not in after:
+            batch.append(assessment_id, ANSWER_CLEARED, [question_id])
+        elif before.get(question_id) != after[question_id]:
+            score, comment = after[question_id]
+            batch.append(assessment_id, ANSWER_CHANGED, [question_id, score, comment or ''])
+
+
+def empty_state(assessment_id):
+    return {'assessment_id': assessment_id, 'status': None, 'company_id': None, 'assessor_name': '',
+            'notes': '', 'answers': {}, 'total_questions': None, 'version': 0,
+            'total_score': None, 'maturity_level': None, 'event_id': 0, 'ts': None}
+
+
+def apply_event(state, event_id, ts, event_type, actor, payload):
+    """이벤트 하나를 상태에 반영"""
+    values = decode(payload)
+    if event_type == CREATED:
+        state['status'] = 'draft'
+        state['company_id'], state['total_questions'] = (values + [None, None])[:2]
+        if actor:
+            state['assessor_name'] = actor
+    elif event_type == ANSWER_CHANGED:
+        state['answers'][str(values[0])] = [values[1], values[2] if len(values) > 2 else '']
+    elif event_type == ANSWER_CLEARED:
+        state['answers'].pop(str(values[0]), None)
+    elif event_type == NOTES_CHANGED:
+        state['notes'] = values[0]
+    elif event_type == ASSESSOR_CHANGED:
+        state['assessor_name'] = values[0]
+    elif event_type == DRAFT_SAVED:
+        state['status'] = state['status'] or 'draft'
+        if len(values) > 2 and values[2] is not None:
+            state['version'] = values[2]
+        if len(values) > 1 and values[1]:
+            state['total_questions'] = values[1]
+    elif event_type == SUBMITTED:
+        state['status'] = 'completed'
+        state['total_score'], state['maturity_level'] = values[0], values[1]
+    elif event_type == DRAFT_DELETED:
+        state['status'] = 'deleted'
+    state['event_id'] = event_id
+    state['ts'] = ts
+    return state
+
+
+def _to_epoch(at):
+    """'YYYY-MM-DD HH:MM:SS'(UTC, CURRENT_TIMESTAMP와 같은 기준) 또는 epoch 초"""
+    if at is None or isinstance(at, (int, float)):
+        return at
+    parsed = datetime.fromisoformat(str(at))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def rebuild_state(c, assessment_id, at=None, until_event=None):
+    """평가의 상태를 재구성 (at 시점 또는 until_event 이벤트까지, 없으면 현재)
+
+    at/until_event 이전의 가장 최근 스냅샷에서 시작하여 이후 이벤트만 적용합니다.
+    """
+    at = _to_epoch(at)
+    conditions, params = ["assessment_id = ?"], [assessment_id]
+    if at is not None:
+        conditions.append("ts <= ?")
+        params.append(at)
+    if until_event is not None:
+        conditions.append("event_id <= ?")
+        params.append(until_event)
+    c.execute(f'''SELECT event_id, state FROM assessment_snapshots
+                  WHERE {' AND '.join(conditions)}
+                  ORDER BY event_id DESC LIMIT 1''', params)
+    snapshot = c.fetchone()
+    state = json.loads(zlib.decompress(snapshot[1])) if snapshot else empty_state(assessment_id)
+
+    conditions = ["e.assessment_id = ?", "e.id > ?"]
+    params = [assessment_id, snapshot[0] if snapshot else 0]
+    if at is not None:
+        conditions.append("e.ts <= ?")
+        params.append(at)
+    if until_event is not None:
+        conditions.append("e.id <= ?")
+        params.append(until_event)
+    c.execute(f'''SELECT e.id, e.ts, e.type, ea.name, e.payload
+                  FROM assessment_events e
+                  LEFT JOIN event_actors ea ON e.actor_id = ea.id
+                  WHERE {' AND '.join(conditions)}
+                  ORDER BY e.id''', params)
+    for row in c.fetchall():
+        apply_event(state, *row)
+    return state
+
+
+def write_snapshot(c, state):
+    c.execute('''INSERT OR REPLACE INTO assessment_snapshots (assessment_id, event_id, ts, state)
+                 VALUES (?, ?, ?, ?)''',
+              (state['assessment_id'], state['event_id'], state['ts'] or int(time.time()),
+               zlib.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))))
+
+
+def maybe_snapshot(c, assessment_id, force=False):
+    """마지막 스냅샷 이후 이벤트가 SNAPSHOT_INTERVAL개 이상이면(또는 force) 스냅샷 생성"""
+    c.execute('''SELECT COUNT(*) FROM assessment_events
+                 WHERE assessment_id = ?
+                   AND id > COALESCE((SELECT MAX(event_id) FROM assessment_snapshots WHERE assessment_id = ?), 0)''',
+              (assessment_id, assessment_id))
+    pending = c.fetchone()[0]
+    if pending == 0 or (not force and pending < SNAPSHOT_INTERVAL):
+        return False
+    write_snapshot(c, rebuild_state(c, assessment_id))
+    return True
+
+
+def recent_activities(c, limit=50):
+    """이력 화면용 최근 평가 활동 (assessment_history 행과 같은 열 순서)
+
+    (시각, 종류, 사용자, 회사명, 답변 수, 전체 문항 수, 설명, 평가 ID - 삭제된 평가는 None)
+    """
+    types = ', '.join(str(t) for t in LIFECYCLE_NOTES)
+    c.execute(f'''SELECT datetime(e.ts, 'unixepoch'), e.type, ea.name,
+                         COALESCE(co.name, created_co.name),
+                         CASE e.type WHEN {DRAFT_SAVED} THEN json_extract(e.payload, '$[0]')
+                                     WHEN {SUBMITTED} THEN json_extract(e.payload, '$[2]')
+                                     WHEN {CREATED} THEN 0 END,
+                         CASE e.type WHEN {DRAFT_SAVED} THEN json_extract(e.payload, '$[1]')
+                                     WHEN {SUBMITTED} THEN json_extract(e.payload, '$[3]')
+                                     WHEN {CREATED} THEN json_extract(e.payload, '$[1]') END,
+                         a.id
+                  FROM assessment_events e
+                  LEFT JOIN event_actors ea ON e.actor_id = ea.id
+                  LEFT JOIN assessments a ON e.assessment_id = a.id
+                  LEFT JOIN companies co ON a.company_id = co.id
+                  LEFT JOIN companies created_co ON a.id IS NULL AND created_co.id = (
+                      SELECT json_extract(ce.payload, '$[0]') FROM assessment_events ce
+                      WHERE ce.assessment_id = e.assessment_id AND ce.type = {CREATED} LIMIT 1)
+                  WHERE e.type IN ({types})
+                  ORDER BY e.id DESC
+                  LIMIT ?''', (limit,))
+    return [(ts, EVENT_NAMES[event_type], actor, company, answered, total, LIFECYCLE_NOTES[event_type], assessment_id)
+            for ts, event_type, actor, company, answered, total, assessment_id in c.fetchall()]
+
+
+def assessment_events(c, assessment_id):
+    """평가의 전체 이벤트 목록 (감사 기록 조회용)"""
+    c.execute('''SELECT e.id, datetime(e.ts, 'unixepoch'), e.type, ea.name, e.payload
+                 FROM assessment_events e
+                 LEFT JOIN event_actors ea ON e.actor_id = ea.id
+                 WHERE e.assessment_id = ?
+                 ORDER BY e.id''', (assessment_id,))
+    return [{'id': event_id, 'timestamp': ts, 'type': EVENT_NAMES.get(event_type, event_type),
+             'actor': actor, 'payload': decode(payload)}
+            for event_id, ts, event_type, actor, payload in c.fetchall()]
+
+
+def main():
+    from config import Config
+    from database import connect_db
+
+    parser = argparse.ArgumentParser(description='평가 이벤트 로그 도구')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    state_parser = subparsers.add_parser('state', help='평가 상태 재구성')
+    state_parser.add_argument('assessment_id', type=int)
+    state_parser.add_argument('--at', help="시점 (UTC, 'YYYY-MM-DD HH:MM:SS')")
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='스냅샷 생성')
+    snapshot_parser.add_argument('assessment_id', type=int, nargs='?')
+    snapshot_parser.add_argument('--all', action='store_true', help='새 이벤트가 있는 모든 평가')
+    args = parser.parse_args()
+
+    if args.command == 'state':
+        conn = connect_db(args.db, readonly=True)
+        state = rebuild_state(conn.cursor(), args.assessment_id, at=args.at)
+        conn.close()
+        print(json.dumps(state, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.assessment_id is None and not args.all:
+        parser.error('assessment_id 또는 --all이 필요합니다')
+    conn = connect_db(args.db)
+    c = conn.cursor()
+    if args.all:
+        c.execute("SELECT DISTINCT assessment_id FROM assessment_events WHERE assessment_id IS NOT NULL")
+        targets = [row[0] for row in c.fetchall()]
+    else:
+        targets = [args.assessment_id]
+    created = sum(1 for assessment_id in targets if maybe_snapshot(c, assessment_id, force=True))
+    conn.commit()
+    conn.close()
+    print(f"스냅샷 {created}개 생성 (대상 평가 {len(targets)}개)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
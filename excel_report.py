@@ -0,0 +1,245 @@
+# excel_report.py - 평가 결과 Excel 보고서 (openpyxl 쓰기 전용 모드, Excel 기본 차트), 프로세스 풀 렌더링
+#
+# 시트는 행을 쓰는 즉시 임시 파일로 내보내므로 회사 수가 많아도 메모리 사용량이 일정합니다.
+# 렌더링은 CPU 작업이라 별도 프로세스 풀에서 실행하여 웹 요청 스레드를 막지 않습니다.
+import io
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.chart import BarChart, LineChart, Reference
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+LABEL_FONT = Font(bold=True)
+TITLE_FONT = Font(bold=True, size=14)
+WRAP = Alignment(wrap_text=True, vertical="top")
+
+# 요약 차트에 표시할 최대 평가 수 (그 이상은 표만)
+MAX_CHART_ROWS = 60
+
+# 렌더링 프로세스를 이 작업 수마다 새로 시작 (메모리 반환)
+MAX_TASKS_PER_WORKER = 20
+
+_SHEET_NAME_INVALID = re.compile(r'[\[\]:*?/\\]')
+
+
+def _header_row(ws, headers):
+    row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = HEADER_ALIGNMENT
+        row.append(cell)
+    return row
+
+
+def _label(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = LABEL_FONT
+    return cell
+
+
+def _wrapped(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.alignment = WRAP
+    return cell
+
+
+def _set_widths(ws, widths):
+    # 쓰기 전용 시트는 행을 쓰기 전에 열 너비를 지정해야 함
+    for index, width in enumerate(widths):
+        ws.column_dimensions[get_column_letter(index + 1)].width = width
+
+
+def _sheet_title(view, used):
+    """평가 시트 이름 (Excel 제한: 31자, 일부 기호 불가, 중복 불가)"""
+    base = _SHEET_NAME_INVALID.sub('', f"{view.company_name} {str(view.assessment_date or '')[:10]}").strip()
+    base = base[:31] or f"평가 {view.id}"
+    title = base
+    suffix = 2
+    while title.lower() in used:
+        title = f"{base[:31 - len(str(suffix)) - 1]}~{suffix}"
+        suffix += 1
+    used.add(title.lower())
+    return title
+
+
+def _category_names(views):
+    """보고서에 나오는 카테고리 이름 (처음 나온 순서)"""
+    names = {}
+    for view in views:
+        for category in view.category_scores:
+            names.setdefault(category[1], None)
+    return list(names)
+
+
+def _write_summary(wb, views, benchmarks, company_report):
+    ws = wb.create_sheet("요약")
+    categories = _category_names(views)
+    headers = ["회사명", "업종", "규모", "평가일", "평가자", "총점", "달성률(%)", "성숙도"]
+    if benchmarks:
+        headers += ["업종 내 백분위", "규모 내 백분위"]
+    first_category_column = len(headers) + 1
+    headers += [f"{name}(%)" for name in categories]
+    _set_widths(ws, [24, 12, 8, 18, 12, 8, 11, 8] + ([14, 14] if benchmarks else []) + [14] * len(categories))
+    ws.freeze_panes = 'B2'
+
+    ws.append(_header_row(ws, headers))
+    for view in views:
+        row = [view.company_name, view.industry, view.size, str(view.assessment_date or '')[:16],
+               view.assessor_name, view.total_score, view.percentage, view.maturity_level]
+        if benchmarks:
+            percentiles = benchmarks.get(view.id) or {}
+            row += [percentiles.get('industry'), percentiles.get('size')]
+        by_name = {category[1]: category for category in view.category_scores}
+        for name in categories:
+            category = by_name.get(name)
+            row.append(round(category[3] / category[4] * 100, 1) if category and category[4] else None)
+        ws.append(row)
+
+    rows = len(views)
+    if rows == 0 or rows > MAX_CHART_ROWS:
+        return ws
+    anchor_row = rows + 3
+    if company_report and rows > 1:
+        # 한 회사의 반복 평가: 총점/카테고리 달성률 추이
+        chart = LineChart()
+        chart.title = "달성률 추이"
+        chart.y_axis.title = "달성률(%)"
+        chart.y_axis.scaling.min = 0
+        chart.y_axis.scaling.max = 100
+        chart.add_data(Reference(ws, min_col=7, min_row=1, max_row=rows + 1), titles_from_data=True)
+        if categories:
+            chart.add_data(Reference(ws, min_col=first_category_column, max_col=first_category_column + len(categories) - 1,
+                                     min_row=1, max_row=rows + 1), titles_from_data=True)
+        chart.set_categories(Reference(ws, min_col=4, min_row=2, max_row=rows + 1))
+    elif rows > 1:
+        # 여러 회사: 회사별 달성률
+        chart = BarChart()
+        chart.type = 'bar'
+        chart.title = "회사별 달성률"
+        chart.x_axis.title = "회사"
+        chart.y_axis.title = "달성률(%)"
+        chart.y_axis.scaling.min = 0
+        chart.y_axis.scaling.max = 100
+        chart.add_data(Reference(ws, min_col=7, min_row=1, max_row=rows + 1), titles_from_data=True)
+        chart.set_categories(Reference(ws, min_col=1, min_row=2, max_row=rows + 1))
+        chart.legend = None
+        chart.height = max(7.5, rows * 0.5)
+    else:
+        # 평가 1건: 카테고리별 달성률
+        if not categories:
+            return ws
+        chart = BarChart()
+        chart.title = "카테고리별 달성률"
+        chart.y_axis.title = "달성률(%)"
+        chart.y_axis.scaling.min = 0
+        chart.y_axis.scaling.max = 100
+        chart.legend = None
+        # 카테고리 달성률은 한 행에 있으므로 행 방향 데이터로 추가
+        chart.add_data(Reference(ws, min_col=first_category_column, max_col=first_category_column + len(categories) - 1,
+                                 min_row=2, max_row=2), from_rows=True)
+        chart.set_categories(Reference(ws, min_col=first_category_column,
+                                       max_col=first_category_column + len(categories) - 1, min_row=1, max_row=1))
+    chart.width = 24
+    ws.add_chart(chart, f"A{anchor_row}")
+    return ws
+
+
+def _write_categories(wb, views):
+    ws = wb.create_sheet("카테고리별 점수")
+    _set_widths(ws, [24, 18, 28, 10, 8, 11, 9])
+    ws.freeze_panes = 'A2'
+    ws.append(_header_row(ws, ["회사명", "평가일", "카테고리", "획득점수", "만점", "달성률(%)", "가중치(%)"]))
+    for view in views:
+        for category in view.category_scores:
+            ws.append([view.company_name, str(view.assessment_date or '')[:16], category[1], category[3], category[4],
+                       round(category[3] / category[4] * 100, 1) if category[4] else None,
+                       round(category[2] * 100)])
+
+
+def _write_assessment(wb, view, used_titles, recommendations):
+    ws = wb.create_sheet(_sheet_title(view, used_titles))
+    _set_widths(ws, [18, 10, 48, 7, 48, 48])
+
+    title = WriteOnlyCell(ws, value=f"{view.company_name} APS 준비도 평가 결과")
+    title.font = TITLE_FONT
+    ws.append([title])
+    for label, value in (("업종 / 규모", f"{view.industry or ''} / {view.size or ''}"),
+                         ("평가일", str(view.assessment_date or '')[:16]),
+                         ("평가자", view.assessor_name),
+                         ("총점", f"{view.total_score}/{view.max_score}점 ({view.percentage}%)"),
+                         ("성숙도", f"Level {view.maturity_level}")):
+        ws.append([_label(ws, label), value])
+    if view.notes:
+        ws.append([_label(ws, "메모"), _wrapped(ws, view.notes)])
+    ws.append([])
+
+    ws.append(_header_row(ws, ["카테고리", "문항코드", "문항", "점수", "선택 내용", "의견"]))
+    for code, question_title, score, option, category_name, comment in view.results:
+        ws.append([category_name, code, _wrapped(ws, question_title), score, _wrapped(ws, option),
+                   _wrapped(ws, comment) if comment else None])
+
+    if recommendations:
+        ws.append([])
+        ws.append([_label(ws, "개선 권고사항")])
+        for text in recommendations:
+            ws.append([None, None, _wrapped(ws, f"• {text}")])
+
+
+def render_workbook(views, benchmarks=None, company_report=False, recommendations=None):
+    """평가 뷰 모델 목록으로 Excel 보고서(xlsx 바이트) 생성
+
+    benchmarks: {평가 ID: {'industry': 업종 내 백분위, 'size': 규모 내 백분위}}
+    recommendations: {평가 ID: [개선 권고사항]} - 평가별 시트 아래에 표시
+    요약(차트 포함) → 카테고리별 점수 → 평가별 문항 점수/의견 시트 순서입니다.
+    company_report이면 한 회사의 평가 이력으로 보고 요약 차트를 추이 그래프로 그립니다.
+    """
+    wb = Workbook(write_only=True)
+    _write_summary(wb, views, benchmarks, company_report)
+    _write_categories(wb, views)
+    used_titles = {"요약", "카테고리별 점수"}
+    for view in views:
+        _write_assessment(wb, view, used_titles, (recommendations or {}).get(view.id))
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: 웹 서버의 스레드/DB 연결 상태를 물려받지 않도록 새 프로세스로 시작
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                        max_tasks_per_child=MAX_TASKS_PER_WORKER)
+        return _pool
+
+
+def render(views, benchmarks=None, company_report=False, recommendations=None, workers=0, timeout=None):
+    """Excel 보고서 생성 (workers가 1 이상이면 프로세스 풀에서 실행, 시간 초과 시 TimeoutError)"""
+    global _pool
+    if workers <= 0:
+        return render_workbook(views, benchmarks, company_report, recommendations)
+    future = _get_pool(workers).submit(render_workbook, views, benchmarks, company_report, recommendations)
+    try:
+        return future.result(timeout=timeout)
+    except BrokenProcessPool:
+        # 작업 프로세스가 비정상 종료된 경우 다음 요청에서 풀을 새로 만듦
+        with _pool_lock:
+            _pool = None
+        raise
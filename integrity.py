@@ -0,0 +1,276 @@
+# integrity.py - 외래 키 정책(ON DELETE CASCADE/RESTRICT) 마이그레이션, 고아 행 검사/정리, 고유 인덱스
+#
+# 연결마다 PRAGMA foreign_keys = ON(database.connect_db)으로 DB 엔진이 참조 무결성을 검사하고,
+# 평가/문항 삭제 시 딸린 행은 CASCADE로 한 번에 지웁니다.
+# 외래 키 절은 ALTER TABLE로 바꿀 수 없으므로 정책이 다른 기존 테이블은 새 테이블로 다시 만듭니다.
+# 평가 결과/임시저장 답변은 평가·문항당 한 행, 임시저장 평가는 회사당 한 건으로 고유 인덱스가 보장합니다.
+#
+#     python integrity.py check                          # 외래 키 위반/고아 행 수
+#     python integrity.py repair [--include-restricted]  # 고아 행 삭제
+import argparse
+import re
+
+import events
+
+# 자식 테이블: [(컬럼, 부모 테이블, ON DELETE)] - 부모 테이블의 id 참조
+# 평가 결과/카테고리 점수의 문항·카테고리 ID는 평가에 고정된 문항 은행 버전 기준이라
+# 현재 문항/카테고리를 참조하지 않음 (문항을 삭제해도 기존 평가 결과는 보존)
+FOREIGN_KEYS = {
+    'questions': [('category_id', 'categories', 'RESTRICT')],
+    'question_options': [('question_id', 'questions', 'CASCADE')],
+    'assessments': [('company_id', 'companies', 'RESTRICT')],
+    'assessment_results': [('assessment_id', 'assessments', 'CASCADE')],
+    'assessment_history': [('assessment_id', 'assessments', 'CASCADE')],
+    'assessment_drafts': [('assessment_id', 'assessments', 'CASCADE'),
+                          ('question_id', 'questions', 'CASCADE')],
+    'assessment_category_scores': [('assessment_id', 'assessments', 'CASCADE')],
+    'recommendation_conditions': [('rule_id', 'recommendation_rules', 'CASCADE')],
+}
+
+# 부모 행 삭제 시 자식 행 검색용 인덱스 (다른 인덱스의 첫 컬럼으로 이미 있는 경우 제외)
+# questions.category_id는 question_bank의 (category_id, sort_key) 인덱스 사용
+FOREIGN_KEY_INDEXES = {
+    # 선택지 목록 정렬(문항, 점수)에도 사용
+    'idx_question_options_question_score': ('question_options', 'question_id, score'),
+    'idx_assessment_history_assessment': ('assessment_history', 'assessment_id'),
+    'idx_assessment_drafts_question': ('assessment_drafts', 'question_id'),
+}
+
+# 고유 인덱스: {이름: (테이블, 컬럼, 부분 인덱스 조건)} - 쓰기 경로는 INSERT ... ON CONFLICT로 갱신
+UNIQUE_INDEXES = {
+    'idx_assessment_results_unique': ('assessment_results', 'assessment_id, question_id', None),
+    'idx_assessment_drafts_unique': ('assessment_drafts', 'assessment_id, question_id', None),
+    # 회사당 임시저장 평가는 하나
+    'idx_assessments_company_draft': ('assessments', 'company_id', "status = 'draft'"),
+}
+
+# 다른 인덱스로 대체되어 삭제하는 기존 인덱스
+REPLACED_INDEXES = ('idx_assessment_results_assessment', 'idx_assessment_drafts_assessment', 'idx_questions_category',
+                    'idx_question_options_question')
+
+_FOREIGN_KEY_CLAUSE = re.compile(
+    r',\s*FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\)'
+    r'(?:\s+ON\s+(?:DELETE|UPDATE)\s+(?:CASCADE|RESTRICT|SET\s+NULL|SET\s+DEFAULT|NO\s+ACTION))*',
+    re.IGNORECASE)
+
+
+def foreign_key_clauses(table):
+    """CREATE TABLE에 넣을 외래 키 절"""
+    return ',\n            '.join(f"FOREIGN KEY ({column}) REFERENCES {parent} (id) ON DELETE {action}"
+                                  for column, parent, action in FOREIGN_KEYS[table])
+
+
+def create_indexes(c):
+    for name, (table, column) in FOREIGN_KEY_INDEXES.items():
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+
+
+def create_unique_indexes(c):
+    """고유 인덱스 생성 → {테이블: 정리한 중복 행 수}
+
+    인덱스가 아직 없으면(기존 DB) 중복 행을 먼저 한 번 정리합니다.
+    """
+    deleted = {}
+    for name, (table, columns, where) in UNIQUE_INDEXES.items():
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+        if c.fetchone():
+            continue
+        count = _DEDUPLICATE[table](c)
+        if count:
+            deleted[table] = count
+        c.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({columns})" + (f" WHERE {where}" if where else ""))
+    for name in REPLACED_INDEXES:
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+    return deleted
+
+
+def _deduplicate_answers(table):
+    def deduplicate(c):
+        # 같은 평가/문항의 답변이 여러 행이면 마지막에 저장된 행만 남김
+        c.execute(f'''DELETE FROM {table}
+                      WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY assessment_id, question_id)''')
+        return c.rowcount
+    return deduplicate
+
+
+def _deduplicate_drafts(c):
+    """회사별 임시저장 평가가 여러 건이면 가장 최근에 수정한 평가만 남기고 삭제 (삭제 이벤트 기록)"""
+    c.execute('''SELECT id, assessor_name FROM (
+                     SELECT id, assessor_name,
+                            ROW_NUMBER() OVER (PARTITION BY company_id ORDER BY last_modified DESC, id DESC) AS position
+                     FROM assessments WHERE status = 'draft')
+                 WHERE position > 1''')
+    stale = c.fetchall()
+    if not stale:
+        return 0
+    # 임시저장 답변은 ON DELETE CASCADE로 함께 삭제
+    c.executemany("DELETE FROM assessments WHERE id = ?", [(assessment_id,) for assessment_id, _ in stale])
+    batch = events.EventBatch(c)
+    for assessment_id, assessor_name in stale:
+        batch.append(assessment_id, events.DRAFT_DELETED, actor=assessor_name)
+    batch.flush()
+    return len(stale)
+
+
+_DEDUPLICATE = {
+    'assessment_results': _deduplicate_answers('assessment_results'),
+    'assessment_drafts': _deduplicate_answers('assessment_drafts'),
+    'assessments': _deduplicate_drafts,
+}
+
+
+def _table_exists(c, table):
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return c.fetchone() is not None
+
+
+def _current_policy(c, table):
+    c.execute(f"PRAGMA foreign_key_list({table})")
+    return sorted((row[3], row[2], row[6].upper()) for row in c.fetchall())
+
+
+def _rebuild(c, table):
+    """외래 키 절만 바꾼 새 테이블로 데이터/인덱스/트리거/AUTOINCREMENT 순번을 옮김"""
+    c.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    sql = _FOREIGN_KEY_CLAUSE.sub('', c.fetchone()[0])
+    body_end = sql.rstrip().rfind(')')
+    sql = f"{sql[:body_end].rstrip()},\n            {foreign_key_clauses(table)}\n        )"
+    new_table = f"{table}__rebuild"
+    sql = re.sub(r'^CREATE TABLE\s+"?\w+"?', f'CREATE TABLE {new_table}', sql, count=1)
+
+    c.execute(f"PRAGMA table_info({table})")
+    columns = ', '.join(f'"{row[1]}"' for row in c.fetchall())
+    c.execute('''SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger')
+                 AND sql IS NOT NULL''', (table,))
+    dependents = [row[0] for row in c.fetchall()]
+    sequence = None
+    if _table_exists(c, 'sqlite_sequence'):
+        c.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        sequence = c.fetchone()
+
+    c.execute(f"DROP TABLE IF EXISTS {new_table}")
+    c.execute(sql)
+    c.execute(f"INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for statement in dependents:
+        c.execute(statement)
+    if sequence:
+        c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+
+
+def migrate_foreign_keys(conn):
+    """외래 키 정책이 다른 기존 테이블을 다시 만들고 이름 목록 반환 (init_db에서 호출)
+
+    외래 키 검사를 끈 상태에서 한 트랜잭션으로 처리하며, CASCADE 관계의 고아 행은 함께 정리합니다.
+    """
+    c = conn.cursor()
+    tables = [table for table in FOREIGN_KEYS
+              if _table_exists(c, table)
+              and _current_policy(c, table) != sorted((column, parent, action)
+                                                      for column, parent, action in FOREIGN_KEYS[table])]
+    if not tables:
+        return []
+
+    conn.commit()
+    # 외래 키 검사는 트랜잭션 밖에서만 바꿀 수 있음
+    c.execute("PRAGMA foreign_keys = OFF")
+    # 테이블을 지웠다가 같은 이름으로 되돌리므로 다른 트리거/뷰의 참조는 고치지 않음
+    c.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        for table in tables:
+            _rebuild(c, table)
+        repair_orphans(c, include_restricted=False)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        c.execute("PRAGMA legacy_alter_table = OFF")
+        c.execute("PRAGMA foreign_keys = ON")
+    return tables
+
+
+def find_orphans(c):
+    """부모 행이 없는 자식 행 수 [(자식 테이블, 컬럼, 부모 테이블, ON DELETE, 행 수)]"""
+    orphans = []
+    for table, references in FOREIGN_KEYS.items():
+        if not _table_exists(c, table):
+            continue
+        for column, parent, action in references:
+            c.execute(f'''SELECT COUNT(*) FROM {table}
+                          WHERE {column} IS NOT NULL
+                            AND NOT EXISTS (SELECT 1 FROM {parent} WHERE {parent}.id = {table}.{column})''')
+            count = c.fetchone()[0]
+            if count:
+                orphans.append((table, column, parent, action, count))
+    return orphans
+
+
+def repair_orphans(c, include_restricted=False):
+    """고아 행 삭제 → {테이블: 삭제 행 수}
+
+    CASCADE 관계(평가 결과, 임시저장 답변, 선택지 등)는 항상 정리하고,
+    RESTRICT 관계(회사가 없는 평가, 카테고리가 없는 문항)는 include_restricted일 때만 지웁니다.
+    RESTRICT 관계를 먼저 지워 그 자식 행도 같은 방식으로 정리되게 합니다.
+    """
+    deleted = {}
+    order = sorted(FOREIGN_KEYS.items(), key=lambda item: any(action == 'CASCADE' for _, _, action in item[1]))
+    for table, references in order:
+        if not _table_exists(c, table):
+            continue
+        for column, parent, action in references:
+            if action == 'RESTRICT' and not include_restricted:
+                continue
+            c.execute(f'''DELETE FROM {table}
+                          WHERE {column} IS NOT NULL
+                            AND NOT EXISTS (SELECT 1 FROM {parent} WHERE {parent}.id = {table}.{column})''')
+            if c.rowcount:
+                deleted[table] = deleted.get(table, 0) + c.rowcount
+    return deleted
+
+
+def main():
+    from config import Config
+    from database import connect_db
+
+    parser = argparse.ArgumentParser(description='참조 무결성 검사/고아 행 정리')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help='외래 키 위반/고아 행 수')
+    repair_parser = subparsers.add_parser('repair', help='고아 행 삭제')
+    repair_parser.add_argument('--include-restricted', action='store_true',
+                               help='회사가 없는 평가, 카테고리가 없는 문항도 삭제 (평가 결과 등 딸린 행 포함)')
+    args = parser.parse_args()
+
+    conn = connect_db(args.db)
+    c = conn.cursor()
+    try:
+        if args.command == 'check':
+            orphans = find_orphans(c)
+            for table, column, parent, action, count in orphans:
+                print(f"{table}.{column} → {parent} (ON DELETE {action}): 고아 행 {count}개")
+            c.execute("PRAGMA foreign_key_check")
+            violations = len(c.fetchall())
+            print(f"외래 키 위반 {violations}건" if violations else "외래 키 위반 없음")
+            return 1 if orphans or violations else 0
+
+        c.execute("BEGIN IMMEDIATE")
+        deleted = repair_orphans(c, args.include_restricted)
+        conn.commit()
+        for table, count in deleted.items():
+            print(f"{table}: {count}행 삭제")
+        if not deleted:
+            print("삭제할 고아 행이 없습니다.")
+        remaining = find_orphans(c)
+        if remaining:
+            print(f"남은 고아 행 (RESTRICT 관계, --include-restricted로 삭제): "
+                  f"{', '.join(f'{table}.{column} {count}개' for table, column, _, _, count in remaining)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,334 @@
+# maintenance.py - DB 유지보수 도구 (무결성 검사, 통계, 문항 순서 재정렬, ANALYZE/VACUUM/optimize, 인덱스 점검, 캐시 예열)
+#
+# check_db.py, fix_order_num.py, fix_question_order.py를 대신하며,
+# 앱 설정의 DB 경로(DATABASE_PATH, --db/--tenant로 변경)와 database.connect_db 연결을 사용합니다.
+#
+#     python maintenance.py check [--quick]            # SQLite 무결성 + 외래 키/고아 행 + 필수 테이블
+#     python maintenance.py stats                      # 테이블별 행 수, 파일/페이지 사용량
+#     python maintenance.py reorder [--dry-run]        # 정렬 키 갱신 후 카테고리별 문항 순서를 코드 순으로 재설정
+#     python maintenance.py optimize [--analyze] [--vacuum]
+#     python maintenance.py indexes                    # 누락/중복 인덱스, 통계 수집 여부
+#     python maintenance.py warm [--url http://localhost:5000]
+import argparse
+import os
+import time
+import urllib.error
+import urllib.request
+
+import integrity
+
+# 필수 테이블과 설명 (check/stats 출력 순서)
+TABLES = {
+    'categories': '평가 영역',
+    'questions': '평가 문항',
+    'question_options': '문항 선택지',
+    'companies': '회사 정보',
+    'assessments': '평가',
+    'assessment_results': '평가 상세 결과',
+    'assessment_drafts': '임시저장 답변',
+    'assessment_category_scores': '카테고리별 점수',
+    'assessment_events': '평가 이벤트 로그',
+    'question_bank_versions': '문항 은행 버전',
+    'recommendation_rules': '개선 권고 규칙',
+}
+
+# 앱이 만드는 인덱스 중 점검 대상 (외래 키/고유 인덱스는 integrity 모듈 정의 사용)
+EXPECTED_INDEXES = {
+    'idx_assessments_company_status_date': 'assessments',
+    'idx_categories_order': 'categories',
+    'idx_questions_category_sort': 'questions',
+    **{name: table for name, (table, _) in integrity.FOREIGN_KEY_INDEXES.items()},
+    **{name: table for name, (table, _, _) in integrity.UNIQUE_INDEXES.items()},
+}
+
+# 실행 중인 서버의 프로세스 내 캐시(문항 은행/분석 행렬/조회 결과)를 채울 화면
+WARM_PATHS = (
+    '/companies',
+    '/assessments',
+    '/assessment_history',
+    '/questions',
+    '/api/benchmark/summary?dimension=industry',
+    '/api/benchmark/summary?dimension=size',
+    '/api/leaderboard/improvement',
+)
+
+
+def _user_tables(c):
+    # 전문 검색 색인의 내부(shadow) 테이블과 가상 테이블 제외
+    c.execute('''SELECT name FROM pragma_table_list
+                 WHERE schema = 'main' AND type = 'table' AND name NOT LIKE 'sqlite_%'
+                 ORDER BY name''')
+    return [row[0] for row in c.fetchall()]
+
+
+def check(c, quick=False):
+    """문제 목록 반환 (없으면 빈 목록)"""
+    problems = []
+    c.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check")
+    messages = [row[0] for row in c.fetchall()]
+    if messages != ['ok']:
+        problems += [f"무결성 검사: {message}" for message in messages]
+
+    existing = set(_user_tables(c))
+    problems += [f"테이블 없음: {table} ({label})" for table, label in TABLES.items() if table not in existing]
+
+    c.execute("PRAGMA foreign_key_check")
+    violations = len(c.fetchall())
+    if violations:
+        problems.append(f"외래 키 위반 {violations}건")
+    problems += [f"고아 행: {table}.{column} → {parent} {count}개 (python integrity.py repair)"
+                 for table, column, parent, _, count in integrity.find_orphans(c)]
+    return problems
+
+
+def stats(c):
+    """{'tables': [(테이블, 행 수)], 'pages': {...}, 'categories': [(카테고리, 문항 수)]}"""
+    tables = []
+    for table in _user_tables(c):
+        c.execute(f"SELECT COUNT(*) FROM {table}")
+        tables.append((table, c.fetchone()[0]))
+
+    pages = {}
+    for pragma in ('page_size', 'page_count', 'freelist_count', 'journal_mode', 'auto_vacuum'):
+        c.execute(f"PRAGMA {pragma}")
+        pages[pragma] = c.fetchone()[0]
+
+    c.execute('''SELECT c.name, COUNT(q.id) FROM categories c
+                 LEFT JOIN questions q ON q.category_id = c.id
+                 GROUP BY c.id ORDER BY c.order_num''')
+    return {'tables': tables, 'pages': pages, 'categories': c.fetchall()}
+
+
+def reorder_questions(c, dry_run=False):
+    """카테고리별 문항 order_num을 코드의 자연 정렬 순서(sort_key)로 1부터 다시 매김 → 바뀐 문항 수
+
+    (category_id, sort_key) 인덱스 순서로 읽는 UPDATE 한 번으로 순서가 달라진 행만 고칩니다 (문항 저장 후에도 호출).
+    """
+    ranked = '''SELECT id, ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY sort_key, id) AS position
+                FROM questions'''
+    if dry_run:
+        c.execute(f'''SELECT COUNT(*) FROM questions JOIN ({ranked}) AS ranked ON ranked.id = questions.id
+                      WHERE questions.order_num IS NOT ranked.position''')
+        return c.fetchone()[0]
+    c.execute(f'''UPDATE questions SET order_num = ranked.position
+                  FROM ({ranked}) AS ranked
+                  WHERE questions.id = ranked.id AND questions.order_num IS NOT ranked.position''')
+    return c.rowcount
+
+
+def optimize(conn, analyze=False, vacuum=False):
+    """PRAGMA optimize (선택: 전체 ANALYZE, VACUUM) → 실행한 작업 [(이름, 초)]"""
+    done = []
+    for name, statements, wanted in (
+            ('ANALYZE', ("ANALYZE",), analyze),
+            # VACUUM은 트랜잭션 밖에서만 실행 가능, WAL 모드에서는 체크포인트 후 WAL 파일도 비움
+            ('VACUUM', ("VACUUM", "PRAGMA wal_checkpoint(TRUNCATE)"), vacuum),
+            ('optimize', ("PRAGMA optimize",), True)):
+        if not wanted:
+            continue
+        conn.commit()
+        start = time.perf_counter()
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        done.append((name, time.perf_counter() - start))
+    return done
+
+
+def _index_columns(c, name):
+    c.execute(f"PRAGMA index_info({name})")
+    return tuple(row[2] for row in sorted(c.fetchall()))
+
+
+def index_health(c):
+    """인덱스 점검 결과 → {'indexes': [...], 'missing': [...], 'redundant': [...], 'unindexed_foreign_keys': [...]}
+
+    indexes: (이름, 테이블, 컬럼, 고유 여부, 부분 인덱스 여부, sqlite_stat1 통계 - 없으면 None)
+    redundant: (인덱스, 대신 쓰는 인덱스) - 컬럼이 다른 인덱스의 앞부분과 같은 일반 인덱스
+    """
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    statistics = {}
+    if c.fetchone():
+        c.execute("SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL")
+        statistics = dict(c.fetchall())
+
+    indexes = []
+    by_table = {}
+    for table in _user_tables(c):
+        c.execute(f"PRAGMA index_list({table})")
+        for _, name, unique, origin, partial in c.fetchall():
+            columns = _index_columns(c, name)
+            entry = (name, table, columns, bool(unique), bool(partial), statistics.get(name))
+            indexes.append(entry)
+            by_table.setdefault(table, []).append((entry, origin))
+
+    redundant = []
+    for entries in by_table.values():
+        for (name, _, columns, unique, partial, _), origin in entries:
+            if unique or partial or origin != 'c':
+                continue
+            for (other, _, other_columns, _, other_partial, _), _ in entries:
+                if other != name and not other_partial and other_columns[:len(columns)] == columns \
+                        and (len(other_columns) > len(columns) or other < name):
+                    redundant.append((name, other))
+                    break
+
+    names = {entry[0] for entry in indexes}
+    missing = [(name, table) for name, table in EXPECTED_INDEXES.items() if name not in names]
+
+    # 자식 행 검색(ON DELETE CASCADE/RESTRICT 확인)에 쓸 인덱스가 없는 외래 키 컬럼
+    existing = set(_user_tables(c))
+    unindexed = [(table, column, parent)
+                 for table, references in integrity.FOREIGN_KEYS.items() if table in existing
+                 for column, parent, _ in references
+                 if not any(entry[2][:1] == (column,) and not entry[4] for entry, _ in by_table.get(table, []))]
+    return {'indexes': indexes, 'missing': missing, 'redundant': redundant, 'unindexed_foreign_keys': unindexed}
+
+
+def warm_pages(c):
+    """모든 테이블의 B-tree 페이지를 한 번 읽어 OS 페이지 캐시에 올림 → [(테이블, 행 수)]"""
+    warmed = []
+    for table in _user_tables(c):
+        c.execute(f"SELECT COUNT(*) FROM {table} NOT INDEXED")
+        warmed.append((table, c.fetchone()[0]))
+    return warmed
+
+
+def warm_server(base_url, paths=WARM_PATHS, timeout=30):
+    """실행 중인 서버에 화면/API를 요청해 프로세스 내 캐시를 채움 → [(경로, 상태 코드, 초)]"""
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + path, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError) as e:
+            status = f"오류: {e}"
+        results.append((path, status, time.perf_counter() - start))
+    return results
+
+
+def _format_size(pages, page_size):
+    return f"{pages * page_size / 1024 / 1024:.1f}MB"
+
+
+def main():
+    from config import Config
+    from database import connect_db
+
+    parser = argparse.ArgumentParser(description='DB 유지보수 도구')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    parser.add_argument('--tenant', help='테넌트 이름 (TENANT_DATA_DIR의 테넌트 DB 사용)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    check_parser = subparsers.add_parser('check', help='무결성/외래 키/필수 테이블 검사')
+    check_parser.add_argument('--quick', action='store_true', help='PRAGMA quick_check 사용 (인덱스 내용 비교 생략)')
+    subparsers.add_parser('stats', help='테이블별 행 수, 파일/페이지 사용량')
+    reorder_parser = subparsers.add_parser('reorder', help='카테고리별 문항 순서를 코드 순으로 재설정')
+    reorder_parser.add_argument('--dry-run', action='store_true', help='바뀔 문항 수만 출력')
+    optimize_parser = subparsers.add_parser('optimize', help='PRAGMA optimize (선택: ANALYZE, VACUUM)')
+    optimize_parser.add_argument('--analyze', action='store_true', help='전체 테이블 통계 다시 수집')
+    optimize_parser.add_argument('--vacuum', action='store_true', help='빈 페이지 정리 (DB 전체 재작성, 쓰기 잠금)')
+    subparsers.add_parser('indexes', help='누락/중복 인덱스, 통계 수집 여부')
+    warm_parser = subparsers.add_parser('warm', help='DB 페이지 캐시 예열 (--url: 서버 캐시도 예열)')
+    warm_parser.add_argument('--url', help='실행 중인 서버 주소 (예: http://localhost:5000)')
+    args = parser.parse_args()
+
+    db_path = args.db
+    if args.tenant:
+        import tenants
+        try:
+            db_path = tenants.tenant_db_path(Config.TENANT_DATA_DIR, args.tenant)
+        except ValueError as e:
+            parser.error(str(e))
+    if not os.path.exists(db_path):
+        print(f"❌ DB 파일이 없습니다: {db_path}")
+        return 2
+
+    conn = connect_db(db_path)
+    c = conn.cursor()
+    try:
+        if args.command == 'check':
+            problems = check(c, args.quick)
+            for problem in problems:
+                print(f"❌ {problem}")
+            if not problems:
+                print(f"✅ {db_path}: 이상 없음")
+            return 1 if problems else 0
+
+        if args.command == 'stats':
+            result = stats(c)
+            pages = result['pages']
+            print(f"{db_path}: {_format_size(pages['page_count'], pages['page_size'])} "
+                  f"(빈 페이지 {pages['freelist_count']}개 {_format_size(pages['freelist_count'], pages['page_size'])}, "
+                  f"journal_mode={pages['journal_mode']})")
+            wal_path = db_path + '-wal'
+            if os.path.exists(wal_path):
+                print(f"WAL: {os.path.getsize(wal_path) / 1024 / 1024:.1f}MB")
+            print()
+            for table, count in result['tables']:
+                label = TABLES.get(table)
+                print(f"{table:<32} {count:>10,}" + (f"  ({label})" if label else ""))
+            print()
+            for name, count in result['categories']:
+                print(f"{name}: 문항 {count}개")
+            return 0
+
+        if args.command == 'reorder':
+            if args.dry_run:
+                print(f"순서가 바뀔 문항 {reorder_questions(c, dry_run=True)}개")
+                return 0
+            import question_bank
+            c.execute("BEGIN IMMEDIATE")
+            # 다른 도구로 코드를 고친 문항이 있을 수 있으므로 정렬 키부터 다시 계산
+            keys = question_bank.update_sort_keys(c, refresh=True)
+            changed = reorder_questions(c)
+            conn.commit()
+            print(f"문항 정렬 키 {keys}개 갱신, 문항 {changed}개의 순서를 재설정했습니다.")
+            return 0
+
+        if args.command == 'optimize':
+            c.execute("PRAGMA page_count")
+            before = c.fetchone()[0]
+            for name, elapsed in optimize(conn, args.analyze, args.vacuum):
+                print(f"{name}: {elapsed:.2f}초")
+            c.execute("PRAGMA page_count")
+            after = c.fetchone()[0]
+            c.execute("PRAGMA page_size")
+            page_size = c.fetchone()[0]
+            print(f"파일 크기: {_format_size(before, page_size)} → {_format_size(after, page_size)}")
+            return 0
+
+        if args.command == 'indexes':
+            result = index_health(c)
+            for name, table, columns, unique, partial, stat in result['indexes']:
+                flags = ''.join((' UNIQUE' if unique else '', ' PARTIAL' if partial else ''))
+                print(f"{name:<44} {table}({', '.join(columns)}){flags}  stat1={stat or '-'}")
+            for name, table in result['missing']:
+                print(f"❌ 인덱스 없음: {name} ({table}) - 앱을 시작하면 다시 만듭니다")
+            for name, other in result['redundant']:
+                print(f"⚠️  중복 인덱스: {name} ({other}의 앞부분과 같음)")
+            for table, column, parent in result['unindexed_foreign_keys']:
+                print(f"⚠️  인덱스 없는 외래 키: {table}.{column} → {parent}")
+            if not any(stat for *_, stat in result['indexes']):
+                print("⚠️  통계가 없습니다 (python maintenance.py optimize --analyze)")
+            return 1 if result['missing'] else 0
+
+        if args.command == 'warm':
+            start = time.perf_counter()
+            warmed = warm_pages(c)
+            print(f"테이블 {len(warmed)}개, {sum(count for _, count in warmed):,}행 읽음 "
+                  f"({time.perf_counter() - start:.2f}초)")
+            if args.url:
+                for path, status, elapsed in warm_server(args.url):
+                    print(f"{status} {path} ({elapsed * 1000:.0f}ms)")
+            return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+# metrics.py - 요청/SQL/템플릿/보고서 생성 시간 계측 및 Prometheus 노출
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+
+import database
+from database import normalize_statement
+
+# 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# SQL 문 라벨 최대 길이
+STATEMENT_LABEL_LENGTH = 160
+
+
+class MetricsRegistry:
+    """카운터/히스토그램 저장소 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket_counts, sum, count]
+        self._help = {}
+
+    def describe(self, name, metric_type, help_text):
+        self._help[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=DEFAULT_BUCKETS):
+        key = (name, tuple(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = [[0] * len(buckets), 0.0, 0, buckets]
+                self._histograms[key] = entry
+            for i, bound in enumerate(entry[3]):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Prometheus 텍스트 형식으로 출력"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (list(v[0]), v[1], v[2], v[3]) for k, v in self._histograms.items()}
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name in described or name not in self._help:
+                return
+            metric_type, help_text = self._help[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), (bucket_counts, total, count, buckets) in sorted(histograms.items()):
+            header(name)
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+registry = MetricsRegistry()
+registry.describe('aps_http_requests_total', 'counter', 'HTTP 요청 수')
+registry.describe('aps_http_request_duration_seconds', 'histogram', '라우트별 요청 처리 시간')
+registry.describe('aps_http_request_db_seconds', 'histogram', '라우트별 요청 내 SQL 실행 시간 합계')
+registry.describe('aps_sql_statements_total', 'counter', 'SQL 문 실행 횟수')
+registry.describe('aps_sql_statement_seconds_total', 'counter', 'SQL 문 실행 및 결과 조회 시간 합계')
+registry.describe('aps_sql_rows_total', 'counter', 'SQL 문이 반환한 행 수')
+registry.describe('aps_template_render_seconds', 'histogram', '템플릿 렌더링 시간')
+registry.describe('aps_build_duration_seconds', 'histogram', 'PDF/Excel 등 파일 생성 시간')
+
+
+def _record_sql(trace, elapsed, rows):
+    """database 모듈의 SQL 문 리스너: 문장별 실행 횟수/시간/행 수 기록"""
+    labels = (('statement', normalize_statement(trace.sql, STATEMENT_LABEL_LENGTH)),)
+    if trace.calls == 1:
+        registry.inc('aps_sql_statements_total', labels)
+    registry.inc('aps_sql_statement_seconds_total', labels, elapsed)
+    if rows:
+        registry.inc('aps_sql_rows_total', labels, rows)
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + elapsed
+
+
+@contextmanager
+def timed(kind):
+    """파일 생성 등 임의 구간의 소요 시간 기록"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('aps_build_duration_seconds', time.perf_counter() - start, (('kind', kind),))
+
+
+# cProfile 프로파일러는 프로세스 전체에서 한 번에 하나만 실행
+_profile_lock = threading.Lock()
+
+
+def init_app(app):
+    """Flask 앱에 계측 훅과 /metrics 엔드포인트 등록"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    database.add_statement_listener(_record_sql)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.db_time = 0.0
+        if app.config['PROFILING_ENABLED'] and request.headers.get('X-Profile') == '1':
+            if _profile_lock.acquire(blocking=False):
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - start
+        registry.inc('aps_http_requests_total',
+                     (('method', request.method), ('route', route), ('status', str(response.status_code))))
+        registry.observe('aps_http_request_duration_seconds', elapsed, (('route', route),))
+        registry.observe('aps_http_request_db_seconds', g.get('db_time', 0.0), (('route', route),))
+        response.headers['Server-Timing'] = (
+            f"db;dur={g.get('db_time', 0.0) * 1000:.1f}, total;dur={elapsed * 1000:.1f}")
+
+        profile_file = _finish_profile(app, route)
+        if profile_file:
+            response.headers['X-Profile-File'] = profile_file
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request가 실행되지 않은 경우(예외) 프로파일러 정리
+        _finish_profile(app, request.url_rule.rule if request.url_rule else 'unmatched')
+
+    def start_template_timer(sender, template, context, **extra):
+        if has_request_context():
+            g.template_start = time.perf_counter()
+
+    def record_template(sender, template, context, **extra):
+        start = g.get('template_start') if has_request_context() else None
+        if start is not None:
+            registry.observe('aps_template_render_seconds', time.perf_counter() - start,
+                             (('template', template.name or 'string'),))
+            g.template_start = None
+
+    before_render_template.connect(start_template_timer, app, weak=False)
+    template_rendered.connect(record_template, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Prometheus 형식 메트릭"""
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _finish_profile(app, route):
+    """요청 프로파일링 종료 후 결과 파일 경로 반환"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    try:
+        profiler.disable()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        name = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'index'
+        path = os.path.join(app.config['PROFILE_DIR'], f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        return path
+    finally:
+        _profile_lock.release()
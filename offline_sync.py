@@ -0,0 +1,237 @@
+# offline_sync.py - 오프라인 평가 입력의 일괄 동기화 (멱등 키, 문항 단위 병합)
+import gzip
+import json
+import time
+
+import events
+import question_bank
+
+# 요청당 최대 작업 수 (클라이언트는 나누어 전송)
+MAX_OPS = 200
+
+# 처리한 작업 키 보존 기간 (이 기간 안에 다시 보낸 작업만 중복으로 판별)
+KEY_RETENTION_DAYS = 30
+
+# 문항 점수 범위 (선택지 1~5)
+MIN_SCORE = 1
+MAX_SCORE = 5
+
+
+def create_schema(c):
+    """동기화 작업 기록 테이블 생성 (init_db에서 호출)"""
+    # 처리한 작업 키와 응답 (같은 키로 다시 보내면 저장된 응답을 반환)
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_operations (
+        key TEXT PRIMARY KEY,
+        assessment_id INTEGER,
+        response TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sync_operations_created ON sync_operations (created_at)")
+
+    # 오프라인에서 만든 평가의 클라이언트 ID → 서버 평가 ID
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_clients (
+        client_id TEXT PRIMARY KEY,
+        assessment_id INTEGER NOT NULL,
+        created_at INTEGER NOT NULL
+    )''')
+
+
+def prune(c, retention_days=KEY_RETENTION_DAYS):
+    """보존 기간이 지난 작업 키 삭제"""
+    c.execute("DELETE FROM sync_operations WHERE created_at < ?", (int(time.time()) - retention_days * 86400,))
+    return c.rowcount
+
+
+def read_payload(request):
+    """요청 본문 JSON (Content-Encoding: gzip 지원, 형식이 맞지 않으면 ValueError)"""
+    body = request.get_data()
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        body = gzip.decompress(body)
+    data = json.loads(body or b'{}')
+    if not isinstance(data, dict):
+        raise ValueError('JSON 객체가 아닙니다')
+    ops = data.get('ops') or []
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        raise ValueError('ops는 작업 객체 목록이어야 합니다')
+    return data
+
+
+def parse_change(question_id, change):
+    """답변 변경 1건 ("12": [4, "의견"] 또는 null) → (문항 ID, 점수, 의견)
+
+    점수가 None이면 답변 삭제이며, 형식이나 점수 범위가 맞지 않으면 ValueError를 발생시킵니다.
+    """
+    try:
+        question_id = int(question_id)
+    except ValueError:
+        raise ValueError(f"문항 ID가 잘못되었습니다: {question_id}") from None
+    if not change:
+        return question_id, None, ''
+    if not isinstance(change, list):
+        raise ValueError(f"변경 형식이 잘못되었습니다: {question_id}")
+    if not change[0]:
+        return question_id, None, ''
+    score = int(change[0])
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        raise ValueError(f"점수는 {MIN_SCORE}~{MAX_SCORE} 사이여야 합니다: {question_id}")
+    comment = change[1] if len(change) > 1 else ''
+    if comment is not None and not isinstance(comment, str):
+        raise ValueError(f"의견 형식이 잘못되었습니다: {question_id}")
+    return question_id, score, comment or ''
+
+
+class SyncError(Exception):
+    """작업을 적용할 수 없음 (응답에 기록되며 다시 보내도 같은 결과)"""
+
+
+def _resolve_assessment(c, op, batch, db_path, total_questions):
+    """작업 대상 평가 ID와 새로 만들었는지 여부
+
+    오프라인에서 만든 평가(client_id)는 처음 동기화할 때 회사의 임시저장 평가에 합치거나 새로 만듭니다.
+    """
+    assessment_id = op.get('assessment_id')
+    client_id = op.get('client_id')
+    if assessment_id:
+        return int(assessment_id), False
+    if not client_id:
+        raise SyncError('assessment_id 또는 client_id가 필요합니다')
+
+    c.execute("SELECT assessment_id FROM sync_clients WHERE client_id = ?", (client_id,))
+    row = c.fetchone()
+    if row:
+        return row[0], False
+
+    company_id = op.get('company_id')
+    c.execute("SELECT id FROM companies WHERE id = ?", (company_id,))
+    if not c.fetchone():
+        raise SyncError('존재하지 않는 회사입니다')
+
+    # 회사당 임시저장 평가는 하나 (고유 인덱스)
+    c.execute("SELECT id FROM assessments WHERE company_id = ? AND status = 'draft'", (company_id,))
+    row = c.fetchone()
+    created = row is None
+    if row:
+        assessment_id = row[0]
+    else:
+        c.execute('''INSERT INTO assessments (company_id, assessor_name, notes, status, last_modified,
+                                              completion_percentage, draft_version)
+                     VALUES (?, ?, '', 'draft', CURRENT_TIMESTAMP, 0, 0)''',
+                  (company_id, op.get('assessor_name') or ''))
+        assessment_id = c.lastrowid
+        question_bank.pin_assessment(c, db_path, assessment_id)
+        batch.append(assessment_id, events.CREATED, [company_id, total_questions])
+    c.execute("INSERT INTO sync_clients (client_id, assessment_id, created_at) VALUES (?, ?, ?)",
+              (client_id, assessment_id, int(time.time())))
+    return assessment_id, created
+
+
+def _draft_state(c, assessment_id):
+    """서버의 현재 임시저장 상태 (load_draft 응답과 같은 형식)"""
+    c.execute("SELECT notes, assessor_name FROM assessments WHERE id = ?", (assessment_id,))
+    notes, assessor_name = c.fetchone()
+    c.execute("SELECT question_id, score, comment FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
+    answers = {str(question_id): {'score': score, 'comment': comment or ''}
+               for question_id, score, comment in c.fetchall()}
+    return {'answers': answers, 'notes': notes or '', 'assessor_name': assessor_name or ''}
+
+
+def _apply(c, op, db_path, total_questions, question_ids):
+    batch = events.EventBatch(c, op.get('assessor_name'))
+    assessment_id, created = _resolve_assessment(c, op, batch, db_path, total_questions)
+
+    c.execute("SELECT status, COALESCE(draft_version, 0), assessor_name FROM assessments WHERE id = ?",
+              (assessment_id,))
+    row = c.fetchone()
+    if not row:
+        raise SyncError('존재하지 않는 평가입니다')
+    if row[0] != 'draft':
+        raise SyncError('이미 제출된 평가입니다')
+    version = row[1]
+    if batch.actor is None:
+        batch.actor = row[2]
+    # 클라이언트가 알던 버전 이후 다른 곳에서 저장된 경우 문항 단위로 병합 (마지막 변경 우선)
+    # 같은 평가의 이어지는 작업은 version을 보내지 않음
+    merged = not created and 'version' in op and op['version'] != version
+
+    changes = op.get('changes') or {}
+    if not isinstance(changes, dict):
+        raise SyncError('changes는 문항 ID별 변경 객체여야 합니다')
+    for question_id, change in changes.items():
+        question_id, score, comment = parse_change(question_id, change)
+        if question_id not in question_ids:
+            raise SyncError(f"존재하지 않는 문항입니다: {question_id}")
+        if score is not None:
+            c.execute('''INSERT INTO assessment_drafts (assessment_id, question_id, score, comment)
+                         VALUES (?, ?, ?, ?)
+                         ON CONFLICT (assessment_id, question_id)
+                         DO UPDATE SET score = excluded.score, comment = excluded.comment,
+                                       saved_at = CURRENT_TIMESTAMP''',
+                      (assessment_id, question_id, score, comment))
+            batch.append(assessment_id, events.ANSWER_CHANGED, [question_id, score, comment or ''])
+        else:
+            c.execute("DELETE FROM assessment_drafts WHERE assessment_id = ? AND question_id = ?",
+                      (assessment_id, question_id))
+            batch.append(assessment_id, events.ANSWER_CLEARED, [question_id])
+
+    if 'notes' in op:
+        c.execute("UPDATE assessments SET notes = ? WHERE id = ?", (op['notes'], assessment_id))
+        batch.append(assessment_id, events.NOTES_CHANGED, [op['notes'] or ''])
+    if 'assessor_name' in op:
+        c.execute("UPDATE assessments SET assessor_name = ? WHERE id = ?", (op['assessor_name'], assessment_id))
+        batch.append(assessment_id, events.ASSESSOR_CHANGED, [op['assessor_name'] or ''])
+
+    c.execute("SELECT COUNT(*) FROM assessment_drafts WHERE assessment_id = ?", (assessment_id,))
+    questions_answered = c.fetchone()[0]
+    completion_percentage = int((questions_answered / total_questions) * 100) if total_questions else 0
+    c.execute('''UPDATE assessments SET completion_percentage = ?, draft_version = ?, last_modified = CURRENT_TIMESTAMP
+                 WHERE id = ?''', (completion_percentage, version + 1, assessment_id))
+    batch.append(assessment_id, events.DRAFT_SAVED, [questions_answered, total_questions, version + 1])
+    batch.flush()
+
+    return {'status': 'applied', 'assessment_id': assessment_id, 'version': version + 1,
+            'completion_percentage': completion_percentage, 'merged': merged}
+
+
+def apply_ops(c, ops, db_path):
+    """작업 목록을 차례로 적용하여 작업별 결과 반환 (호출한 쪽에서 한 트랜잭션으로 commit)
+
+    작업 형식: {"key": "...", "assessment_id": 12 또는 "client_id": "...", "company_id": 3,
+               "version": 4, "changes": {"12": [4, "의견"], "13": null}, "notes": "...", "assessor_name": "..."}
+    이미 처리한 key는 저장된 결과를 다시 반환하고(replayed), 적용할 수 없는 작업은
+    error로 기록하여 다시 보내도 같은 결과가 되게 합니다.
+    병합된 평가는 배치 적용 후 서버 상태(answers, notes, assessor_name)를 함께 반환합니다.
+    """
+    c.execute("SELECT COUNT(*) FROM questions")
+    total_questions = c.fetchone()[0]
+    c.execute("SELECT id FROM questions")
+    question_ids = {row[0] for row in c.fetchall()}
+
+    results = []
+    for op in ops:
+        key = op.get('key')
+        if not key:
+            results.append({'key': None, 'status': 'error', 'message': 'key가 필요합니다'})
+            continue
+        c.execute("SELECT response FROM sync_operations WHERE key = ?", (key,))
+        row = c.fetchone()
+        if row:
+            result = dict(json.loads(row[0]), replayed=True)
+        else:
+            c.execute("SAVEPOINT sync_op")
+            try:
+                result = _apply(c, op, db_path, total_questions, question_ids)
+                c.execute("RELEASE sync_op")
+            except (SyncError, ValueError, TypeError, IndexError) as e:
+                c.execute("ROLLBACK TO sync_op")
+                c.execute("RELEASE sync_op")
+                result = {'status': 'error', 'message': str(e)}
+            result.update(key=key, client_id=op.get('client_id'))
+            c.execute("INSERT INTO sync_operations (key, assessment_id, response, created_at) VALUES (?, ?, ?, ?)",
+                      (key, result.get('assessment_id'), json.dumps(result, ensure_ascii=False), int(time.time())))
+        results.append(result)
+
+    # 병합된 평가는 배치를 모두 적용한 뒤의 상태를 반환
+    for result in results:
+        if result.get('merged'):
+            result.update(_draft_state(c, result['assessment_id']))
+    return results
@@ -0,0 +1,262 @@
+# pdf_report.py - PDF 보고서 레이아웃 엔진 (선언형 보고서 템플릿, 프로세스당 한 번 만드는 스타일 레지스트리)
+#
+# 보고서 템플릿은 섹션 이름 목록이고, 섹션마다 Flowable 목록을 만드는 함수가 하나씩 있습니다.
+# 스타일/표 스타일은 글꼴별로 한 번만 만들고 차트는 report_charts 캐시를 쓰므로
+# 템플릿(보고서 종류)을 늘려도 보고서 1건의 생성 비용은 늘지 않습니다.
+#
+#     python pdf_report.py --count 20                  # 템플릿별 보고서/페이지당 생성 시간
+#     python pdf_report.py --db bench.db --template summary --count 50
+import argparse
+import io
+import threading
+import time
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+import report_charts
+
+# 보고서 템플릿: 섹션 순서 (섹션 함수는 아래 SECTIONS)
+TEMPLATES = {
+    'full': ('title', 'basic_info', 'maturity_guide', 'category_table', 'charts', 'details',
+             'recommendations', 'footer'),
+    'summary': ('title', 'basic_info', 'category_table', 'charts', 'recommendations', 'footer'),
+}
+DEFAULT_TEMPLATE = 'full'
+
+MATURITY_GUIDE = (
+    "Level 1 (< 40%): 기초 수준 - 체계적인 계획 수립이 필요",
+    "Level 2 (40-60%): 발전 수준 - 부분적 개선이 필요",
+    "Level 3 (60-80%): 우수 수준 - 전반적으로 양호한 상태",
+    "Level 4 (80-91%): 최적 수준 - 일부 고도화 필요",
+    "Level 5 (≥ 91%): 혁신 수준 - APS 도입 최적 상태",
+)
+
+
+class StyleRegistry:
+    """보고서 문단/표 스타일 (글꼴별로 프로세스당 한 번 생성)"""
+
+    def __init__(self, font_name):
+        base = getSampleStyleSheet()
+        self.font_name = font_name
+        self.title = ParagraphStyle('CustomTitle', parent=base['Heading1'], fontName=font_name, fontSize=18,
+                                    textColor=colors.darkblue, alignment=TA_CENTER, spaceAfter=20)
+        self.heading = ParagraphStyle('CustomHeading', parent=base['Heading2'], fontName=font_name, fontSize=14,
+                                      textColor=colors.darkblue, spaceBefore=20, spaceAfter=10)
+        self.normal = ParagraphStyle('CustomNormal', parent=base['Normal'], fontName=font_name, fontSize=10)
+        self.category = ParagraphStyle('CategoryStyle', parent=base['Heading3'], fontName=font_name, fontSize=12,
+                                       textColor=colors.darkred, spaceBefore=10, spaceAfter=5)
+        self.answer = ParagraphStyle('AnswerStyle', parent=self.normal, fontSize=9, textColor=colors.darkgreen,
+                                     leftIndent=20, spaceAfter=5)
+        self.comment = ParagraphStyle('CommentStyle', parent=self.normal, fontSize=9, textColor=colors.darkblue,
+                                      leftIndent=20, spaceAfter=8, borderColor=colors.lightgrey, borderWidth=1,
+                                      borderPadding=5)
+        self.footer = ParagraphStyle('FooterStyle', parent=self.normal, fontSize=8, textColor=colors.grey,
+                                     alignment=TA_CENTER)
+        self.info_table = self._table_style('LEFT', 12, 10)
+        self.category_table = self._table_style('CENTER', 10, 9)
+
+    def _table_style(self, align, header_size, body_size):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), align),
+            ('FONTNAME', (0, 0), (-1, 0), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, 0), header_size),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 1), (-1, -1), body_size),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ])
+
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+def get_styles(font_name):
+    with _registry_lock:
+        styles = _registries.get(font_name)
+        if styles is None:
+            styles = _registries[font_name] = StyleRegistry(font_name)
+        return styles
+
+
+class ReportContext:
+    """섹션 함수에 넘기는 보고서 1건의 데이터"""
+
+    def __init__(self, view, styles, benchmark=None, recommendations=(), generated_at=None):
+        self.view = view
+        self.styles = styles
+        self.benchmark = benchmark
+        self.recommendations = recommendations
+        self.generated_at = generated_at or datetime.now()
+
+
+def _title(ctx):
+    return [Paragraph("APS 준비도 진단 보고서", ctx.styles.title), Spacer(1, 20)]
+
+
+def _basic_info(ctx):
+    view = ctx.view
+    rows = [
+        ['평가 항목', '내용'],
+        ['회사명', view.company_name],
+        ['업종', view.industry],
+        ['규모', view.size],
+        ['평가일', view.assessment_date],
+        ['총점', f"{view.total_score}/{view.max_score}점"],
+        ['성숙도 레벨', f"Level {view.maturity_level}"],
+    ]
+    # 업종/규모 내 백분위
+    if ctx.benchmark:
+        for dimension, label in (('industry', '업종 내 백분위'), ('size', '규모 내 백분위')):
+            group = ctx.benchmark['groups'].get(dimension)
+            if group and group['total_percentile'] is not None:
+                rows.append([label, f"{group['total_percentile']:.0f} 백분위 "
+                                    f"(상위 {100 - group['total_percentile']:.0f}%, {group['count']}건 중)"])
+    table = Table(rows, colWidths=[2 * inch, 3 * inch])
+    table.setStyle(ctx.styles.info_table)
+    return [table, Spacer(1, 30)]
+
+
+def _maturity_guide(ctx):
+    flowables = [Paragraph("성숙도 레벨 평가", ctx.styles.heading)]
+    flowables += [Paragraph(f"• {level}", ctx.styles.normal) for level in MATURITY_GUIDE]
+    flowables.append(Spacer(1, 20))
+    return flowables
+
+
+def _category_table(ctx):
+    rows = [['카테고리', '획득점수', '만점', '달성률', '가중치']]
+    for category in ctx.view.category_scores:
+        rows.append([
+            category[1],
+            f"{category[3]}점",
+            f"{category[4]}점",
+            f"{category[3] / category[4] * 100:.1f}%" if category[4] else "-",
+            f"{category[2] * 100:.0f}%",
+        ])
+    table = Table(rows, colWidths=[2.5 * inch, 1 * inch, 1 * inch, 1 * inch, 1 * inch])
+    table.setStyle(ctx.styles.category_table)
+    return [Paragraph("카테고리별 상세 점수", ctx.styles.heading), table, Spacer(1, 20)]
+
+
+def _charts(ctx):
+    # 카테고리별 달성률/문항별 점수 차트 (같은 점수의 평가는 캐시된 차트 재사용)
+    flowables = []
+    for chart in (report_charts.category_chart(ctx.view, ctx.styles.font_name),
+                  report_charts.question_chart(ctx.view, ctx.styles.font_name)):
+        if chart is not None:
+            flowables += [chart, Spacer(1, 15)]
+    flowables.append(Spacer(1, 15))
+    return flowables
+
+
+def _details(ctx):
+    styles = ctx.styles
+    flowables = [Paragraph("상세 평가 결과", styles.heading)]
+    current_category = None
+    for code, title, score, option, category_name, comment in ctx.view.results:
+        if category_name != current_category:
+            current_category = category_name
+            flowables += [Spacer(1, 15), Paragraph(f"▶ {category_name}", styles.category)]
+        flowables.append(Paragraph(f"{code} {title} (점수: {score}/5)", styles.normal))
+        flowables.append(Paragraph(f"선택: {option}", styles.answer))
+        if comment:
+            flowables.append(Paragraph(f"※ 상세 의견: {comment}", styles.comment))
+    return flowables
+
+
+def _recommendations(ctx):
+    flowables = [Spacer(1, 30), Paragraph("개선 권고사항", ctx.styles.heading)]
+    flowables += [Paragraph(f"• {text}", ctx.styles.normal) for text in ctx.recommendations]
+    return flowables
+
+
+def _footer(ctx):
+    return [
+        Spacer(1, 40),
+        Paragraph(f"본 보고서는 {ctx.generated_at.strftime('%Y년 %m월 %d일')}에 생성되었습니다.", ctx.styles.footer),
+        Paragraph("APS 준비도 진단 시스템 v1.0", ctx.styles.footer),
+    ]
+
+
+SECTIONS = {
+    'title': _title,
+    'basic_info': _basic_info,
+    'maturity_guide': _maturity_guide,
+    'category_table': _category_table,
+    'charts': _charts,
+    'details': _details,
+    'recommendations': _recommendations,
+    'footer': _footer,
+}
+
+
+def render(view, font_name, template=DEFAULT_TEMPLATE, benchmark=None, recommendations=()):
+    """평가 뷰 모델로 PDF 보고서 생성 → (PDF 바이트, 페이지 수)
+
+    template: TEMPLATES의 이름 (없으면 KeyError)
+    benchmark: analytics 점수 행렬의 assessment_benchmark 결과
+    """
+    sections = TEMPLATES[template]
+    ctx = ReportContext(view, get_styles(font_name), benchmark, recommendations)
+    story = []
+    for name in sections:
+        story += SECTIONS[name](ctx)
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+    doc.build(story)
+    return buffer.getvalue(), doc.page
+
+
+def main():
+    from config import Config
+    from database import connect_db
+    import recommendations
+    import report_model
+
+    parser = argparse.ArgumentParser(description='PDF 보고서 템플릿별 생성 시간 측정')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    parser.add_argument('--template', action='append', choices=sorted(TEMPLATES), help='측정할 템플릿 (반복 지정 가능, 기본 전체)')
+    parser.add_argument('--count', type=int, default=20, help='템플릿별 보고서 수 (최근 완료 평가)')
+    args = parser.parse_args()
+
+    from app import KOREAN_FONT
+
+    conn = connect_db(args.db)
+    c = conn.cursor()
+    c.execute("SELECT id FROM assessments WHERE status = 'completed' ORDER BY id DESC LIMIT ?", (args.count,))
+    views = report_model.load_assessments(c, args.db, [row[0] for row in c.fetchall()])
+    texts = recommendations.recommend(c, args.db, views)
+    conn.close()
+    if not views:
+        print("완료된 평가가 없습니다.")
+        return 1
+
+    print(f"{'template':<10} {'pass':<5} {'reports':>7} {'pages':>6} {'total(s)':>9} {'ms/report':>10} {'ms/page':>8}")
+    for template in args.template or sorted(TEMPLATES):
+        # 첫 회차는 차트 캐시가 비어 있는 상태, 두 번째 회차는 캐시 적중 상태
+        for label in ('cold', 'warm'):
+            if label == 'cold':
+                report_charts.clear_cache()
+            pages = 0
+            start = time.perf_counter()
+            for view in views:
+                pages += render(view, KOREAN_FONT, template, recommendations=texts[view.id])[1]
+            elapsed = time.perf_counter() - start
+            print(f"{template:<10} {label:<5} {len(views):>7} {pages:>6} {elapsed:>9.2f} "
+                  f"{elapsed / len(views) * 1000:>10.1f} {elapsed / pages * 1000:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
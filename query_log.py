@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+느린 쿼리 로그 및 실행 계획(EXPLAIN QUERY PLAN) 수집
+
+앱에서는 init_app(app)으로 모든 DB 연결에 리스너를 등록하고,
+명령줄에서는 기록된 로그를 쿼리별로 집계하여 상위 항목을 출력합니다.
+
+    python query_log.py --top 10 --sort total
+"""
+import argparse
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import time
+
+from database import add_statement_listener, normalize_statement
+
+logger = logging.getLogger('aps.slow_query')
+
+# 실행 계획을 수집할 문장 종류
+EXPLAINABLE_VERBS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# 로그에 남길 파라미터 문자열 최대 길이
+PARAMETER_PREVIEW_LENGTH = 200
+
+# 로그 파일 이름 (SLOW_QUERY_LOG_PATH 미지정 시 DB 파일과 같은 디렉터리)
+LOG_FILENAME = 'slow_queries.log'
+
+_threshold = None
+_config = None  # 처음 기록할 때 로그 파일을 열기 위한 앱 설정
+
+
+def explain_query_plan(connection, sql, parameters):
+    """EXPLAIN QUERY PLAN 결과(detail 목록) 반환, 불가능하면 빈 목록"""
+    words = sql.lstrip().split(None, 1)
+    if not words or words[0].upper() not in EXPLAINABLE_VERBS or parameters is None:
+        return []
+    try:
+        # 기본 커서를 사용하여 리스너가 다시 호출되지 않도록 함
+        cursor = sqlite3.Cursor(connection)
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f'EXPLAIN 실패: {e}']
+
+
+def _preview(value):
+    if isinstance(value, str) and len(value) > PARAMETER_PREVIEW_LENGTH:
+        return value[:PARAMETER_PREVIEW_LENGTH] + '...'
+    if isinstance(value, bytes):
+        return f'<{len(value)} bytes>'
+    return value
+
+
+def _route():
+    try:
+        from flask import has_request_context, request
+    except ImportError:
+        return None
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else request.path
+    return None
+
+
+def _on_statement(trace, elapsed, rows):
+    """database 모듈의 SQL 문 리스너: 임계값을 넘은 문장을 한 번만 기록"""
+    if trace.flagged or trace.elapsed < _threshold:
+        return
+    trace.flagged = True
+    if not _open_log():
+        return
+
+    parameters = trace.parameters
+    if isinstance(parameters, dict):
+        parameters = {k: _preview(v) for k, v in parameters.items()}
+    elif parameters is not None:
+        parameters = [_preview(v) for v in parameters]
+
+    record = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'duration_ms': round(trace.elapsed * 1000, 2),
+        'rows': trace.rows,
+        'route': _route(),
+        'statement': normalize_statement(trace.sql),
+        'parameters': parameters,
+        'plan': explain_query_plan(trace.connection, trace.sql, trace.parameters),
+    }
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def log_path(configured, db_path):
+    """느린 쿼리 로그 경로 (미지정 시 DB 파일과 같은 디렉터리)"""
+    return configured or os.path.join(os.path.dirname(os.path.abspath(db_path)), LOG_FILENAME)
+
+
+def _open_log():
+    """처음 기록할 때 로그 파일 핸들러 연결 (그 시점의 DATABASE_PATH 기준), 실패하면 False"""
+    global _threshold
+    if logger.handlers:
+        return True
+    path = log_path(_config['SLOW_QUERY_LOG_PATH'], _config['DATABASE_PATH'])
+    try:
+        handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=_config['SLOW_QUERY_LOG_MAX_BYTES'],
+            backupCount=_config['SLOW_QUERY_LOG_BACKUPS'],
+            encoding='utf-8')
+    except OSError as e:
+        print(f"느린 쿼리 로그 파일을 열 수 없습니다: {e}")
+        _threshold = float('inf')  # 이후 기록 시도 중단
+        return False
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    return True
+
+
+def init_app(app):
+    """SQL 문 리스너 등록 (로그 파일은 처음 기록할 때 열어 이후 바뀐 DATABASE_PATH도 반영)"""
+    global _threshold, _config
+    if not app.config['SLOW_QUERY_LOG_ENABLED']:
+        return
+
+    _threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000.0
+    _config = app.config
+    add_statement_listener(_on_statement)
+
+
+def load_records(log_path):
+    """로그 파일(회전된 파일 포함)에서 기록 읽기"""
+    records = []
+    for path in sorted(glob.glob(log_path + '*')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError:
+            continue
+    return records
+
+
+def summarize(records, sort_key='total'):
+    """문장별 실행 횟수/총 시간/최대 시간 집계"""
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record['statement'], {
+            'statement': record['statement'], 'count': 0, 'total_ms': 0.0,
+            'max_ms': 0.0, 'max_rows': 0, 'routes': set(), 'plan': [], 'last_seen': ''
+        })
+        entry['count'] += 1
+        entry['total_ms'] += record['duration_ms']
+        entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+        entry['max_rows'] = max(entry['max_rows'], record.get('rows') or 0)
+        if record.get('route'):
+            entry['routes'].add(record['route'])
+        if record['timestamp'] >= entry['last_seen']:
+            entry['last_seen'] = record['timestamp']
+            entry['plan'] = record.get('plan') or []
+
+    keys = {'total': 'total_ms', 'max': 'max_ms', 'count': 'count'}
+    return sorted(summary.values(), key=lambda e: e[keys[sort_key]], reverse=True)
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='느린 쿼리 로그 요약')
+    parser.add_argument('--log', default=log_path(Config.SLOW_QUERY_LOG_PATH, Config.DATABASE_PATH),
+                        help='로그 파일 경로')
+    parser.add_argument('--top', type=int, default=10, help='출력할 쿼리 수')
+    parser.add_argument('--sort', choices=['total', 'max', 'count'], default='total', help='정렬 기준')
+    args = parser.parse_args()
+
+    records = load_records(args.log)
+    if not records:
+        print(f"기록된 느린 쿼리가 없습니다: {args.log}")
+        return
+
+    print(f"=== 느린 쿼리 상위 {args.top}개 (총 {len(records)}건, 정렬: {args.sort}) ===\n")
+    for rank, entry in enumerate(summarize(records, args.sort)[:args.top], 1):
+        avg_ms = entry['total_ms'] / entry['count']
+        print(f"{rank}. 횟수 {entry['count']} | 합계 {entry['total_ms']:.1f}ms | "
+              f"평균 {avg_ms:.1f}ms | 최대 {entry['max_ms']:.1f}ms | 최대 행 {entry['max_rows']}")
+        print(f"   {entry['statement'][:200]}")
+        if entry['routes']:
+            print(f"   라우트: {', '.join(sorted(entry['routes']))}")
+        for detail in entry['plan']:
+            print(f"   - {detail}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
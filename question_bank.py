@@ -0,0 +1,242 @@
+# question_bank.py - 문항 은행 버전 스냅샷 (평가별 고정) 및 버전별 카탈로그 캐시
+import hashlib
+import json
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+# 프로세스당 보관할 카탈로그 수 (버전은 변경되지 않으므로 만료 없이 LRU로만 정리)
+CATALOG_CACHE_SIZE = 32
+
+# 문항 코드 정렬 키의 숫자 자릿수 ('1.10.1' → 각 숫자를 이 자릿수로 채움)
+SORT_KEY_DIGITS = 10
+
+_CODE_NUMBER = re.compile(r'\d+')
+
+
+def sort_key(code):
+    """문항 코드의 자연 정렬 키 (문자열 비교가 숫자 순서와 같도록 숫자를 0으로 채움: '1.2.1' < '1.10.1')"""
+    return _CODE_NUMBER.sub(lambda match: match.group().zfill(SORT_KEY_DIGITS), (code or '').strip())
+
+
+def update_sort_keys(c, refresh=False):
+    """정렬 키가 없는(refresh이면 코드와 맞지 않는 것도) 문항의 키 갱신 → 갱신한 문항 수"""
+    c.execute("SELECT id, code, sort_key FROM questions" + ("" if refresh else " WHERE sort_key IS NULL"))
+    rows = []
+    for question_id, code, current in c.fetchall():
+        key = sort_key(code)
+        if key != current:
+            rows.append((key, question_id))
+    c.executemany("UPDATE questions SET sort_key = ? WHERE id = ?", rows)
+    return len(rows)
+
+
+def create_schema(c):
+    """문항 은행 버전 테이블, 평가 고정 컬럼, 문항 정렬 키 생성 → 정렬 키를 채운 기존 문항 수 (init_db에서 호출)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS question_bank_versions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content_hash TEXT NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        catalog BLOB NOT NULL
+    )''')
+
+    # 저장된 버전은 변경/삭제 불가
+    for action in ('UPDATE', 'DELETE'):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS question_bank_versions_no_{action.lower()}
+                      BEFORE {action} ON question_bank_versions
+                      BEGIN
+                          SELECT RAISE(ABORT, 'question_bank_versions는 변경할 수 없습니다');
+                      END''')
+
+    c.execute("PRAGMA table_info(assessments)")
+    if 'question_bank_version_id' not in [column[1] for column in c.fetchall()]:
+        c.execute("ALTER TABLE assessments ADD COLUMN question_bank_version_id INTEGER")
+        print("assessments 테이블에 question_bank_version_id 컬럼 추가됨")
+
+    # 문항 코드의 자연 정렬 키 (문항 저장 시 함께 기록, 목록/폼/재정렬은 카테고리별 인덱스 순서로 읽음)
+    c.execute("PRAGMA table_info(questions)")
+    if 'sort_key' not in [column[1] for column in c.fetchall()]:
+        c.execute("ALTER TABLE questions ADD COLUMN sort_key TEXT")
+        print("questions 테이블에 sort_key 컬럼 추가됨")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_categories_order ON categories (order_num)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_questions_category_sort ON questions (category_id, sort_key)")
+    return update_sort_keys(c)
+
+
+def read_live_bank(c):
+    """현재 카테고리/문항/선택지를 카탈로그 구조로 읽기"""
+    c.execute("SELECT id, name, weight, description, order_num FROM categories ORDER BY order_num, id")
+    categories = [{'id': row[0], 'name': row[1], 'weight': row[2], 'description': row[3],
+                   'order_num': row[4], 'questions': []} for row in c.fetchall()]
+    by_category = {category['id']: category for category in categories}
+
+    c.execute('''SELECT id, category_id, code, title, description, max_score, order_num
+                 FROM questions ORDER BY category_id, sort_key, id''')
+    questions = {}
+    for question_id, category_id, code, title, description, max_score, order_num in c.fetchall():
+        question = {'id': question_id, 'code': code, 'title': title, 'description': description,
+                    'max_score': max_score or 5, 'order_num': order_num, 'options': {}}
+        questions[question_id] = question
+        if category_id in by_category:
+            by_category[category_id]['questions'].append(question)
+
+    c.execute("SELECT question_id, score, description FROM question_options ORDER BY question_id, score")
+    for question_id, score, description in c.fetchall():
+        if question_id in questions:
+            questions[question_id]['options'][str(score)] = description
+
+    return {'categories': categories}
+
+
+def _encode(bank):
+    """정렬된 JSON 직렬화와 내용 해시 (같은 내용이면 같은 해시)"""
+    data = json.dumps(bank, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(data).hexdigest(), data
+
+
+class Catalog:
+    """문항 은행 한 버전의 읽기 전용 카탈로그"""
+
+    def __init__(self, version_id, bank):
+        self.version_id = version_id
+        self.categories = bank['categories']
+        self.questions = {}
+        self.question_category = {}
+        for category in self.categories:
+            for question in category['questions']:
+                self.questions[question['id']] = question
+                self.question_category[question['id']] = category
+
+    def option(self, question_id, score):
+        question = self.questions.get(question_id)
+        if question is None or score is None:
+            return None
+        return question['options'].get(str(score))
+
+    def ordered_results(self, results):
+        """결과 (question_id, score, comment)를 카탈로그 순서로 정렬하여
+        (문항, 카테고리, score, comment) 목록 반환 (카탈로그에 없는 문항은 마지막에 None으로)"""
+        by_question = {question_id: (score, comment) for question_id, score, comment in results}
+        ordered = []
+        for category in self.categories:
+            for question in category['questions']:
+                if question['id'] in by_question:
+                    score, comment = by_question.pop(question['id'])
+                    ordered.append((question, category, score, comment))
+        for question_id, (score, comment) in sorted(by_question.items()):
+            ordered.append(({'id': question_id, 'code': '', 'title': f'삭제된 문항 #{question_id}',
+                             'description': '', 'max_score': 5, 'options': {}}, None, score, comment))
+        return ordered
+
+    def category_scores(self, results):
+        """카테고리별 (id, 이름, 가중치, 획득 점수, 만점) - 답변이 있는 카테고리만"""
+        totals = {}
+        for question_id, score, _ in results:
+            category = self.question_category.get(question_id)
+            if category is None:
+                continue
+            entry = totals.setdefault(category['id'], [0, 0])
+            entry[0] += score or 0
+            entry[1] += self.questions[question_id]['max_score']
+        return [(category['id'], category['name'], category['weight'], totals[category['id']][0],
+                 totals[category['id']][1])
+                for category in self.categories if category['id'] in totals]
+
+
+_catalogs = OrderedDict()
+_current = {}  # {db_path: (question_bank_meta 버전, Catalog, 저장된 버전 ID 또는 None)}
+_lock = threading.Lock()
+
+
+def _cache_catalog(key, catalog):
+    with _lock:
+        _catalogs[key] = catalog
+        _catalogs.move_to_end(key)
+        while len(_catalogs) > CATALOG_CACHE_SIZE:
+            _catalogs.popitem(last=False)
+
+
+def _bank_meta_version(c):
+    c.execute("SELECT version FROM question_bank_meta WHERE id = 1")
+    row = c.fetchone()
+    return row[0] if row else 0
+
+
+def current_catalog(c, db_path):
+    """현재 문항 은행 카탈로그 (저장하지 않음, 문항 은행 버전이 같으면 캐시 사용)"""
+    meta_version = _bank_meta_version(c)
+    cached = _current.get(db_path)
+    if cached and cached[0] == meta_version:
+        return cached[1]
+    catalog = Catalog(None, read_live_bank(c))
+    _current[db_path] = (meta_version, catalog, None)
+    return catalog
+
+
+def snapshot_current(c, db_path):
+    """현재 문항 은행을 버전으로 저장하고 ID 반환 (같은 내용의 버전이 있으면 재사용)"""
+    meta_version = _bank_meta_version(c)
+    cached = _current.get(db_path)
+    if cached and cached[0] == meta_version and cached[2] is not None:
+        # 저장한 트랜잭션이 롤백되었을 수 있으므로 존재 여부 확인
+        c.execute("SELECT 1 FROM question_bank_versions WHERE id = ?", (cached[2],))
+        if c.fetchone():
+            return cached[2]
+
+    bank = read_live_bank(c)
+    content_hash, data = _encode(bank)
+    c.execute("INSERT OR IGNORE INTO question_bank_versions (content_hash, catalog) VALUES (?, ?)",
+              (content_hash, zlib.compress(data)))
+    c.execute("SELECT id FROM question_bank_versions WHERE content_hash = ?", (content_hash,))
+    version_id = c.fetchone()[0]
+
+    catalog = Catalog(version_id, bank)
+    _current[db_path] = (meta_version, catalog, version_id)
+    _cache_catalog((db_path, version_id), catalog)
+    return version_id
+
+
+def get_catalog(c, db_path, version_id):
+    """버전별 카탈로그 (버전이 없으면 현재 문항 은행)"""
+    if version_id is None:
+        return current_catalog(c, db_path)
+    key = (db_path, version_id)
+    with _lock:
+        catalog = _catalogs.get(key)
+        if catalog is not None:
+            _catalogs.move_to_end(key)
+            return catalog
+    c.execute("SELECT catalog FROM question_bank_versions WHERE id = ?", (version_id,))
+    row = c.fetchone()
+    if row is None:
+        return current_catalog(c, db_path)
+    catalog = Catalog(version_id, json.loads(zlib.decompress(row[0])))
+    _cache_catalog(key, catalog)
+    return catalog
+
+
+def drop_cache(db_path):
+    """DB 경로의 카탈로그 캐시 제거 (테넌트 DB를 닫을 때 사용)"""
+    with _lock:
+        for key in [key for key in _catalogs if key[0] == db_path]:
+            del _catalogs[key]
+    _current.pop(db_path, None)
+
+
+def pin_assessment(c, db_path, assessment_id):
+    """평가를 현재 문항 은행 버전에 고정"""
+    version_id = snapshot_current(c, db_path)
+    c.execute("UPDATE assessments SET question_bank_version_id = ? WHERE id = ?", (version_id, assessment_id))
+    return version_id
+
+
+def pin_unversioned(c, db_path):
+    """버전이 없는 기존 평가를 현재 문항 은행 버전에 고정 (이전 문항 이력은 알 수 없으므로 현재 기준)"""
+    c.execute("SELECT EXISTS (SELECT 1 FROM assessments WHERE question_bank_version_id IS NULL)")
+    if not c.fetchone()[0]:
+        return 0
+    version_id = snapshot_current(c, db_path)
+    c.execute("UPDATE assessments SET question_bank_version_id = ? WHERE question_bank_version_id IS NULL",
+              (version_id,))
+    return c.rowcount
@@ -0,0 +1,363 @@
+# recommendations.py - 규칙 기반 개선 권고사항 (성숙도/총 달성률/카테고리 달성률/문항 점수 조건)
+#
+# 규칙은 DB(recommendation_rules/recommendation_conditions)에 저장하고, 조건이 모두 맞으면 권고사항을 냅니다.
+# 규칙은 DB 경로별로 한 번 색인(대상별 정렬된 기준값)으로 컴파일하고 규칙이 바뀔 때만 다시 만듭니다.
+# 평가 1건은 대상 값마다 이진 탐색으로 만족한 조건을 세므로 규칙 수가 늘어도 빠르게 평가됩니다.
+#
+#     python recommendations.py list
+#     python recommendations.py add "데이터 정합성 점검 체계를 구축하세요." --when "category:2<50" --when "question:2.1.3<=2"
+#     python recommendations.py evaluate --limit 5000      # 완료 평가 일괄 평가 시간 측정
+import argparse
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 조건 대상: maturity(성숙도 레벨), total(총 달성률 %), category(카테고리 ID별 달성률 %), question(문항코드별 점수)
+TARGETS = ('maturity', 'total', 'category', 'question')
+OPERATORS = ('<', '<=', '>', '>=', '=')
+
+# 보고서 1건에 넣을 최대 권고사항 수 (우선순위 순)
+MAX_RECOMMENDATIONS = 10
+
+# 프로세스당 보관할 평가별 권고사항 수
+RESULT_CACHE_SIZE = 2048
+
+# 성숙도 레벨별 기본 권고사항 (규칙이 하나도 없을 때 입력)
+DEFAULT_RECOMMENDATIONS = {
+    1: ("기본적인 생산계획 프로세스 정립이 필요합니다.",
+        "기준정보(BOM, 라우팅) 정확도 개선이 시급합니다.",
+        "ERP 시스템 활용도를 높여야 합니다.",
+        "APS 도입을 위한 기초 역량 강화가 필요합니다."),
+    2: ("생산계획 수립 주기를 단축하여 민첩성을 높이세요.",
+        "실시간 데이터 수집 체계를 구축하세요.",
+        "시스템 간 연동을 강화하여 정보 일관성을 확보하세요.",
+        "계획 담당자의 역량 개발이 필요합니다."),
+    3: ("고급 스케줄링 기법 도입을 검토하세요.",
+        "예외상황 대응 프로세스를 체계화하세요.",
+        "성과 측정 및 분석 체계를 고도화하세요.",
+        "APS 시스템 도입을 본격 검토할 시점입니다."),
+    4: ("AI/ML 기반 수요예측 고도화를 추진하세요.",
+        "실시간 최적화 알고리즘 적용을 검토하세요.",
+        "공급망 전체 관점의 통합 계획을 수립하세요.",
+        "APS 시스템 도입에 최적한 상태입니다."),
+    5: ("현재 우수한 수준을 유지하면서 지속적 개선을 추진하세요.",
+        "차세대 기술(디지털 트윈, IoT 등) 활용을 검토하세요.",
+        "벤치마킹을 통한 글로벌 수준 달성을 목표로 하세요.",
+        "APS 시스템의 고도화 및 확장을 추진하세요."),
+}
+
+# 성숙도 레벨 규칙의 기본 우선순위 (카테고리/문항 규칙(기본 0)보다 뒤에 표시)
+MATURITY_PRIORITY = 100
+
+_CONDITION_PATTERN = re.compile(r'^\s*(maturity|total|category|question)(?::([^<>=\s]+))?\s*(<=|>=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def create_schema(c):
+    """권고 규칙 테이블 생성, 기본 규칙 입력 (init_db에서 호출)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS recommendation_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        active INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    # 한 규칙의 조건은 모두 만족해야 함 (조건이 없는 규칙은 항상 적용)
+    c.execute('''CREATE TABLE IF NOT EXISTS recommendation_conditions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rule_id INTEGER NOT NULL,
+        target TEXT NOT NULL CHECK (target IN ('maturity', 'total', 'category', 'question')),
+        target_key TEXT,
+        operator TEXT NOT NULL CHECK (operator IN ('<', '<=', '>', '>=', '=')),
+        value REAL NOT NULL,
+        FOREIGN KEY (rule_id) REFERENCES recommendation_rules (id) ON DELETE CASCADE
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recommendation_conditions_rule ON recommendation_conditions (rule_id)")
+
+    # 규칙 변경 시 버전 증가 (컴파일된 규칙 캐시 무효화)
+    c.execute('''CREATE TABLE IF NOT EXISTS recommendation_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute("INSERT OR IGNORE INTO recommendation_meta (id, version) VALUES (1, 0)")
+    for table in ('recommendation_rules', 'recommendation_conditions'):
+        for action in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_{action.lower()}_version
+                          AFTER {action} ON {table}
+                          BEGIN
+                              UPDATE recommendation_meta SET version = version + 1 WHERE id = 1;
+                          END''')
+
+    c.execute("SELECT COUNT(*) FROM recommendation_rules")
+    if c.fetchone()[0] > 0:
+        return
+
+    # 성숙도 레벨별 권고사항 테이블(report_recommendations)이 있으면 규칙으로 옮기고, 없으면 기본 권고사항 입력
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'report_recommendations'")
+    if c.fetchone():
+        c.execute("SELECT maturity_level, text, order_num FROM report_recommendations ORDER BY maturity_level, order_num, id")
+        rows = c.fetchall()
+    else:
+        rows = [(level, text, order_num)
+                for level, texts in DEFAULT_RECOMMENDATIONS.items()
+                for order_num, text in enumerate(texts, 1)]
+    for level, text, order_num in rows:
+        add_rule(c, text, [('maturity', None, '=', level)], priority=MATURITY_PRIORITY + (order_num or 0))
+    c.execute("DROP TABLE IF EXISTS report_recommendations")
+    if rows:
+        print(f"기본 권고 규칙 {len(rows)}개 생성됨")
+
+
+def parse_condition(text):
+    """'category:3<50', 'question:1.2.1<=2', 'maturity=1', 'total>=80' → (target, target_key, operator, value)"""
+    match = _CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"조건 형식이 올바르지 않습니다: {text}")
+    target, key, operator, value = match.groups()
+    if (target in ('category', 'question')) != (key is not None):
+        raise ValueError(f"category/question 조건은 대상(category:<ID>, question:<문항코드>)을 지정하고 "
+                         f"maturity/total 조건은 지정하지 않습니다: {text}")
+    return target, key, operator, float(value)
+
+
+def format_condition(target, key, operator, value):
+    value = int(value) if float(value).is_integer() else value
+    return f"{target}:{key}{operator}{value}" if key is not None else f"{target}{operator}{value}"
+
+
+def add_rule(c, text, conditions, priority=0):
+    """규칙 추가, conditions: [(target, target_key, operator, value)]"""
+    c.execute("INSERT INTO recommendation_rules (text, priority) VALUES (?, ?)", (text, priority))
+    rule_id = c.lastrowid
+    c.executemany('''INSERT INTO recommendation_conditions (rule_id, target, target_key, operator, value)
+                     VALUES (?, ?, ?, ?, ?)''',
+                  [(rule_id, target, None if key is None else str(key), operator, value)
+                   for target, key, operator, value in conditions])
+    return rule_id
+
+
+def delete_rule(c, rule_id):
+    """규칙 삭제 (조건은 ON DELETE CASCADE로 함께 삭제)"""
+    c.execute("DELETE FROM recommendation_rules WHERE id = ?", (rule_id,))
+    return c.rowcount
+
+
+class RuleEngine:
+    """컴파일된 권고 규칙
+
+    대상 값((target, key))마다 연산자별로 기준값을 정렬해 두고, 평가할 때는 대상 값마다 이진 탐색으로
+    만족한 조건의 규칙을 한 번에 찾아 규칙별 만족 조건 수를 셉니다.
+    """
+
+    def __init__(self, rules):
+        # rules: [(rule_id, text, priority, [(target, key, operator, value)])], 우선순위 순으로 번호 부여
+        rules = sorted(rules, key=lambda rule: (rule[2], rule[0]))
+        self.rule_ids = [rule[0] for rule in rules]
+        self.texts = [rule[1] for rule in rules]
+        self.required = [len(rule[3]) for rule in rules]
+        self.always = [index for index, rule in enumerate(rules) if not rule[3]]
+
+        thresholds = {}  # {(target, key): {operator: [(value, 규칙 번호)]}}
+        for index, (_rule_id, _text, _priority, conditions) in enumerate(rules):
+            for target, key, operator, value in conditions:
+                thresholds.setdefault((target, key), {}).setdefault(operator, []).append((value, index))
+
+        self._index = {}
+        for feature, by_operator in thresholds.items():
+            compiled = {}
+            for operator, pairs in by_operator.items():
+                if operator == '=':
+                    equals = {}
+                    for value, index in pairs:
+                        equals.setdefault(value, []).append(index)
+                    compiled[operator] = equals
+                else:
+                    pairs.sort()
+                    compiled[operator] = ([value for value, _ in pairs], [index for _, index in pairs])
+            self._index[feature] = compiled
+
+    def __len__(self):
+        return len(self.rule_ids)
+
+    def evaluate(self, features, limit=MAX_RECOMMENDATIONS):
+        """대상 값({(target, key): 값})을 만족하는 규칙의 권고사항 (우선순위 순)"""
+        satisfied = {}
+        for feature, x in features.items():
+            compiled = self._index.get(feature)
+            if compiled is None or x is None:
+                continue
+            for operator, entry in compiled.items():
+                if operator == '=':
+                    matched = entry.get(x, ())
+                else:
+                    values, indexes = entry
+                    if operator == '<':      # x < value
+                        matched = indexes[bisect.bisect_right(values, x):]
+                    elif operator == '<=':   # x <= value
+                        matched = indexes[bisect.bisect_left(values, x):]
+                    elif operator == '>':    # x > value
+                        matched = indexes[:bisect.bisect_left(values, x)]
+                    else:                    # x >= value
+                        matched = indexes[:bisect.bisect_right(values, x)]
+                for index in matched:
+                    satisfied[index] = satisfied.get(index, 0) + 1
+
+        fired = self.always + [index for index, count in satisfied.items() if count == self.required[index]]
+        fired.sort()
+        return [self.texts[index] for index in fired[:limit]]
+
+
+def features(view):
+    """평가 뷰 모델(report_model.AssessmentView)의 조건 대상 값"""
+    values = {('maturity', None): view.maturity_level, ('total', None): view.percentage}
+    for category_id, _name, _weight, score, max_score in view.category_scores:
+        values[('category', str(category_id))] = round(score / max_score * 100, 1) if max_score else 0.0
+    for code, _title, score, _option, _category, _comment in view.results:
+        values[('question', code)] = score
+    return values
+
+
+_engines = {}  # {db_path: (recommendation_meta 버전, RuleEngine)}
+_results = OrderedDict()  # {(db_path, assessment_id): (RuleEngine, AssessmentView, 권고사항)}
+_lock = threading.Lock()
+
+
+def _meta_version(c):
+    c.execute("SELECT version FROM recommendation_meta WHERE id = 1")
+    row = c.fetchone()
+    return row[0] if row else 0
+
+
+def get_engine(c, db_path):
+    """DB의 활성 규칙을 컴파일한 RuleEngine (규칙이 바뀌지 않았으면 캐시 사용)"""
+    version = _meta_version(c)
+    cached = _engines.get(db_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    c.execute("SELECT id, text, priority FROM recommendation_rules WHERE active = 1")
+    rules = {row[0]: (row[0], row[1], row[2], []) for row in c.fetchall()}
+    c.execute("SELECT rule_id, target, target_key, operator, value FROM recommendation_conditions")
+    for rule_id, target, key, operator, value in c.fetchall():
+        if rule_id in rules:
+            rules[rule_id][3].append((target, key, operator, value))
+    engine = RuleEngine(rules.values())
+    _engines[db_path] = (version, engine)
+    return engine
+
+
+def recommend(c, db_path, views):
+    """평가 뷰 모델 목록의 권고사항 {평가 ID: [권고사항]}
+
+    완료된 평가는 규칙과 뷰 모델이 그대로면 이전 결과를 재사용합니다.
+    """
+    engine = get_engine(c, db_path)
+    recommendations = {}
+    for view in views:
+        key = (db_path, view.id)
+        with _lock:
+            cached = _results.get(key)
+            if cached and cached[0] is engine and cached[1] is view:
+                _results.move_to_end(key)
+                recommendations[view.id] = cached[2]
+                continue
+        texts = engine.evaluate(features(view))
+        recommendations[view.id] = texts
+        if view.status == 'completed':
+            with _lock:
+                _results[key] = (engine, view, texts)
+                _results.move_to_end(key)
+                while len(_results) > RESULT_CACHE_SIZE:
+                    _results.popitem(last=False)
+    return recommendations
+
+
+def drop_cache(db_path):
+    """DB 경로의 규칙/결과 캐시 제거 (테넌트 DB를 닫을 때 사용)"""
+    with _lock:
+        for key in [key for key in _results if key[0] == db_path]:
+            del _results[key]
+    _engines.pop(db_path, None)
+
+
+def main():
+    from config import Config
+    from database import connect_db
+    import report_model
+
+    parser = argparse.ArgumentParser(description='개선 권고 규칙 관리')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='DB 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='규칙 목록')
+
+    add_parser = subparsers.add_parser('add', help='규칙 추가')
+    add_parser.add_argument('text', help='권고사항 문구')
+    add_parser.add_argument('--when', action='append', default=[],
+                            help="조건 (반복 지정 시 모두 만족): 'category:<ID><50', 'question:<문항코드><=2', "
+                                 "'maturity=1', 'total>=80'")
+    add_parser.add_argument('--priority', type=int, default=0, help='우선순위 (작을수록 먼저, 기본 0)')
+
+    delete_parser = subparsers.add_parser('delete', help='규칙 삭제')
+    delete_parser.add_argument('rule_ids', type=int, nargs='+')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='완료 평가 일괄 평가 (시간 측정)')
+    evaluate_parser.add_argument('--limit', type=int, default=1000, help='평가 수 (최근 순)')
+    evaluate_parser.add_argument('--show', type=int, default=3, help='결과를 출력할 평가 수')
+    args = parser.parse_args()
+
+    conn = connect_db(args.db)
+    c = conn.cursor()
+    try:
+        if args.command == 'list':
+            conditions = {}
+            c.execute("SELECT rule_id, target, target_key, operator, value FROM recommendation_conditions ORDER BY id")
+            for rule_id, *condition in c.fetchall():
+                conditions.setdefault(rule_id, []).append(format_condition(*condition))
+            c.execute("SELECT id, priority, active, text FROM recommendation_rules ORDER BY priority, id")
+            for rule_id, priority, active, text in c.fetchall():
+                print(f"{rule_id:>5} {priority:>5} {'' if active else '(비활성) '}"
+                      f"[{' AND '.join(conditions.get(rule_id, [])) or '항상'}] {text}")
+
+        elif args.command == 'add':
+            try:
+                conditions = [parse_condition(condition) for condition in args.when]
+            except ValueError as e:
+                print(e)
+                return 1
+            rule_id = add_rule(c, args.text, conditions, args.priority)
+            conn.commit()
+            print(f"규칙 {rule_id} 추가: [{' AND '.join(format_condition(*condition) for condition in conditions) or '항상'}]")
+
+        elif args.command == 'delete':
+            deleted = sum(delete_rule(c, rule_id) for rule_id in args.rule_ids)
+            conn.commit()
+            print(f"규칙 {deleted}개 삭제")
+
+        elif args.command == 'evaluate':
+            c.execute("SELECT id FROM assessments WHERE status = 'completed' ORDER BY id DESC LIMIT ?", (args.limit,))
+            views = report_model.load_assessments(c, args.db, [row[0] for row in c.fetchall()])
+            start = time.perf_counter()
+            engine = get_engine(c, args.db)
+            compiled = time.perf_counter()
+            results = recommend(c, args.db, views)
+            evaluated = time.perf_counter()
+            # 캐시에 남아 있는 최근 평가 결과 재조회
+            cached_views = views[-RESULT_CACHE_SIZE:]
+            recommend(c, args.db, cached_views)
+            cached = time.perf_counter()
+            print(f"규칙 {len(engine)}개 컴파일 {(compiled - start) * 1000:.1f}ms, 평가 {len(views)}건 "
+                  f"{(evaluated - compiled) * 1000:.1f}ms (건당 {(evaluated - compiled) / max(len(views), 1) * 1000:.3f}ms), "
+                  f"캐시 재조회 {len(cached_views)}건 {(cached - evaluated) * 1000:.1f}ms")
+            for view in views[:args.show]:
+                print(f"- 평가 {view.id} ({view.company_name}, Level {view.maturity_level}, {view.percentage}%)")
+                for text in results[view.id]:
+                    print(f"    • {text}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+# report_charts.py - PDF 보고서용 차트 (ReportLab 벡터 그래픽), 차트 입력값 해시로 프로세스 내 캐시
+#
+# 같은 점수의 평가는 같은 차트이므로 보고서를 반복/일괄 생성해도 차트는 한 번만 그립니다.
+# 캐시에는 차트 위젯을 기본 도형으로 펼친 Drawing을 두고, 문서마다 얇은 Flowable로 감싸 사용합니다
+# (Flowable에는 페이지 배치 상태가 기록되므로 Drawing을 여러 문서에 직접 넣으면 안 됨).
+import hashlib
+import threading
+from collections import OrderedDict
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.spider import SpiderChart
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import Flowable
+
+import metrics
+
+# 프로세스당 보관할 차트 수
+CHART_CACHE_SIZE = 256
+
+# 차트 폭 (A4 기본 좌우 여백 1인치를 뺀 본문 폭 이내)
+CHART_WIDTH = 6 * inch
+
+# 브라우저 차트(assessment_detail.html)와 같은 색
+SCORE_COLOR = colors.Color(54 / 255, 162 / 255, 235 / 255)
+SCORE_FILL = colors.Color(54 / 255, 162 / 255, 235 / 255, alpha=0.2)
+
+metrics.registry.describe('aps_report_chart_cache_total', 'counter', 'PDF 보고서 차트 캐시 조회 수')
+
+_charts = OrderedDict()  # {(차트 종류, 입력값 해시): 펼친 Drawing}
+_lock = threading.Lock()
+
+
+class ChartFlowable(Flowable):
+    """캐시된 차트 Drawing을 문서에 넣는 Flowable"""
+
+    def __init__(self, drawing):
+        super().__init__()
+        self.drawing = drawing
+        self.width = drawing.width
+        self.height = drawing.height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        renderPDF.draw(self.drawing, self.canv, 0, 0)
+
+
+def _cached(kind, key_data, build):
+    key = (kind, hashlib.sha1(repr(key_data).encode('utf-8')).hexdigest())
+    with _lock:
+        drawing = _charts.get(key)
+        if drawing is not None:
+            _charts.move_to_end(key)
+    metrics.registry.inc('aps_report_chart_cache_total', (('result', 'hit' if drawing else 'miss'),))
+
+    if drawing is None:
+        # 차트 위젯의 축/막대/라벨 계산을 한 번만 하도록 기본 도형으로 펼쳐서 보관
+        drawing = build().expandUserNodes()
+        with _lock:
+            _charts[key] = drawing
+            while len(_charts) > CHART_CACHE_SIZE:
+                _charts.popitem(last=False)
+    return ChartFlowable(drawing)
+
+
+def _percentages(view):
+    return [(category[1], round(category[3] / category[4] * 100, 1) if category[4] else 0.0)
+            for category in view.category_scores]
+
+
+def category_chart(view, font_name):
+    """카테고리별 달성률 차트 (방사형, 카테고리가 3개 미만이면 막대), 카테고리가 없으면 None"""
+    data = _percentages(view)
+    if not data:
+        return None
+    return _cached('category', (font_name, data), lambda: _build_category_chart(data, font_name))
+
+
+def _build_category_chart(data, font_name):
+    names = [name for name, _ in data]
+    values = [value for _, value in data]
+    height = 3.2 * inch
+    drawing = Drawing(CHART_WIDTH, height)
+
+    if len(data) >= 3:
+        chart = SpiderChart()
+        chart.x = CHART_WIDTH / 2 - 1.3 * inch
+        chart.y = 0.3 * inch
+        chart.width = chart.height = 2.6 * inch
+        # 방사형 차트는 데이터 최댓값으로 눈금을 맞추므로 보이지 않는 100% 계열로 0~100% 고정
+        chart.data = [values, [100] * len(values)]
+        chart.labels = [f"{name} ({value:.0f}%)" for name, value in data]
+        chart.spokeLabels.fontName = font_name
+        chart.spokeLabels.fontSize = 8
+        chart.spokes.strokeColor = colors.lightgrey
+        chart.strands[0].strokeColor = SCORE_COLOR
+        chart.strands[0].fillColor = SCORE_FILL
+        chart.strands[0].strokeWidth = 1.5
+        chart.strands[1].strokeColor = colors.lightgrey
+        chart.strands[1].fillColor = None
+        chart.strands[1].strokeWidth = 0.5
+        drawing.add(chart)
+    else:
+        chart = _bar_chart(names, values, font_name, 100, 20)
+        chart.x = 0.6 * inch
+        chart.y = 0.5 * inch
+        chart.width = CHART_WIDTH - 1.0 * inch
+        chart.height = height - 0.9 * inch
+        drawing.add(chart)
+
+    drawing.add(String(CHART_WIDTH / 2, height - 0.15 * inch, "카테고리별 달성률(%)",
+                       fontName=font_name, fontSize=10, textAnchor='middle'))
+    return drawing
+
+
+def question_chart(view, font_name):
+    """문항별 점수 막대 차트 (카탈로그 순서), 문항이 없으면 None"""
+    data = [(code, score) for code, _title, score, _option, _category, _comment in view.results]
+    if not data:
+        return None
+    return _cached('question', (font_name, data), lambda: _build_question_chart(data, font_name))
+
+
+def _build_question_chart(data, font_name):
+    height = 3 * inch
+    drawing = Drawing(CHART_WIDTH, height)
+    chart = _bar_chart([code for code, _ in data], [score for _, score in data], font_name, 5, 1)
+    chart.x = 0.4 * inch
+    chart.y = 0.7 * inch
+    chart.width = CHART_WIDTH - 0.6 * inch
+    chart.height = height - 1.1 * inch
+    chart.barSpacing = 1
+    chart.categoryAxis.labels.angle = 90
+    chart.categoryAxis.labels.boxAnchor = 'e'
+    chart.categoryAxis.labels.dx = 0
+    chart.categoryAxis.labels.dy = -3
+    chart.categoryAxis.labels.fontSize = 6 if len(data) > 40 else 7
+    drawing.add(chart)
+    drawing.add(String(CHART_WIDTH / 2, height - 0.15 * inch, "문항별 점수",
+                       fontName=font_name, fontSize=10, textAnchor='middle'))
+    return drawing
+
+
+def _bar_chart(names, values, font_name, value_max, value_step):
+    chart = VerticalBarChart()
+    chart.data = [values]
+    chart.bars[0].fillColor = SCORE_COLOR
+    chart.bars[0].strokeColor = None
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = value_max
+    chart.valueAxis.valueStep = value_step
+    chart.valueAxis.labels.fontName = font_name
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = colors.lightgrey
+    chart.categoryAxis.categoryNames = names
+    chart.categoryAxis.labels.fontName = font_name
+    chart.categoryAxis.labels.fontSize = 8
+    return chart
+
+
+def clear_cache():
+    with _lock:
+        _charts.clear()
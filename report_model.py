@@ -0,0 +1,133 @@
+# report_model.py - 보고서(PDF/Excel)용 평가 뷰 모델, 완료된 평가는 프로세스 내 LRU 캐시
+import threading
+from collections import OrderedDict
+
+import question_bank
+
+# 프로세스당 보관할 완료 평가 뷰 모델 수
+VIEW_CACHE_SIZE = 512
+
+# IN 절 하나에 넣을 평가 ID 수
+QUERY_CHUNK_SIZE = 500
+
+_HEADER_QUERY = '''SELECT a.id, a.company_id, co.name, co.industry, co.size, a.assessment_date, a.assessor_name,
+                          a.total_score, a.maturity_level, a.notes, a.status, a.question_bank_version_id
+                   FROM assessments a
+                   JOIN companies co ON a.company_id = co.id
+                   WHERE a.id IN ({})'''
+
+
+class AssessmentView:
+    """보고서 1건: 평가/회사 정보, 카테고리별 점수, 문항별 결과
+
+    category_scores: [(category_id, 이름, 가중치, 획득 점수, 만점)]
+    results: [(문항코드, 문항제목, 점수, 선택지 설명, 카테고리명, 의견)] - 카탈로그 순서
+    """
+
+    def __init__(self, header, catalog, results):
+        (self.id, self.company_id, self.company_name, self.industry, self.size, self.assessment_date,
+         self.assessor_name, self.total_score, self.maturity_level, self.notes, self.status, _) = header
+        self.category_scores = catalog.category_scores(results)
+        self.results = [(question['code'], question['title'], score, catalog.option(question['id'], score) or '',
+                         category['name'] if category else '기타', comment or '')
+                        for question, category, score, comment in catalog.ordered_results(results)]
+        self.score = sum(category[3] for category in self.category_scores)
+        self.max_score = sum(category[4] for category in self.category_scores)
+
+    @property
+    def percentage(self):
+        return round(self.score / self.max_score * 100, 1) if self.max_score else 0.0
+
+
+# 완료된 평가의 결과는 변경되지 않으므로 평가/회사 정보 행이 같으면 캐시 사용
+_views = OrderedDict()  # {(db_path, assessment_id): (평가 정보 행, AssessmentView)}
+_lock = threading.Lock()
+
+
+def _chunks(values):
+    for i in range(0, len(values), QUERY_CHUNK_SIZE):
+        yield values[i:i + QUERY_CHUNK_SIZE]
+
+
+def load_assessments(c, db_path, assessment_ids):
+    """평가 ID 순서대로 뷰 모델 목록 (없는 평가는 제외)
+
+    평가 정보는 한 번에 조회하고, 캐시에 없는 평가의 결과만 IN 절로 한 번에 읽습니다.
+    """
+    assessment_ids = list(dict.fromkeys(assessment_ids))
+    headers = {}
+    for chunk in _chunks(assessment_ids):
+        c.execute(_HEADER_QUERY.format(','.join('?' * len(chunk))), chunk)
+        headers.update((row[0], row) for row in c.fetchall())
+
+    views = {}
+    missing = []
+    with _lock:
+        for assessment_id, header in headers.items():
+            cached = _views.get((db_path, assessment_id))
+            if cached and cached[0] == header:
+                _views.move_to_end((db_path, assessment_id))
+                views[assessment_id] = cached[1]
+            else:
+                missing.append(assessment_id)
+
+    results = {assessment_id: [] for assessment_id in missing}
+    for chunk in _chunks(missing):
+        c.execute(f'''SELECT assessment_id, question_id, score, comment FROM assessment_results
+                      WHERE assessment_id IN ({','.join('?' * len(chunk))})''', chunk)
+        for assessment_id, question_id, score, comment in c.fetchall():
+            results[assessment_id].append((question_id, score, comment))
+
+    for assessment_id in missing:
+        header = headers[assessment_id]
+        catalog = question_bank.get_catalog(c, db_path, header[11])
+        view = AssessmentView(header, catalog, results[assessment_id])
+        views[assessment_id] = view
+        if header[10] == 'completed':
+            with _lock:
+                _views[(db_path, assessment_id)] = (header, view)
+                _views.move_to_end((db_path, assessment_id))
+                while len(_views) > VIEW_CACHE_SIZE:
+                    _views.popitem(last=False)
+
+    return [views[assessment_id] for assessment_id in assessment_ids if assessment_id in views]
+
+
+def load_assessment(c, db_path, assessment_id):
+    """평가 1건의 뷰 모델 (없으면 None)"""
+    views = load_assessments(c, db_path, [assessment_id])
+    return views[0] if views else None
+
+
+def company_assessment_ids(c, company_id):
+    """회사의 완료된 평가 ID (평가일 순)"""
+    c.execute('''SELECT id FROM assessments WHERE company_id = ? AND status = 'completed'
+                 ORDER BY assessment_date, id''', (company_id,))
+    return [row[0] for row in c.fetchall()]
+
+
+def latest_assessment_ids(c, company_ids=None):
+    """회사별 가장 최근 완료 평가 ID (회사명 순, company_ids가 없으면 전체 회사)"""
+    query = '''SELECT id FROM (
+                   SELECT a.id, co.name, a.company_id,
+                          ROW_NUMBER() OVER (PARTITION BY a.company_id ORDER BY a.assessment_date DESC, a.id DESC) AS rn
+                   FROM assessments a
+                   JOIN companies co ON a.company_id = co.id
+                   WHERE a.status = 'completed' {})
+               WHERE rn = 1
+               ORDER BY name, company_id'''
+    if company_ids is None:
+        c.execute(query.format(''))
+        return [row[0] for row in c.fetchall()]
+    ids = []
+    for chunk in _chunks(list(company_ids)):
+        c.execute(query.format(f"AND a.company_id IN ({','.join('?' * len(chunk))})"), chunk)
+        ids.extend(row[0] for row in c.fetchall())
+    return ids
+
+
+def drop_cache(db_path):
+    """DB 경로의 뷰 모델 캐시 제거 (테넌트 DB를 닫을 때 사용)"""
+    with _lock:
+        for key in [key for key in _views if key[0] == db_path]:
+            del _views[key]
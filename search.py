@@ -0,0 +1,256 @@
+# search.py - 회사/문항/평가 의견 전문 검색 (SQLite FTS5, trigram 토크나이저)
+import math
+import re
+
+from markupsafe import Markup, escape
+
+# 검색 대상
+SEARCH_TYPES = ('companies', 'questions', 'comments')
+
+# 페이지 크기
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# trigram 토크나이저는 3글자 이상이어야 색인을 사용 (미만은 LIKE 검색)
+MIN_MATCH_LENGTH = 3
+
+# 모든 검색어가 3글자 미만이면 색인 없이 훑으므로 최근 이 행 수 안에서만 찾음
+SHORT_TERM_SCAN_ROWS = 20000
+
+# 의견 미리보기 길이 (검색어 앞뒤 글자 수)
+SNIPPET_CONTEXT = 40
+
+# FTS 테이블: (FTS 테이블, 원본 테이블, 색인 컬럼)
+FTS_TABLES = [
+    ('companies_fts', 'companies', ('name', 'industry', 'contact_person')),
+    ('questions_fts', 'questions', ('code', 'title', 'description')),
+    ('question_options_fts', 'question_options', ('description',)),
+    ('assessment_comments_fts', 'assessment_results', ('comment',)),
+]
+
+
+def create_schema(c):
+    """FTS5 테이블과 동기화 트리거 생성 (init_db에서 호출)
+
+    원본 테이블을 external content로 사용하므로 색인만 저장하며,
+    새로 만든 FTS 테이블은 기존 데이터로 색인을 재구성합니다.
+    """
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in c.fetchall()}
+
+    for fts, table, columns in FTS_TABLES:
+        column_list = ', '.join(columns)
+        c.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                          {column_list}, content='{table}', content_rowid='id', tokenize='trigram')''')
+
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table}
+                      BEGIN
+                          INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+                      END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table}
+                      BEGIN
+                          INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                      END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table}
+                      BEGIN
+                          INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                          INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+                      END''')
+
+        if fts not in existing:
+            c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            print(f"{fts} 검색 색인 생성됨")
+
+
+def drop_schema(c):
+    """FTS 테이블과 트리거 삭제 (대량 적재 전 사용, 적재 후 create_schema로 다시 생성)"""
+    for fts, _, _ in FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            c.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        c.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def rebuild(c):
+    """모든 검색 색인 재구성 (대량 적재 후 사용)"""
+    for fts, _, _ in FTS_TABLES:
+        c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def parse_terms(query):
+    """검색어를 공백 기준으로 나눔 (중복 제거, 순서 유지)"""
+    terms = []
+    for term in (query or '').split():
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _short_only(terms):
+    return all(len(t) < MIN_MATCH_LENGTH for t in terms)
+
+
+def _condition(fts, terms):
+    """검색어별 조건, 파라미터, 정렬 기준
+
+    3글자 이상 검색어는 MATCH(구문 검색)로 색인에서 찾고, 미만은 그 결과에 LIKE 조건으로 거릅니다.
+    모든 검색어가 3글자 미만이면 색인을 쓸 수 없으므로 원본 테이블의 최근 SHORT_TERM_SCAN_ROWS행
+    (rowid 범위)만 훑습니다.
+    """
+    table, columns = _source(fts)
+    long_terms = [t for t in terms if len(t) >= MIN_MATCH_LENGTH]
+    short_terms = [t for t in terms if len(t) < MIN_MATCH_LENGTH]
+    conditions, params = [], []
+    if long_terms:
+        conditions.append(f"{fts} MATCH ?")
+        params.append(' AND '.join('"' + t.replace('"', '""') + '"' for t in long_terms))
+    for term in short_terms:
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions.append('(' + ' OR '.join(f"{fts}.{column} LIKE ? ESCAPE '\\'" for column in columns) + ')')
+        params.extend([pattern] * len(columns))
+    if long_terms:
+        return ' AND '.join(conditions), params, f"bm25({fts})"
+    # FTS5가 rowid 범위로 읽으므로 훑는 행 수가 제한됨 (최근 행부터 표시)
+    conditions.insert(0, f"{fts}.rowid >= COALESCE((SELECT id FROM {table} ORDER BY id DESC LIMIT 1 OFFSET ?), 0)")
+    params.insert(0, SHORT_TERM_SCAN_ROWS - 1)
+    return ' AND '.join(conditions), params, f"-{fts}.rowid"
+
+
+def _source(fts):
+    """FTS 테이블의 (원본 테이블, 색인 컬럼)"""
+    return next((table, columns) for name, table, columns in FTS_TABLES if name == fts)
+
+
+def _scan_limited(c, search_type):
+    """짧은 검색어 검색이 최근 행만 훑었는지 (원본 테이블 행이 SHORT_TERM_SCAN_ROWS보다 많음)"""
+    fts_names = {'companies': ('companies_fts',), 'questions': ('questions_fts', 'question_options_fts'),
+                 'comments': ('assessment_comments_fts',)}[search_type]
+    for fts in fts_names:
+        table, _ = _source(fts)
+        c.execute(f"SELECT EXISTS (SELECT 1 FROM {table} ORDER BY id DESC LIMIT 1 OFFSET ?)", (SHORT_TERM_SCAN_ROWS,))
+        if c.fetchone()[0]:
+            return True
+    return False
+
+
+def highlight(text, terms, context=None):
+    """검색어를 <mark>로 강조한 HTML (context를 주면 첫 일치 위치 주변만 잘라냄)"""
+    text = text or ''
+    if not terms:
+        return escape(text)
+    pattern = re.compile('|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    if context is not None:
+        found = pattern.search(text)
+        start = max((found.start() if found else 0) - context, 0)
+        end = min((found.end() if found else 0) + context, len(text))
+        text = ('…' if start > 0 else '') + text[start:end] + ('…' if end < len(text) else '')
+
+    parts = []
+    position = 0
+    for found in pattern.finditer(text):
+        parts.append(escape(text[position:found.start()]))
+        parts.append(Markup('<mark>') + escape(found.group()) + Markup('</mark>'))
+        position = found.end()
+    parts.append(escape(text[position:]))
+    return Markup('').join(parts)
+
+
+def _search_companies(c, terms, per_page, offset):
+    where, params, rank = _condition('companies_fts', terms)
+    c.execute(f"SELECT COUNT(*) FROM companies_fts WHERE {where}", params)
+    total = c.fetchone()[0]
+    c.execute(f'''SELECT co.id, co.name, co.industry, co.size, co.contact_person
+                  FROM companies_fts
+                  JOIN companies co ON co.id = companies_fts.rowid
+                  WHERE {where}
+                  ORDER BY {rank}
+                  LIMIT ? OFFSET ?''', params + [per_page, offset])
+    items = [{
+        'id': row[0], 'name': row[1], 'industry': row[2], 'size': row[3], 'contact_person': row[4],
+        'highlight': str(highlight(row[1], terms)),
+    } for row in c.fetchall()]
+    return total, items
+
+
+def _search_questions(c, terms, per_page, offset):
+    """문항 제목/설명/선택지 설명에서 검색 (문항 단위로 묶어 가장 높은 순위 사용)"""
+    question_where, question_params, question_rank = _condition('questions_fts', terms)
+    option_where, option_params, option_rank = _condition('question_options_fts', terms)
+    matches = f'''SELECT questions_fts.rowid AS question_id, {question_rank} AS rank
+                  FROM questions_fts WHERE {question_where}
+                  UNION ALL
+                  SELECT qo.question_id, {option_rank} AS rank
+                  FROM question_options_fts
+                  JOIN question_options qo ON qo.id = question_options_fts.rowid
+                  WHERE {option_where}'''
+    params = question_params + option_params
+
+    c.execute(f"SELECT COUNT(DISTINCT question_id) FROM ({matches})", params)
+    total = c.fetchone()[0]
+    c.execute(f'''SELECT q.id, q.code, q.title, q.description, cat.name, m.rank
+                  FROM (SELECT question_id, MIN(rank) AS rank FROM ({matches}) GROUP BY question_id) m
+                  JOIN questions q ON q.id = m.question_id
+                  LEFT JOIN categories cat ON q.category_id = cat.id
+                  ORDER BY m.rank, q.id
+                  LIMIT ? OFFSET ?''', params + [per_page, offset])
+    items = [{
+        'id': row[0], 'code': row[1], 'title': row[2], 'category': row[4],
+        'highlight': str(highlight(row[2], terms)),
+        'snippet': str(highlight(row[3], terms, SNIPPET_CONTEXT)),
+    } for row in c.fetchall()]
+    return total, items
+
+
+def _search_comments(c, terms, per_page, offset):
+    where, params, rank = _condition('assessment_comments_fts', terms)
+    c.execute(f"SELECT COUNT(*) FROM assessment_comments_fts WHERE {where}", params)
+    total = c.fetchone()[0]
+    c.execute(f'''SELECT ar.assessment_id, co.name, q.code, q.title, ar.score, ar.comment, a.assessment_date
+                  FROM assessment_comments_fts
+                  JOIN assessment_results ar ON ar.id = assessment_comments_fts.rowid
+                  JOIN assessments a ON ar.assessment_id = a.id
+                  JOIN companies co ON a.company_id = co.id
+                  LEFT JOIN questions q ON ar.question_id = q.id
+                  WHERE {where}
+                  ORDER BY {rank}
+                  LIMIT ? OFFSET ?''', params + [per_page, offset])
+    items = [{
+        'assessment_id': row[0], 'company_name': row[1], 'question_code': row[2], 'question_title': row[3],
+        'score': row[4], 'assessment_date': row[6],
+        'snippet': str(highlight(row[5], terms, SNIPPET_CONTEXT)),
+    } for row in c.fetchall()]
+    return total, items
+
+
+_SEARCHERS = {
+    'companies': _search_companies,
+    'questions': _search_questions,
+    'comments': _search_comments,
+}
+
+
+def search(c, query, search_type='companies', page=1, per_page=DEFAULT_PER_PAGE):
+    """검색 결과 1페이지와 전체 건수/페이지 수 반환"""
+    if search_type not in _SEARCHERS:
+        raise ValueError(f"search_type은 {', '.join(SEARCH_TYPES)} 중 하나여야 합니다")
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    page = max(page, 1)
+    terms = parse_terms(query)
+
+    total, items = 0, []
+    if terms:
+        total, items = _SEARCHERS[search_type](c, terms, per_page, (page - 1) * per_page)
+    # 짧은 검색어만으로 찾아 최근 행만 훑은 경우 (검색어를 구체적으로 입력하도록 안내)
+    limited = bool(terms) and _short_only(terms) and _scan_limited(c, search_type)
+
+    return {
+        'query': query or '',
+        'type': search_type,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': math.ceil(total / per_page) if total else 0,
+        'limited': limited,
+        'items': items,
+    }
@@ -0,0 +1,252 @@
+// offline.js - 오프라인 평가 입력 저장소 (IndexedDB) 및 일괄 동기화
+//
+// drafts: 회사별 입력 중인 평가 상태 (화면 복원용)
+// ops:    서버에 보낼 변경 작업 큐 (/api/sync)
+//
+// 작업은 보내기 전까지 같은 평가의 마지막 작업에 합쳐지고(문항별 마지막 값만 전송),
+// 한 번 보낸 작업은 key와 내용을 고정하여 응답을 받지 못해도 그대로 다시 보냅니다.
+// 서버는 key로 중복 적용을 막으므로 끊긴 동기화는 처음부터 다시 보내도 안전합니다.
+const OfflineStore = (function() {
+    const DB_NAME = 'aps-offline';
+    const DB_VERSION = 1;
+    const SYNC_URL = '/api/sync';
+    const SYNC_CHUNK = 100;  // 요청당 작업 수 (서버 제한 offline_sync.MAX_OPS 이하)
+
+    let dbPromise = null;
+    let flushing = null;
+
+    function open() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const req = indexedDB.open(DB_NAME, DB_VERSION);
+                req.onupgradeneeded = () => {
+                    const db = req.result;
+                    db.createObjectStore('drafts', {keyPath: 'companyId'});
+                    const ops = db.createObjectStore('ops', {keyPath: 'seq', autoIncrement: true});
+                    ops.createIndex('companyId', 'companyId');
+                };
+                req.onsuccess = () => resolve(req.result);
+                req.onerror = () => reject(req.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    // 트랜잭션 하나에서 work(stores) 실행, 완료 시 work의 반환값으로 resolve
+    function transaction(names, mode, work) {
+        return open().then(db => new Promise((resolve, reject) => {
+            const tx = db.transaction(names, mode);
+            const stores = names.map(name => tx.objectStore(name));
+            let result;
+            Promise.resolve(work(...stores)).then(value => { result = value; });
+            tx.oncomplete = () => resolve(result);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        }));
+    }
+
+    function request(req) {
+        return new Promise((resolve, reject) => {
+            req.onsuccess = () => resolve(req.result);
+            req.onerror = () => reject(req.error);
+        });
+    }
+
+    function newKey() {
+        if (self.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    }
+
+    // 회사별 입력 상태 저장 ({answers, notes, assessor_name, assessmentId, clientId, version}, 주어진 필드만 갱신)
+    function saveDraft(companyId, state) {
+        companyId = String(companyId);
+        return transaction(['drafts'], 'readwrite', drafts => request(drafts.get(companyId)).then(draft => {
+            drafts.put(Object.assign({}, draft, state, {companyId: companyId, updated: Date.now()}));
+        }));
+    }
+
+    function loadDraft(companyId) {
+        return transaction(['drafts'], 'readonly', drafts => request(drafts.get(String(companyId))));
+    }
+
+    function clearDraft(companyId) {
+        companyId = String(companyId);
+        return transaction(['drafts', 'ops'], 'readwrite', (drafts, ops) => {
+            drafts.delete(companyId);
+            return request(ops.index('companyId').getAllKeys(companyId))
+                .then(keys => keys.forEach(seq => ops.delete(seq)));
+        });
+    }
+
+    // 오프라인에서 만든 평가의 클라이언트 ID (회사별로 하나, 서버 평가 ID가 생기기 전까지 사용)
+    function clientIdFor(companyId) {
+        return loadDraft(companyId).then(draft => {
+            if (draft && draft.clientId) {
+                return draft.clientId;
+            }
+            const clientId = newKey();
+            return saveDraft(companyId, {clientId: clientId}).then(() => clientId);
+        });
+    }
+
+    // 변경 작업 추가: 아직 보내지 않은 같은 회사의 마지막 작업이 있으면 합침
+    // op: {company_id, assessment_id | client_id, version, changes: {questionId: [score, comment] | null}, notes?, assessor_name?}
+    function enqueue(op) {
+        const companyId = String(op.company_id);
+        return transaction(['ops'], 'readwrite', ops => {
+            return request(ops.index('companyId').getAll(companyId)).then(queued => {
+                const last = queued[queued.length - 1];
+                if (last && !last.sent) {
+                    Object.assign(last.changes, op.changes);
+                    ['notes', 'assessor_name'].forEach(field => {
+                        if (field in op) {
+                            last[field] = op[field];
+                        }
+                    });
+                    ops.put(last);
+                    return;
+                }
+                const entry = Object.assign({}, op, {companyId: companyId, key: newKey(), sent: false});
+                // 이어지는 작업은 버전을 보내지 않음 (앞 작업이 올린 버전과 충돌로 보지 않도록)
+                if (queued.length > 0) {
+                    delete entry.version;
+                }
+                ops.add(entry);
+            });
+        });
+    }
+
+    function pendingCount(companyId) {
+        return transaction(['ops'], 'readonly', ops => companyId == null
+            ? request(ops.count())
+            : request(ops.index('companyId').count(String(companyId))));
+    }
+
+    // 보낼 작업을 고정(sent)하고 seq 순서대로 반환
+    function seal() {
+        return transaction(['ops'], 'readwrite', ops => request(ops.getAll()).then(entries => {
+            entries.forEach(entry => {
+                if (!entry.sent) {
+                    entry.sent = true;
+                    ops.put(entry);
+                }
+            });
+            return entries;
+        }));
+    }
+
+    function encode(payload) {
+        const json = JSON.stringify(payload);
+        if (typeof CompressionStream === 'undefined') {
+            return Promise.resolve({body: json, headers: {'Content-Type': 'application/json'}});
+        }
+        const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+        return new Response(stream).arrayBuffer().then(body => ({
+            body: body,
+            headers: {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+        }));
+    }
+
+    function send(entries) {
+        const ops = entries.map(entry => {
+            const op = Object.assign({}, entry);
+            delete op.seq;
+            delete op.sent;
+            delete op.companyId;
+            return op;
+        });
+        return encode({ops: ops})
+            .then(({body, headers}) => fetch(SYNC_URL, {method: 'POST', headers: headers, body: body}))
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`동기화 실패 (HTTP ${response.status})`);
+                }
+                return response.json();
+            });
+    }
+
+    // 결과를 받은 작업 삭제, 서버 평가 ID/버전을 입력 상태에 반영
+    function settle(entries, results) {
+        return transaction(['ops', 'drafts'], 'readwrite', (ops, drafts) => {
+            const bySeq = new Map();
+            results.forEach((result, index) => bySeq.set(entries[index].seq, result));
+            const latest = {};
+            entries.forEach(entry => {
+                const result = bySeq.get(entry.seq);
+                if (!result) {
+                    return;
+                }
+                ops.delete(entry.seq);
+                result.company_id = entry.companyId;
+                if (result.status === 'applied') {
+                    latest[entry.companyId] = result;
+                }
+            });
+            // 같은 평가의 남은 작업은 서버 평가 ID로 보냄
+            return request(ops.getAll()).then(remaining => {
+                remaining.forEach(entry => {
+                    const result = latest[entry.companyId];
+                    if (result && !entry.sent && !entry.assessment_id) {
+                        entry.assessment_id = result.assessment_id;
+                        delete entry.client_id;
+                        ops.put(entry);
+                    }
+                });
+                return Promise.all(Object.keys(latest).map(companyId =>
+                    request(drafts.get(companyId)).then(draft => {
+                        if (draft) {
+                            draft.assessmentId = latest[companyId].assessment_id;
+                            draft.version = latest[companyId].version;
+                            drafts.put(draft);
+                        }
+                    })));
+            }).then(() => results);
+        });
+    }
+
+    // 큐의 모든 작업 전송 (동시에 한 번만 실행), 작업별 결과 목록 반환
+    function flush() {
+        if (flushing) {
+            return flushing;
+        }
+        flushing = seal().then(entries => {
+            const chunks = [];
+            for (let i = 0; i < entries.length; i += SYNC_CHUNK) {
+                chunks.push(entries.slice(i, i + SYNC_CHUNK));
+            }
+            const results = [];
+            return chunks.reduce((previous, chunk) => previous
+                .then(() => send(chunk))
+                .then(data => settle(chunk, data.results))
+                .then(chunkResults => { results.push(...chunkResults); }),
+                Promise.resolve()).then(() => results);
+        }).finally(() => { flushing = null; });
+        return flushing;
+    }
+
+    function registerWorker() {
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.register('/sw.js').catch(error => console.error('서비스 워커 등록 실패:', error));
+            // 현재 화면과 화면이 불러온 스크립트/스타일시트를 오프라인용으로 캐시
+            navigator.serviceWorker.ready.then(registration => {
+                const urls = [location.href].concat(
+                    Array.from(document.querySelectorAll('script[src]'), script => script.src),
+                    Array.from(document.querySelectorAll('link[rel="stylesheet"]'), link => link.href));
+                registration.active.postMessage({type: 'cache', urls: urls});
+            });
+        }
+    }
+
+    return {
+        saveDraft: saveDraft,
+        loadDraft: loadDraft,
+        clearDraft: clearDraft,
+        clientIdFor: clientIdFor,
+        enqueue: enqueue,
+        pendingCount: pendingCount,
+        flush: flush,
+        registerWorker: registerWorker,
+    };
+})();
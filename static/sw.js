@@ -0,0 +1,90 @@
+// sw.js - 오프라인 평가 입력용 서비스 워커
+//
+// 평가 입력 화면은 네트워크 우선(실패 시 마지막으로 받은 화면),
+// CDN 라이브러리와 정적 파일은 캐시 우선으로 제공합니다.
+// 답변 저장/동기화 요청(POST)은 캐시하지 않으며, 오프라인 중 변경은 offline.js가 IndexedDB에 보관합니다.
+const CACHE_NAME = 'aps-offline-v1';
+
+// 오프라인에서도 열 수 있어야 하는 화면
+const PAGE_PATTERNS = [
+    /^\/assessment\/new\/\d+$/,
+];
+
+self.addEventListener('install', event => {
+    event.waitUntil(self.skipWaiting());
+});
+
+// 처음 방문한 화면은 서비스 워커 등록 전에 받았으므로 화면이 알려주는 URL을 캐시
+// (정적 파일은 내용 해시가 든 URL이라 화면과 함께 캐시해야 함)
+self.addEventListener('message', event => {
+    const data = event.data || {};
+    if (data.type === 'cache' && Array.isArray(data.urls)) {
+        event.waitUntil(caches.open(CACHE_NAME).then(cache => Promise.all(data.urls.map(url =>
+            fetch(url).then(response => {
+                if (response.ok) {
+                    return cache.put(url.split('?')[0], response);
+                }
+            }).catch(() => null)))));
+    }
+});
+
+self.addEventListener('activate', event => {
+    // 이전 버전 캐시 정리
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE_NAME).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+
+    if (url.origin === self.location.origin) {
+        if (PAGE_PATTERNS.some(pattern => pattern.test(url.pathname))) {
+            event.respondWith(networkFirst(request));
+        } else if (url.pathname.startsWith('/static/')) {
+            event.respondWith(cacheFirst(request));
+        }
+    } else if (url.hostname === 'cdn.jsdelivr.net') {
+        event.respondWith(cacheFirst(request));
+    }
+});
+
+// 네트워크 우선: 성공한 응답은 캐시에 갱신, 실패하면 같은 경로의 캐시 (쿼리 무시)
+function networkFirst(request) {
+    return fetch(request)
+        .then(response => {
+            if (response.ok) {
+                const copy = response.clone();
+                caches.open(CACHE_NAME).then(cache => cache.put(request.url.split('?')[0], copy));
+            }
+            return response;
+        })
+        .catch(() => caches.match(request, {ignoreSearch: true})
+            .then(cached => cached || new Response('오프라인 상태이며 저장된 화면이 없습니다.', {
+                status: 503,
+                headers: {'Content-Type': 'text/plain; charset=utf-8'}
+            })));
+}
+
+// 캐시 우선: 없으면 받아서 캐시에 저장
+function cacheFirst(request) {
+    return caches.match(request).then(cached => {
+        if (cached) {
+            return cached;
+        }
+        return fetch(request).then(response => {
+            // CDN 응답(opaque 포함)도 저장
+            if (response.ok || response.type === 'opaque') {
+                const copy = response.clone();
+                caches.open(CACHE_NAME).then(cache => cache.put(request, copy));
+            }
+            return response;
+        });
+    });
+}
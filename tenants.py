@@ -0,0 +1,314 @@
+# tenants.py - 멀티 테넌트 라우팅 (요청 → 테넌트별 SQLite DB), 테넌트 연결 풀 및 관리 CLI
+#
+# 사용법:
+#   python tenants.py create acme
+#   python tenants.py list
+#   python tenants.py migrate --all
+#   python tenants.py backup acme
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, request
+
+from database import ConnectionPool
+
+# 테넌트 이름: 소문자/숫자/하이픈 (DNS 레이블 규칙과 동일)
+TENANT_NAME = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+# 테넌트 없이 처리하는 엔드포인트
+EXEMPT_ENDPOINTS = {'health_check', 'static', 'metrics', 'service_worker'}
+
+TENANT_MODES = ('off', 'subdomain', 'header')
+
+
+def validate_name(name):
+    """테넌트 이름 검증 (잘못된 이름이면 ValueError)"""
+    if not name or not TENANT_NAME.match(name):
+        raise ValueError(f"잘못된 테넌트 이름입니다: {name!r} (소문자, 숫자, 하이픈만 사용)")
+    return name
+
+
+def tenant_db_path(data_dir, name):
+    return os.path.join(data_dir, f"{validate_name(name)}.db")
+
+
+def list_tenants(data_dir):
+    """데이터 디렉터리의 테넌트 이름 목록"""
+    if not os.path.isdir(data_dir):
+        return []
+    names = [filename[:-3] for filename in os.listdir(data_dir) if filename.endswith('.db')]
+    return sorted(name for name in names if TENANT_NAME.match(name))
+
+
+class Tenant:
+    """열려 있는 테넌트 1개 (DB 경로, 연결 풀, 내보내기 동시 실행 제한)"""
+
+    def __init__(self, name, db_path, pool_size, export_concurrency):
+        self.name = name
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, max_idle=pool_size)
+        self.read_pool = ConnectionPool(db_path, readonly=True, max_idle=pool_size)
+        self.export_slots = threading.BoundedSemaphore(export_concurrency)
+        self.active = 0  # 처리 중인 요청 수 (0일 때만 닫음)
+        self.last_used = time.monotonic()
+        self.ready = False
+        self.ready_lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+        self.read_pool.close()
+
+
+class TenantRegistry:
+    """테넌트 DB를 처음 요청할 때 열고, 오래 사용하지 않은 테넌트부터 닫는 LRU 목록
+
+    on_open(db_path)은 프로세스에서 테넌트 DB를 처음 열 때 한 번(스키마 마이그레이션),
+    on_close(db_path)는 테넌트를 닫을 때마다(DB 경로별 캐시 정리) 호출됩니다.
+    """
+
+    def __init__(self, data_dir, max_open=32, idle_timeout=600, pool_size=4, export_concurrency=2,
+                 on_open=None, on_close=None):
+        self.data_dir = data_dir
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.pool_size = pool_size
+        self.export_concurrency = export_concurrency
+        self.on_open = on_open
+        self.on_close = on_close
+        self._open = OrderedDict()
+        self._migrated = set()
+        self._lock = threading.Lock()
+
+    def checkout(self, name):
+        """요청 처리용 테넌트 반환 (DB 파일이 없으면 None), 처리 후 checkin 필요"""
+        db_path = tenant_db_path(self.data_dir, name)
+        with self._lock:
+            tenant = self._open.get(name)
+            if tenant is None:
+                if not os.path.exists(db_path):
+                    return None
+                tenant = Tenant(name, db_path, self.pool_size, self.export_concurrency)
+                self._open[name] = tenant
+            self._open.move_to_end(name)
+            tenant.active += 1
+            closing = self._evict_locked()
+        self._close(closing)
+
+        if not tenant.ready:
+            try:
+                with tenant.ready_lock:
+                    if not tenant.ready:
+                        if db_path not in self._migrated:
+                            if self.on_open:
+                                self.on_open(db_path)
+                            self._migrated.add(db_path)
+                        tenant.ready = True
+            except BaseException:
+                # 마이그레이션 실패 시 호출한 쪽이 checkin하지 않으므로 여기서 되돌림 (다음 요청에서 다시 시도)
+                self.checkin(tenant)
+                raise
+        return tenant
+
+    def checkin(self, tenant):
+        with self._lock:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+
+    def _evict_locked(self):
+        """닫을 테넌트 목록 (개수 초과분과 유휴 시간 초과분, 처리 중인 테넌트 제외)"""
+        now = time.monotonic()
+        closing = []
+        excess = len(self._open) - self.max_open
+        for name, tenant in list(self._open.items()):
+            if tenant.active > 0:
+                continue
+            if excess > 0 or now - tenant.last_used > self.idle_timeout:
+                closing.append(self._open.pop(name))
+                excess -= 1
+        return closing
+
+    def _close(self, tenants):
+        for tenant in tenants:
+            tenant.close()
+            if self.on_close:
+                self.on_close(tenant.db_path)
+
+    def close_idle(self):
+        """유휴 시간이 지난 테넌트 닫기"""
+        with self._lock:
+            closing = self._evict_locked()
+        self._close(closing)
+        return len(closing)
+
+    def open_tenants(self):
+        with self._lock:
+            return list(self._open)
+
+
+def resolve_name(app):
+    """요청의 테넌트 이름 (서브도메인 또는 헤더, 없으면 None)"""
+    mode = app.config['TENANT_MODE']
+    if mode == 'header':
+        return request.headers.get(app.config['TENANT_HEADER'], '').strip().lower() or None
+
+    host = request.host.split(':', 1)[0].lower()
+    base = (app.config['TENANT_BASE_DOMAIN'] or '').lower().strip('.')
+    if base:
+        return host[:-len(base) - 1] if host.endswith('.' + base) else None
+    labels = host.split('.')
+    return labels[0] if len(labels) > 2 else None
+
+
+def init_app(app, on_open=None, on_close=None):
+    """테넌트 라우팅 훅 등록 (TENANT_MODE가 'off'이면 아무것도 하지 않음)"""
+    mode = app.config['TENANT_MODE']
+    if mode not in TENANT_MODES:
+        raise ValueError(f"TENANT_MODE는 {', '.join(TENANT_MODES)} 중 하나여야 합니다: {mode!r}")
+    if mode == 'off':
+        return None
+
+    registry = TenantRegistry(app.config['TENANT_DATA_DIR'],
+                              max_open=app.config['TENANT_MAX_OPEN'],
+                              idle_timeout=app.config['TENANT_IDLE_TIMEOUT'],
+                              pool_size=app.config['TENANT_POOL_SIZE'],
+                              export_concurrency=app.config['TENANT_EXPORT_CONCURRENCY'],
+                              on_open=on_open, on_close=on_close)
+    app.extensions['tenants'] = registry
+
+    @app.before_request
+    def select_tenant():
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        name = resolve_name(app)
+        if not name or not TENANT_NAME.match(name):
+            return {'error': '테넌트를 확인할 수 없습니다'}, 400
+        tenant = registry.checkout(name)
+        if tenant is None:
+            return {'error': f"등록되지 않은 테넌트입니다: {name}"}, 404
+        g.tenant = tenant
+        return None
+
+    @app.teardown_request
+    def release_tenant(exc):
+        tenant = g.pop('tenant', None)
+        if tenant is not None:
+            registry.checkin(tenant)
+
+    return registry
+
+
+def current_tenant():
+    """현재 요청의 테넌트 (테넌트 라우팅을 사용하지 않으면 None)"""
+    return g.get('tenant')
+
+
+def limit_exports(view):
+    """Excel/PDF 생성 라우트용: 테넌트별 동시 생성 수 제한
+
+    한 테넌트의 대량 내보내기가 작업 스레드를 모두 차지하지 않도록 테넌트마다
+    TENANT_EXPORT_CONCURRENCY개까지만 동시에 실행하고, 대기 시간이 지나면 503을 반환합니다.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        tenant = g.get('tenant')
+        if tenant is None:
+            return view(*args, **kwargs)
+        if not tenant.export_slots.acquire(timeout=current_app.config['TENANT_EXPORT_WAIT']):
+            return ('다른 내보내기 작업이 진행 중입니다. 잠시 후 다시 시도하세요.', 503,
+                    {'Retry-After': str(int(current_app.config['TENANT_EXPORT_WAIT']) or 1)})
+        try:
+            return view(*args, **kwargs)
+        finally:
+            tenant.export_slots.release()
+    return wrapper
+
+
+def _targets(parser, args):
+    if args.all:
+        return list_tenants(args.data_dir)
+    if not args.names:
+        parser.error('테넌트 이름 또는 --all이 필요합니다')
+    return args.names
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='테넌트 관리 도구')
+    parser.add_argument('--data-dir', default=Config.TENANT_DATA_DIR, help='테넌트 DB 디렉터리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='테넌트 생성 (스키마 및 기본 문항)')
+    create_parser.add_argument('name')
+    create_parser.add_argument('--empty', action='store_true', help='기본 카테고리/문항 없이 생성')
+
+    subparsers.add_parser('list', help='테넌트 목록')
+
+    migrate_parser = subparsers.add_parser('migrate', help='테넌트 DB 스키마 마이그레이션')
+    migrate_parser.add_argument('names', nargs='*')
+    migrate_parser.add_argument('--all', action='store_true', help='모든 테넌트')
+
+    backup_parser = subparsers.add_parser('backup', help='테넌트 DB 온라인 백업')
+    backup_parser.add_argument('names', nargs='*')
+    backup_parser.add_argument('--all', action='store_true', help='모든 테넌트')
+    backup_parser.add_argument('--dest', default=Config.BACKUP_DIR, help='백업 디렉터리')
+    backup_parser.add_argument('--no-prune', action='store_true', help='보존 정책 적용 안 함')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for name in list_tenants(args.data_dir):
+            path = tenant_db_path(args.data_dir, name)
+            modified = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{name:<32} {os.path.getsize(path) / 1024 / 1024:8.1f}MB  {modified}")
+        return 0
+
+    if args.command == 'backup':
+        import backup
+        for name in _targets(backup_parser, args):
+            path = tenant_db_path(args.data_dir, name)
+            if not os.path.exists(path):
+                print(f"{name}: 테넌트가 없습니다", file=sys.stderr)
+                return 1
+            manifest = backup.create_backup(path, args.dest, prefix=name, pages=Config.BACKUP_PAGES_PER_STEP,
+                                            level=Config.BACKUP_COMPRESS_LEVEL)
+            print(f"{name}: {os.path.join(args.dest, manifest['file'])}")
+        if not args.no_prune:
+            backup.prune_backups(args.dest, Config.BACKUP_KEEP, Config.BACKUP_KEEP_DAILY)
+        return 0
+
+    from app import init_db, insert_initial_data
+
+    if args.command == 'create':
+        try:
+            path = tenant_db_path(args.data_dir, args.name)
+        except ValueError as e:
+            parser.error(str(e))
+        if os.path.exists(path):
+            print(f"{args.name}: 이미 존재하는 테넌트입니다", file=sys.stderr)
+            return 1
+        os.makedirs(args.data_dir, exist_ok=True)
+        init_db(path)
+        if not args.empty:
+            insert_initial_data(path)
+        print(f"{args.name}: {path} 생성됨")
+        return 0
+
+    for name in _targets(migrate_parser, args):
+        path = tenant_db_path(args.data_dir, name)
+        if not os.path.exists(path):
+            print(f"{name}: 테넌트가 없습니다", file=sys.stderr)
+            return 1
+        print(f"[{name}]")
+        init_db(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())